@@ -0,0 +1,74 @@
+"""Measure DB helper calls/sec with a fresh connection per call vs ConnectionPool.
+
+Each call runs the same ``SELECT MAX(ts)`` query the services issue for
+watermarks. Use ``--threads`` to mimic the put service's insert workers.
+
+    python benchmarks/bench_db_pool.py --dsn "host=localhost dbname=stockdata" --calls 500
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extensions import parse_dsn
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+
+from pubsub_wrapper.db import ConnectionPool  # noqa: E402
+
+QUERY = "SELECT MAX(ts) FROM stock_ohlcv WHERE ticker = %s AND interval = %s"
+
+
+def connect_per_call(db_config):
+    def call():
+        conn = psycopg2.connect(**db_config)
+        cur = conn.cursor()
+        cur.execute(QUERY, ("AAPL", "1m"))
+        cur.fetchone()
+        cur.close()
+        conn.close()
+
+    return call
+
+
+def pooled(pool):
+    def call():
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(QUERY, ("AAPL", "1m"))
+            cur.fetchone()
+            cur.close()
+
+    return call
+
+
+def measure(call, calls: int, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(call) for _ in range(calls)]:
+            future.result()
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default="", help="libpq connection string")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=5)
+    args = parser.parse_args()
+
+    db_config = parse_dsn(args.dsn)
+    pool = ConnectionPool(db_config, maxconn=args.threads)
+    try:
+        before = measure(connect_per_call(db_config), args.calls, args.threads)
+        after = measure(pooled(pool), args.calls, args.threads)
+    finally:
+        pool.closeall()
+    print(f"connect per call: {before:>9.0f} calls/sec")
+    print(f"connection pool:  {after:>9.0f} calls/sec ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare executemany and COPY ingest rates for ``stock_ohlcv``.
+
+Runs against the database named by ``--dsn`` (libpq ``PG*`` environment
+variables are used when omitted). Every run writes into a scratch ticker
+that is deleted again afterwards.
+
+    python benchmarks/bench_put_insert.py --rows 1000 5000 20000
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.put.ohlcv_store import copy_ohlcv_rows, execute_ohlcv_rows  # noqa: E402
+
+TICKER = "BENCH-INSERT"
+INTERVAL = "1m"
+
+
+def make_rows(n: int):
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    return [
+        (
+            TICKER,
+            INTERVAL,
+            start + timedelta(minutes=i),
+            100.0 + i % 7,
+            101.0 + i % 5,
+            99.0 + i % 3,
+            100.5,
+            1000 + i,
+        )
+        for i in range(n)
+    ]
+
+
+def clear(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            "DELETE FROM stock_ohlcv WHERE ticker = %s AND interval = %s",
+            (TICKER, INTERVAL),
+        )
+    conn.commit()
+
+
+def time_insert(conn, writer, rows) -> tuple[float, int]:
+    clear(conn)
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        inserted = writer(cur, rows)
+    conn.commit()
+    return time.perf_counter() - start, inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default="", help="libpq connection string")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    try:
+        print(f"{'rows':>8} {'method':>12} {'seconds':>9} {'rows/sec':>11} {'inserted':>9}")
+        for n in args.rows:
+            rows = make_rows(n)
+            for name, writer in (
+                ("executemany", execute_ohlcv_rows),
+                ("copy", copy_ohlcv_rows),
+            ):
+                elapsed, inserted = time_insert(conn, writer, rows)
+                print(f"{n:>8} {name:>12} {elapsed:>9.3f} {n / elapsed:>11.0f} {inserted:>9}")
+    finally:
+        clear(conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
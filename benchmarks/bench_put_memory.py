@@ -0,0 +1,90 @@
+"""Compare peak memory of per-ticker frame handling in the put pipeline.
+
+Builds a synthetic yfinance-style batch download (``(Price, Ticker)``
+columns, a share of NaN bars) and turns it into insert rows ticker by
+ticker, once with the previous copying approach (``xs().copy()`` plus a
+fill copy at split time and again before insert) and once with
+``split_batch_frame``, which fills the batch in place and hands out
+column views. The tracemalloc peak excludes the download itself.
+
+    python benchmarks/bench_put_memory.py --tickers 1000 --bars 1950
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.put.frames import fill_missing_values, frame_to_rows, split_batch_frame  # noqa: E402
+from services.put.providers import synthetic_tickers  # noqa: E402
+
+
+def make_batch(tickers, bars: int, nan_share: float, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01 14:30", periods=bars, freq="min", tz="UTC", name="Datetime")
+    fields = ["Close", "High", "Low", "Open", "Volume"]
+    close = 100 + rng.standard_normal((bars, len(tickers))).cumsum(axis=0)
+    values = {
+        "Close": close,
+        "High": close + 0.5,
+        "Low": close - 0.5,
+        "Open": close + rng.standard_normal(close.shape) * 0.1,
+        "Volume": rng.integers(1_000, 10_000, close.shape).astype(float),
+    }
+    data = np.hstack([values[f] for f in fields])
+    data[rng.random(data.shape) < nan_share] = np.nan
+    columns = pd.MultiIndex.from_product([fields, tickers], names=["Price", "Ticker"])
+    return pd.DataFrame(data, index=index, columns=columns)
+
+
+def legacy_fill(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for col in ["Open", "High", "Low", "Close", "Volume"]:
+        if col in df.columns:
+            df.loc[:, col] = pd.Series(df[col]).ffill().bfill()
+    return df
+
+
+def legacy_rows(df: pd.DataFrame, tickers) -> int:
+    frames = {t: legacy_fill(df.xs(t, axis=1, level=1).copy()) for t in tickers}
+    return sum(len(frame_to_rows(t, "1m", legacy_fill(frames[t].copy()))) for t in tickers)
+
+
+def view_rows(df: pd.DataFrame, tickers) -> int:
+    frames = split_batch_frame(df, tickers, "1m")
+    return sum(len(frame_to_rows(t, "1m", fill_missing_values(frames[t]))) for t in tickers)
+
+
+def measure(fn, template: pd.DataFrame, tickers):
+    df = template.copy()
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = fn(df, tickers)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--bars", type=int, default=5 * 390, help="bars per ticker (one week of 1m sessions)")
+    parser.add_argument("--nan-share", type=float, default=0.01)
+    args = parser.parse_args()
+
+    tickers = synthetic_tickers(args.tickers)
+    template = make_batch(tickers, args.bars, args.nan_share)
+    print(f"batch download: {template.memory_usage(deep=False).sum() / 1e6:,.1f} MB")
+    for name, fn in (("copying", legacy_rows), ("views", view_rows)):
+        rows, peak, elapsed = measure(fn, template, tickers)
+        print(f"{name:>8}: {rows:,} rows, peak {peak / 1e6:,.1f} MB above the download, {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Compare put cycle latency of the thread pool run against the asyncio pipeline.
+
+Times the service's own ``run_threads`` and ``run_async`` on the same
+synthetic replay sample. Provider, database and Redis are stubbed:
+``--fetch-latency`` is added to every download, and each insert and
+publish sleeps ``--db-latency`` and ``--publish-latency``. With ``--dsn``
+the inserts go to that database for real (the rows are removed again
+afterwards). The thread run always uses five insert threads; the
+pipeline uses ``--insert-workers``, the size of the pool.
+
+    python benchmarks/bench_put_pipeline.py --tickers 500 --chunk 50
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from unittest.mock import MagicMock, patch
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "common"))
+
+from bench_put_replay import write_sample  # noqa: E402
+from services.put.providers import ReplayProvider, synthetic_tickers  # noqa: E402
+from services.put.rate_limit import TokenBucket  # noqa: E402
+
+
+class SlowProvider:
+    """Replay provider that waits ``latency`` seconds per download, like a remote API."""
+
+    name = "replay"
+
+    def __init__(self, provider, latency: float):
+        self.provider = provider
+        self.latency = latency
+
+    def download(self, tickers, interval, start=None, end=None):
+        time.sleep(self.latency)
+        return self.provider.download(tickers, interval)
+
+
+class StubPool:
+    """Stands in for the service's connection pool; statements cost ``latency`` seconds."""
+
+    def __init__(self, maxconn: int, latency: float):
+        self.maxconn = maxconn
+        self.latency = latency
+
+    @contextmanager
+    def connection(self):
+        yield MagicMock()
+
+    def write(self, cur, rows) -> int:
+        time.sleep(self.latency)
+        return len(rows)
+
+
+def load_put_service():
+    config = {
+        "PGHOST": "", "PGUSER": "", "PGPASSWORD": "", "PGDATABASE": "", "PGPORT": "5432",
+        "redis_url": "redis://localhost:6379", "symbols": [],
+    }
+    with patch("pubsub_wrapper.load_config", return_value=config):
+        from services.put import put_service
+    return put_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--chunk", type=int, default=50)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--fetch-workers", type=int, default=2)
+    parser.add_argument("--insert-workers", type=int, default=5)
+    parser.add_argument("--fetch-latency", type=float, default=0.5)
+    parser.add_argument("--db-latency", type=float, default=0.02)
+    parser.add_argument("--publish-latency", type=float, default=0.002)
+    parser.add_argument("--dsn", help="COPY rows into this database instead of sleeping")
+    args = parser.parse_args()
+
+    ps = load_put_service()
+    logging.disable(logging.WARNING)  # per-ticker service logs would dominate the timing
+    tickers = synthetic_tickers(args.tickers)
+    ps.symbols = [(t, "1m") for t in tickers]
+    ps.FETCH_CHUNK_SIZE = args.chunk
+    ps.FETCH_CONCURRENCY = args.fetch_workers
+    ps.fetch_limiter = TokenBucket(1e9, 1_000_000)
+    ps.MARKET_HOURS_ONLY = False
+    ps.bus.publish = lambda *a, **k: time.sleep(args.publish_latency)
+
+    stubbed = []
+    if args.dsn:
+        from psycopg2.extensions import parse_dsn
+        from pubsub_wrapper import ConnectionPool
+
+        ps.db = ConnectionPool(parse_dsn(args.dsn), maxconn=args.insert_workers, name="bench")
+    else:
+        ps.db = StubPool(args.insert_workers, args.db_latency)
+        ps.watermarks.loader = lambda pairs: {}
+        stubbed = [
+            patch.object(ps, "copy_ohlcv_rows", ps.db.write),
+            patch.object(ps, "execute_ohlcv_rows", ps.db.write),
+        ]
+
+    inserted, lock = [0], Lock()
+    write_ohlcv_rows = ps.write_ohlcv_rows
+
+    def counting_write(*a, **k):
+        count = write_ohlcv_rows(*a, **k)
+        with lock:
+            inserted[0] += count
+        return count
+
+    stubbed.append(patch.object(ps, "write_ohlcv_rows", counting_write))
+
+    def clear():
+        if args.dsn:
+            with ps.db.connection() as conn:
+                conn.cursor().execute("DELETE FROM stock_ohlcv WHERE ticker LIKE 'SYN%%'")
+        ps.watermarks.invalidate()
+        inserted[0] = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_sample(Path(tmp), 4, args.days)
+        replay = ReplayProvider(tmp)
+        replay.download(tickers[:1], "1m")  # load the sample outside the timing
+        ps.provider = SlowProvider(replay, args.fetch_latency)
+
+        timings = {}
+        for patcher in stubbed:
+            patcher.start()
+        try:
+            for name, runner in [
+                ("threads", lambda: ps.run_threads("1m")),
+                ("async", lambda: asyncio.run(ps.run_async("1m"))),
+            ]:
+                clear()
+                start = time.perf_counter()
+                runner()
+                timings[name] = time.perf_counter() - start
+                print(f"{name:<8} {timings[name]:>7.2f}s end of cycle ({inserted[0]} rows)")
+        finally:
+            for patcher in stubbed:
+                patcher.stop()
+            if args.dsn:
+                clear()
+                ps.db.closeall()
+    print(f"speedup  {timings['threads'] / timings['async']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Measure put ingest throughput offline using the replay provider.
+
+Writes a synthetic 1m sample to a temporary directory, then downloads it
+for ``--tickers`` synthetic symbols in ``--chunk``-sized batches and
+converts every frame to insert rows. With ``--dsn`` the rows are also
+COPY-loaded into ``stock_ohlcv`` (and removed again afterwards).
+
+    python benchmarks/bench_put_replay.py --tickers 1000 --days 1
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.put.frames import frame_to_rows, split_batch_frame  # noqa: E402
+from services.put.providers import ReplayProvider, synthetic_tickers  # noqa: E402
+
+
+def write_sample(directory: Path, series: int, days: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    periods = days * 24 * 60
+    index = pd.date_range("2024-01-01", periods=periods, freq="min", tz="UTC", name="Datetime")
+    for n in range(series):
+        close = 100 + rng.standard_normal(periods).cumsum()
+        pd.DataFrame(
+            {
+                "Open": close + rng.standard_normal(periods) * 0.1,
+                "High": close + 0.5,
+                "Low": close - 0.5,
+                "Close": close,
+                "Volume": rng.integers(1_000, 10_000, periods),
+            },
+            index=index,
+        ).to_csv(directory / f"SAMPLE{n}.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--chunk", type=int, default=100)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--series", type=int, default=4, help="distinct sample series")
+    parser.add_argument("--dsn", help="also COPY rows into this database")
+    args = parser.parse_args()
+
+    conn = None
+    if args.dsn:
+        import psycopg2
+
+        from services.put.ohlcv_store import copy_ohlcv_rows
+
+        conn = psycopg2.connect(args.dsn)
+
+    tickers = synthetic_tickers(args.tickers)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_sample(Path(tmp), args.series, args.days)
+        provider = ReplayProvider(tmp)
+        provider.download(tickers[:1], "1m")  # load the sample outside the timing
+
+        timings = {"download": 0.0, "convert": 0.0, "insert": 0.0}
+        total = 0
+        for i in range(0, len(tickers), args.chunk):
+            chunk = tickers[i : i + args.chunk]
+            start = time.perf_counter()
+            frames = split_batch_frame(provider.download(chunk, "1m"), chunk, "1m")
+            timings["download"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            rows = [row for t in chunk for row in frame_to_rows(t, "1m", frames[t])]
+            timings["convert"] += time.perf_counter() - start
+            total += len(rows)
+
+            if conn is not None:
+                start = time.perf_counter()
+                with conn.cursor() as cur:
+                    copy_ohlcv_rows(cur, rows)
+                conn.commit()
+                timings["insert"] += time.perf_counter() - start
+
+    if conn is not None:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM stock_ohlcv WHERE ticker LIKE 'SYN%%'")
+        conn.commit()
+        conn.close()
+
+    elapsed = sum(timings.values())
+    print(f"{args.tickers} tickers, {total} rows in {elapsed:.2f}s ({total / elapsed:,.0f} rows/sec)")
+    for stage, seconds in timings.items():
+        if seconds:
+            print(f"  {stage:<9} {seconds:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compare the TA-Lib and NumPy indicator backends on long price arrays.
+
+Runs MACD, RSI, SMA, BBANDS, OBV and ADX over a synthetic random walk
+with each backend, reporting the best of ``--repeat`` timings and the
+largest absolute difference between the two outputs. TA-Lib has to be
+installed for the comparison; without it only the NumPy backend runs.
+
+    python benchmarks/bench_ta_backends.py --bars 1000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+try:  # imported before the repository root shadows it with the stub package
+    import talib  # type: ignore
+except Exception:  # pragma: no cover - C library not installed
+    talib = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.ta.algorithms import numpy_backend  # noqa: E402
+
+CALLS = {
+    "MACD": lambda lib, b: lib.MACD(b["close"]),
+    "RSI": lambda lib, b: lib.RSI(b["close"]),
+    "SMA": lambda lib, b: lib.SMA(b["close"]),
+    "BBANDS": lambda lib, b: lib.BBANDS(b["close"]),
+    "OBV": lambda lib, b: lib.OBV(b["close"], b["volume"]),
+    "ADX": lambda lib, b: lib.ADX(b["high"], b["low"], b["close"]),
+}
+
+
+def make_bars(bars: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(bars).cumsum() * 0.1
+    return {
+        "close": close,
+        "high": close + rng.random(bars) * 0.2,
+        "low": close - rng.random(bars) * 0.2,
+        "volume": rng.integers(1_000, 10_000, bars).astype(float),
+    }
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - started)
+    return out, best
+
+
+def max_diff(ours, theirs) -> float:
+    ours = ours if isinstance(ours, tuple) else (ours,)
+    theirs = theirs if isinstance(theirs, tuple) else (theirs,)
+    return max(float(np.nanmax(np.abs(a - b))) for a, b in zip(ours, theirs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bars = make_bars(args.bars)
+    if not hasattr(talib, "ADX"):
+        print("TA-Lib is not installed; timing the NumPy backend only")
+    for name, call in CALLS.items():
+        ours, numpy_s = timed(lambda: call(numpy_backend, bars), args.repeat)
+        line = f"{name:>7}: numpy {numpy_s * 1e3:8.1f} ms"
+        if hasattr(talib, "ADX"):
+            theirs, talib_s = timed(lambda: call(talib, bars), args.repeat)
+            line += f"  talib {talib_s * 1e3:8.1f} ms  max diff {max_diff(ours, theirs):.1e}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
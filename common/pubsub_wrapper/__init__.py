@@ -1,7 +1,26 @@
 """PubSub wrapper package."""
 
-from .messaging import PubSubClient
+from .messaging import PubSubClient, event_updates
 from .config import load_config
 from .json_logger import configure_json_logger
+from .db import ConnectionPool
+from .metrics import (
+    counter,
+    gauge,
+    histogram,
+    observe_event_lag,
+    start_metrics_server,
+)
 
-__all__ = ["PubSubClient", "load_config", "configure_json_logger"]
+__all__ = [
+    "PubSubClient",
+    "event_updates",
+    "load_config",
+    "configure_json_logger",
+    "ConnectionPool",
+    "counter",
+    "gauge",
+    "histogram",
+    "observe_event_lag",
+    "start_metrics_server",
+]
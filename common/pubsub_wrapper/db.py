@@ -0,0 +1,156 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from .metrics import counter, histogram
+
+db_transaction_seconds = histogram(
+    "db_transaction_seconds",
+    "Time from checking a pooled connection out to committing or rolling back",
+    ("pool",),
+)
+db_checkout_wait_seconds = histogram(
+    "db_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("pool",)
+)
+db_errors_total = counter("db_errors_total", "Transactions rolled back after an error", ("pool",))
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections shared by a service.
+
+    Connections are opened lazily up to ``maxconn`` and reused afterwards.
+    Callers block while the pool is exhausted. A connection that has been
+    idle for longer than ``health_check_after`` seconds is probed with
+    ``SELECT 1`` before it is handed out and replaced if the probe fails.
+    Transactions run through ``connection()`` are timed under the pool's
+    ``name`` label.
+    """
+
+    def __init__(
+        self,
+        db_config: dict,
+        maxconn: int = 5,
+        health_check_after: float = 30.0,
+        timeout: float | None = 30.0,
+        name: str = "default",
+    ):
+        if maxconn < 1:
+            raise ValueError("maxconn must be at least 1")
+        self.db_config = dict(db_config)
+        self.maxconn = maxconn
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+        self.name = name
+        self._idle: list[tuple[object, float]] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def getconn(self):
+        """Check a connection out of the pool, opening one if there is room."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("connection pool is closed")
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1
+                        conn, last_used = None, None
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise PoolError("connection pool exhausted")
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    return psycopg2.connect(**self.db_config)
+                except Exception:
+                    self._release_slot()
+                    raise
+            if self._healthy(conn, last_used):
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn, close: bool = False):
+        """Return a connection, rolling back any open transaction."""
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+        if close or conn.closed or self._closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Yield a pooled connection, committing on success and rolling back on error."""
+        started = time.perf_counter()
+        conn = self.getconn()
+        checked_out = time.perf_counter()
+        db_checkout_wait_seconds.labels(self.name).observe(checked_out - started)
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            db_errors_total.labels(self.name).inc()
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+            raise
+        finally:
+            db_transaction_seconds.labels(self.name).observe(time.perf_counter() - checked_out)
+            self.putconn(conn, close=broken)
+
+    def closeall(self):
+        """Close idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def _healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
@@ -1,4 +1,5 @@
 import json
+import time
 import redis  # Swap later with Kafka backend (e.g., aiokafka)
 from datetime import datetime, date
 from typing import Any
@@ -33,6 +34,8 @@ class PubSubClient:
             "metadata": {
                 **metadata,
                 "source": __name__,
+                # epoch seconds, lets consumers measure queue lag
+                "published_at": time.time(),
             },
         }
         self.redis.publish(topic, json.dumps(event, default=self._json_default))
@@ -41,3 +44,14 @@ class PubSubClient:
         pubsub = self.redis.pubsub()
         pubsub.subscribe(topic)
         return pubsub
+
+
+def event_updates(payload: dict) -> list[dict]:
+    """Return the per-ticker updates carried by an event payload.
+
+    Batch events list them under ``updates``; per-ticker events are the
+    update themselves.
+    """
+    if "updates" in payload:
+        return list(payload["updates"])
+    return [payload]
@@ -0,0 +1,75 @@
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from pubsub_wrapper.db import ConnectionPool
+
+
+def make_conn():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+
+def test_connection_is_reused():
+    with patch("psycopg2.connect", side_effect=lambda **kw: make_conn()) as mock_connect:
+        pool = ConnectionPool({"dbname": "db"}, maxconn=2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+    assert first is second
+    mock_connect.assert_called_once_with(dbname="db")
+    assert first.commit.call_count == 2
+
+
+def test_rollback_on_error():
+    conn = make_conn()
+    with patch("psycopg2.connect", return_value=conn):
+        pool = ConnectionPool({}, maxconn=1)
+        with pytest.raises(RuntimeError):
+            with pool.connection():
+                raise RuntimeError("boom")
+        with pool.connection() as again:
+            pass
+    conn.rollback.assert_called_once()
+    assert again is conn
+
+
+def test_closed_connection_is_replaced():
+    conns = [make_conn(), make_conn()]
+    with patch("psycopg2.connect", side_effect=conns):
+        pool = ConnectionPool({}, maxconn=1)
+        with pool.connection():
+            pass
+        conns[0].closed = 1
+        with pool.connection() as conn:
+            pass
+    assert conn is conns[1]
+
+
+def test_failed_health_check_reconnects():
+    stale, fresh = make_conn(), make_conn()
+    stale.cursor.return_value.execute.side_effect = psycopg2.OperationalError("gone")
+    with patch("psycopg2.connect", side_effect=[stale, fresh]):
+        pool = ConnectionPool({}, maxconn=1, health_check_after=0)
+        with pool.connection():
+            pass
+        with pool.connection() as conn:
+            pass
+    assert conn is fresh
+    stale.close.assert_called_once()
+
+
+def test_exhausted_pool_times_out():
+    with patch("psycopg2.connect", side_effect=lambda **kw: make_conn()):
+        pool = ConnectionPool({}, maxconn=1, timeout=0.01)
+        held = pool.getconn()
+        with pytest.raises(PoolError):
+            pool.getconn()
+        pool.putconn(held)
+        assert pool.getconn() is held
@@ -2,7 +2,7 @@ import json
 from unittest.mock import MagicMock, patch
 import pandas as pd
 
-from pubsub_wrapper.messaging import PubSubClient
+from pubsub_wrapper.messaging import PubSubClient, event_updates
 
 
 def test_publish_formats_event():
@@ -19,3 +19,10 @@ def test_publish_formats_event():
     assert event["event_type"] == "type"
     assert event["payload"] == {"ts": "2024-01-01T00:00:00"}
     assert event["metadata"]["foo"] == "2024-01-01T00:00:00"
+
+
+def test_event_updates_accepts_both_formats():
+    single = {"ticker": "AAPL", "interval": "1m", "new_rows": 1}
+    assert event_updates(single) == [single]
+    batch = {"updates": [single, {**single, "ticker": "MSFT"}]}
+    assert [u["ticker"] for u in event_updates(batch)] == ["AAPL", "MSFT"]
@@ -0,0 +1,78 @@
+import urllib.request
+
+import pytest
+
+from pubsub_wrapper.metrics import MetricsRegistry, observe_event_lag, start_metrics_server
+
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    rows = registry.counter("rows_total", "Rows written", ("interval",))
+    rows.labels("1m").inc(3)
+    rows.labels("1m").inc()
+    rows.labels("5m").inc(2)
+    depth = registry.gauge("queue_depth", "Items queued")
+    depth.set(7)
+    depth.dec()
+
+    text = registry.render()
+    assert "# TYPE rows_total counter" in text
+    assert 'rows_total{interval="1m"} 4' in text
+    assert 'rows_total{interval="5m"} 2' in text
+    assert "queue_depth 6" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("fetch_seconds", "Fetch latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'fetch_seconds_bucket{le="0.1"} 2' in lines
+    assert 'fetch_seconds_bucket{le="1"} 3' in lines
+    assert 'fetch_seconds_bucket{le="+Inf"} 4' in lines
+    assert "fetch_seconds_sum 3.65" in lines
+    assert "fetch_seconds_count 4" in lines
+
+
+def test_registering_twice_returns_same_metric():
+    registry = MetricsRegistry()
+    first = registry.counter("events_total", "Events", ("topic",))
+    assert registry.counter("events_total", "Events", ("topic",)) is first
+    with pytest.raises(ValueError):
+        registry.histogram("events_total", "Events", ("topic",))
+    with pytest.raises(ValueError):
+        first.labels("a", "b")
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("odd_total", "Odd labels", ("name",)).labels('a"b\\c').inc()
+    assert 'odd_total{name="a\\"b\\\\c"} 1' in registry.render()
+
+
+def test_event_lag_uses_published_at():
+    from pubsub_wrapper.metrics import event_lag_seconds
+
+    observe_event_lag("lag.test", {"metadata": {"published_at": 100.0}}, now=100.25)
+    observe_event_lag("lag.test", {"metadata": {}}, now=100.25)
+    series = event_lag_seconds.labels("lag.test")
+    assert sum(series.counts) == 1
+    assert series.sum == pytest.approx(0.25)
+
+
+def test_metrics_endpoint_serves_registry():
+    registry = MetricsRegistry()
+    registry.counter("served_total", "Served").inc(5)
+    server = start_metrics_server(0, host="127.0.0.1", registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics") as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "served_total 5" in resp.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -57,3 +57,32 @@ CREATE TABLE stock_ta_obv (
     obv          BIGINT,
     PRIMARY KEY (ticker, interval, ts)
 );
+
+CREATE TABLE stock_ta_state (
+    ticker       TEXT        NOT NULL,
+    interval     TEXT        NOT NULL,
+    indicator    TEXT        NOT NULL,              -- algorithm name, e.g. 'macd'
+    last_ts      TIMESTAMPTZ NOT NULL,              -- last bar folded into state
+    state        JSONB       NOT NULL,              -- running averages and windows
+    updated_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (ticker, interval, indicator)
+);
+
+
+CREATE TABLE stock_ohlcv_gaps (
+    ticker           TEXT        NOT NULL,
+    interval         TEXT        NOT NULL,
+    gap_start        TIMESTAMPTZ NOT NULL,          -- first missing bar
+    gap_end          TIMESTAMPTZ NOT NULL,          -- last missing bar
+    missing_bars     INTEGER     NOT NULL,
+    refetch_attempts INTEGER     NOT NULL DEFAULT 0,
+    detected_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (ticker, interval, gap_start)
+);
+
+CREATE TABLE stock_ohlcv_gap_scan (
+    ticker          TEXT        NOT NULL,
+    interval        TEXT        NOT NULL,
+    scanned_through TIMESTAMPTZ NOT NULL,           -- latest bar covered by the gap scan
+    PRIMARY KEY (ticker, interval)
+);
@@ -1,7 +1,14 @@
 import os
 import logging
 import json
-from pubsub_wrapper import PubSubClient, load_config
+from pubsub_wrapper import (
+    PubSubClient,
+    counter,
+    event_updates,
+    load_config,
+    observe_event_lag,
+    start_metrics_server,
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 logger = logging.getLogger(__name__)
@@ -11,9 +18,17 @@ config = load_config(ENV)
 
 bus = PubSubClient(config.get("redis_url"))
 
+# Prometheus endpoint for the metrics below; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+updates_checked = counter("audit_updates_checked_total", "Ticker updates checked for revisions")
+if METRICS_PORT:
+    start_metrics_server(METRICS_PORT)
+
 for msg in bus.subscribe("stock.updated"):
     if msg["type"] != "message":
         continue
     event = json.loads(msg["data"])
-    ticker = event["payload"]["ticker"]
-    logger.info(f"Audit: Checking {ticker} for revisions")
\ No newline at end of file
+    observe_event_lag("stock.updated", event)
+    for update in event_updates(event["payload"]):
+        updates_checked.inc()
+        logger.info(f"Audit: Checking {update['ticker']} for revisions")
\ No newline at end of file
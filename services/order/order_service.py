@@ -1,6 +1,13 @@
 import os
 import logging
-from pubsub_wrapper import PubSubClient, load_config, configure_json_logger
+from pubsub_wrapper import (
+    PubSubClient,
+    configure_json_logger,
+    counter,
+    load_config,
+    observe_event_lag,
+    start_metrics_server,
+)
 import json
 
 configure_json_logger()
@@ -11,8 +18,16 @@ config = load_config(ENV)
 
 bus = PubSubClient(config.get("redis_url"))
 
+# Prometheus endpoint for the metrics below; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+signals_received = counter("order_signals_received_total", "Strategy signals received", ("event_type",))
+if METRICS_PORT:
+    start_metrics_server(METRICS_PORT)
+
 for msg in bus.subscribe("strategy.signal"):
     if msg["type"] != "message":
         continue
     event = json.loads(msg["data"])
+    observe_event_lag("strategy.signal", event)
+    signals_received.labels(event.get("event_type")).inc()
     logger.info(f"Order: Received signal {event}")
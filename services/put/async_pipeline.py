@@ -0,0 +1,73 @@
+"""Asyncio stages connected by bounded queues.
+
+Each stage is a coroutine function that takes one item and returns an
+iterable of items for the next stage, so a stage can drop (return ``[]``)
+or fan out. Stages run ``workers`` copies concurrently; the bounded queues
+between them apply back-pressure so a fast producer cannot run ahead of a
+slow consumer by more than ``queue_size`` items.
+"""
+import asyncio
+
+_DONE = object()
+
+
+class Pipeline:
+    """A chain of async stages. Items leaving the last stage are collected."""
+
+    def __init__(self, queue_size: int = 8):
+        self.queue_size = queue_size
+        self.stages: list[tuple[object, int]] = []
+
+    def add(self, fn, workers: int = 1) -> "Pipeline":
+        self.stages.append((fn, max(1, workers)))
+        return self
+
+    async def run(self, items) -> list:
+        """Push ``items`` through every stage, returning the final outputs.
+
+        An exception raised by any stage cancels the remaining work and
+        propagates to the caller.
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = []
+
+        async def close(index: int):
+            if index < len(queues):
+                for _ in range(self.stages[index][1]):
+                    await queues[index].put(_DONE)
+
+        async def feed():
+            for item in items:
+                await queues[0].put(item)
+            await close(0)
+
+        async def work(index: int, fn):
+            while (item := await queues[index].get()) is not _DONE:
+                for out in await fn(item):
+                    if index + 1 < len(queues):
+                        await queues[index + 1].put(out)
+                    else:
+                        results.append(out)
+
+        async def stage(index: int, fn, workers: int):
+            async with asyncio.TaskGroup() as group:
+                for _ in range(workers):
+                    group.create_task(work(index, fn))
+            await close(index + 1)
+
+        if not self.stages:
+            return list(items)
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(feed())
+                for index, (fn, workers) in enumerate(self.stages):
+                    group.create_task(stage(index, fn, workers))
+        except BaseExceptionGroup as errors:
+            raise _first_error(errors) from None
+        return results
+
+
+def _first_error(error: BaseException) -> BaseException:
+    while isinstance(error, BaseExceptionGroup):
+        error = error.exceptions[0]
+    return error
@@ -0,0 +1,248 @@
+"""Load historical OHLCV bars outside the live put scheduler.
+
+The date range is split into windows no longer than the provider allows
+per request, each window is split into ticker chunks, and the resulting
+units are downloaded by a bounded pool of workers under a shared rate
+limit and COPY-loaded into ``stock_ohlcv``. Completed units are recorded
+in a JSON checkpoint so an interrupted backfill resumes where it stopped.
+Given a bus, each unit's new bars are announced as a batch
+``stock.updated`` event, so TA windows that already cover them reload;
+TA services compute the history itself in their backlog pass.
+
+    python backfill.py --tickers AAPL,MSFT --interval 1h --start 2024-01-01 \\
+        --workers 4 --checkpoint /tmp/backfill-1h.json
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+
+from pubsub_wrapper import ConnectionPool, PubSubClient, configure_json_logger, load_config
+
+try:  # allow running as a script without package context
+    from .frames import frame_to_rows, rows_update, split_batch_frame  # type: ignore
+    from .intervals import max_lookback, max_request_span  # type: ignore
+    from .ohlcv_store import copy_ohlcv_rows  # type: ignore
+    from .providers import get_provider  # type: ignore
+    from .rate_limit import TokenBucket  # type: ignore
+except Exception:  # pragma: no cover - fallback for Docker build
+    from frames import frame_to_rows, rows_update, split_batch_frame  # type: ignore
+    from intervals import max_lookback, max_request_span  # type: ignore
+    from ohlcv_store import copy_ohlcv_rows  # type: ignore
+    from providers import get_provider  # type: ignore
+    from rate_limit import TokenBucket  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+def plan_windows(interval: str, start: datetime, end: datetime, now: datetime | None = None):
+    """Split ``[start, end)`` into request-sized windows within available history.
+
+    Windows are laid out from ``start`` in steps of the request span and
+    returned as ``(anchor, window_start, window_end)``. ``anchor`` is the
+    window's place on that grid. The first window within reach is clamped
+    to the provider's lookback, which moves with the clock, so resuming
+    units are keyed by the anchor instead (see ``unit_key``).
+    """
+    now = now or datetime.now(timezone.utc)
+    lookback = max_lookback(interval)
+    earliest = now - lookback if lookback is not None else start
+    if earliest > start:
+        logger.warning(
+            f"⚠️ {interval} history only reaches back {lookback.days} days, starting at {earliest}"
+        )
+
+    span = max_request_span(interval)
+    windows = []
+    anchor = start
+    while anchor < end:
+        stop = min(anchor + span, end)
+        if stop > earliest:
+            windows.append((anchor, max(anchor, earliest), stop))
+        anchor = stop
+    return windows
+
+
+def unit_key(interval: str, anchor: datetime, end: datetime, tickers) -> str:
+    """Checkpoint key of a unit; stable across runs with the same requested range."""
+    return f"{interval}|{anchor.isoformat()}|{end.isoformat()}|{','.join(tickers)}"
+
+
+class Checkpoint:
+    """Set of completed unit keys, rewritten atomically after every unit."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.completed: set[str] = set()
+        if self.path is not None and self.path.exists():
+            self.completed = set(json.loads(self.path.read_text())["completed"])
+        self._lock = Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.completed
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self.completed.add(key)
+            if self.path is None:
+                return
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps({"completed": sorted(self.completed)}))
+            os.replace(tmp, self.path)
+
+
+def load_unit(provider, pool, limiter, interval: str, start, end, tickers, bus=None) -> int:
+    """Download one window for a chunk of tickers and COPY it into the database.
+
+    With ``bus`` the tickers that gained bars are announced once the rows
+    are committed.
+    """
+    limiter.acquire()
+    df = provider.download(tickers, interval, start=start, end=end)
+    if df is None or df.empty:
+        return 0
+    frames = split_batch_frame(df, tickers, interval)
+    groups = {t: frame_to_rows(t, interval, frames[t]) for t in tickers}
+    groups = {t: rows for t, rows in groups.items() if rows}
+    if not groups:
+        return 0
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        inserted = {t: copy_ohlcv_rows(cur, rows) for t, rows in groups.items()}
+        cur.close()
+    updates = [
+        rows_update(t, interval, groups[t], count) for t, count in inserted.items() if count > 0
+    ]
+    if bus is not None and updates:
+        bus.publish("stock.updated", "stock.updated.batch", {"updates": updates})
+    return sum(inserted.values())
+
+
+def backfill(
+    provider,
+    pool,
+    limiter,
+    tickers,
+    interval: str,
+    start: datetime,
+    end: datetime,
+    workers: int = 4,
+    chunk_size: int = 50,
+    checkpoint: Checkpoint | None = None,
+    now: datetime | None = None,
+    bus=None,
+) -> tuple[int, int]:
+    """Load every pending unit, returning ``(rows inserted, units failed)``."""
+    checkpoint = checkpoint or Checkpoint()
+
+    def key(unit) -> str:
+        anchor, _, window_end, chunk = unit
+        return unit_key(interval, anchor, window_end, chunk)
+
+    chunks = [tickers[i : i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    units = [
+        (anchor, window_start, window_end, chunk)
+        for anchor, window_start, window_end in plan_windows(interval, start, end, now)
+        for chunk in chunks
+    ]
+    pending = [u for u in units if key(u) not in checkpoint]
+    logger.info(
+        f"Backfilling {len(tickers)} tickers ({interval}) from {start} to {end}: "
+        f"{len(pending)} of {len(units)} units pending"
+    )
+
+    inserted = failed = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill") as executor:
+        futures = {
+            executor.submit(load_unit, provider, pool, limiter, interval, *unit[1:], bus): unit
+            for unit in pending
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            unit = futures[future]
+            try:
+                rows = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"❌ Backfill unit {key(unit)} failed: {e}")
+                continue
+            checkpoint.add(key(unit))
+            inserted += rows
+            logger.info(
+                f"✅ {done}/{len(pending)} units, {inserted} rows "
+                f"({inserted / (time.perf_counter() - started):,.0f} rows/sec)"
+            )
+    return inserted, failed
+
+
+def parse_date(value: str) -> datetime:
+    ts = datetime.fromisoformat(value)
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", required=True, help="comma separated tickers")
+    parser.add_argument("--interval", required=True)
+    parser.add_argument("--start", required=True, type=parse_date)
+    parser.add_argument("--end", type=parse_date, default=None)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk", type=int, default=50, help="tickers per download")
+    parser.add_argument("--rate", type=float, default=float(os.getenv("FETCH_RATE", "1")))
+    parser.add_argument("--burst", type=int, default=int(os.getenv("FETCH_BURST", "2")))
+    parser.add_argument("--checkpoint", help="JSON file recording completed units")
+    parser.add_argument(
+        "--provider", default=os.getenv("MARKET_DATA_PROVIDER", "yfinance")
+    )
+    parser.add_argument("--dsn", help="libpq connection string instead of the SSM config")
+    parser.add_argument(
+        "--redis-url", help="announce loaded bars on this Redis (default: the SSM config's)"
+    )
+    args = parser.parse_args()
+
+    configure_json_logger()
+    redis_url = args.redis_url
+    if args.dsn:
+        from psycopg2.extensions import parse_dsn
+
+        db_config = parse_dsn(args.dsn)
+    else:
+        config = load_config(os.getenv("STOCKAPP_ENV", "devtest"))
+        db_config = {
+            "dbname": config["PGDATABASE"],
+            "user": config["PGUSER"],
+            "password": config["PGPASSWORD"],
+            "host": config["PGHOST"],
+            "port": int(config["PGPORT"]),
+        }
+        redis_url = redis_url or config.get("redis_url")
+
+    pool = ConnectionPool(db_config, maxconn=args.workers)
+    try:
+        inserted, failed = backfill(
+            get_provider(args.provider),
+            pool,
+            TokenBucket(args.rate, args.burst),
+            [t.strip() for t in args.tickers.split(",") if t.strip()],
+            args.interval,
+            args.start,
+            args.end or datetime.now(timezone.utc),
+            workers=args.workers,
+            chunk_size=args.chunk,
+            checkpoint=Checkpoint(args.checkpoint),
+            bus=PubSubClient(redis_url) if redis_url else None,
+        )
+    finally:
+        pool.closeall()
+    logger.info(f"Backfill finished: {inserted} rows inserted, {failed} units failed")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Helpers for reshaping downloaded OHLCV frames into ``stock_ohlcv`` rows."""
+import logging
+from datetime import timedelta
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_NAMES = ("Datetime", "Date")
+PRICE_FIELDS = ("Open", "High", "Low", "Close")
+OHLCV_FIELDS = (*PRICE_FIELDS, "Volume")
+
+
+def fill_missing_values(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    """Forward/back fill NaN values for OHLCV columns.
+
+    With ``inplace`` every column of ``df`` is filled in its existing
+    buffers, so a whole multi-ticker download is filled in one pass without
+    being copied (other columns such as ``Adj Close`` are never read, so
+    filling them too is harmless). Otherwise the OHLCV columns with gaps
+    are filled on a copy, and ``df`` is returned as is when there are none.
+    """
+    if df is None or df.empty:
+        return df
+
+    if inplace:
+        df.ffill(inplace=True)
+        df.bfill(inplace=True)
+        return df
+
+    gaps = frame_fields(df).isin(OHLCV_FIELDS) & df.isna().any().to_numpy()
+    if not gaps.any():
+        return df
+    df = df.copy()
+    for position in np.flatnonzero(gaps):
+        df.iloc[:, position] = df.iloc[:, position].ffill().bfill()
+    return df
+
+
+def select_columns(df: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+    """Select columns by position, as a view when they are evenly spaced.
+
+    yfinance orders batch columns field by field, so one ticker's columns
+    are a strided slice of the download.
+    """
+    steps = np.diff(positions)
+    if positions.size == 1 or ((steps == steps[0]).all() and steps[0] > 0):
+        step = int(steps[0]) if steps.size else 1
+        return df.iloc[:, positions[0] : positions[-1] + 1 : step]
+    return df.iloc[:, positions]
+
+
+def split_batch_frame(df: pd.DataFrame, tickers, interval: str) -> dict:
+    """Split a multi-ticker download into one filled frame per ticker.
+
+    ``df`` is filled in place once and each ticker's frame is a view of
+    its columns, so the bars are never copied per ticker.
+    """
+    fill_missing_values(df, inplace=True)
+    results = {}
+    if df.columns.nlevels == 1:
+        # yfinance omits the ticker level when only one ticker is requested
+        results[tickers[0]] = df
+        return results
+
+    ticker_level = df.columns.get_level_values(1)
+    for ticker in tickers:
+        positions = np.flatnonzero(ticker_level == ticker)
+        if positions.size:
+            df_ticker = select_columns(df, positions)
+            df_ticker.columns = df_ticker.columns.droplevel(1)
+            results[ticker] = df_ticker
+        else:
+            logger.warning(
+                f"⚠️ Ticker '{ticker}' not found in data columns for batch {tickers} ({interval})"
+            )
+            results[ticker] = pd.DataFrame()
+    return results
+
+
+def frame_index(df: pd.DataFrame) -> pd.DatetimeIndex:
+    """Return the bar timestamps of ``df`` as a ``DatetimeIndex``.
+
+    MultiIndex rows are reduced to their timestamp level (named ``Datetime``
+    or ``Date``, otherwise the innermost level). Frames without a datetime
+    index fall back to a ``Datetime``/``Date`` column.
+    """
+    idx = df.index
+    if isinstance(idx, pd.MultiIndex):
+        names = [name for name in idx.names if name in TIMESTAMP_NAMES]
+        idx = idx.get_level_values(names[0] if names else idx.nlevels - 1)
+    if not isinstance(idx, pd.DatetimeIndex):
+        column = next((c for c in TIMESTAMP_NAMES if c in frame_fields(df)), None)
+        values = frame_field(df, column) if column else idx
+        idx = pd.DatetimeIndex(pd.to_datetime(values, errors="coerce"))
+    return idx
+
+
+def bars_after(df: pd.DataFrame, after) -> pd.DataFrame:
+    """Return the bars of ``df`` stamped after ``after``, or ``df`` itself if ``None``.
+
+    Naive timestamps on either side are treated as UTC. Bars without a
+    timestamp are kept so :func:`frame_to_rows` can report them.
+    """
+    if after is None or df is None or df.empty:
+        return df
+    idx = frame_index(df)
+    if idx.tz is None:
+        idx = idx.tz_localize("UTC")
+    after = pd.Timestamp(after)
+    after = after.tz_localize("UTC") if after.tzinfo is None else after
+    if idx.is_monotonic_increasing and not idx.hasnans:
+        # sorted bars: slice the frame instead of copying it through a mask
+        start = idx.searchsorted(after, side="right")
+        return df if start == 0 else df.iloc[start:]
+    keep = (idx > after) | idx.isna()
+    return df if keep.all() else df[keep]
+
+
+def frame_fields(df: pd.DataFrame) -> pd.Index:
+    """Return the field names of ``df``, i.e. the outer column level."""
+    return df.columns.get_level_values(0)
+
+
+def frame_field(df: pd.DataFrame, name: str) -> pd.Series | None:
+    """Return the first column whose outer level is ``name``."""
+    positions = np.flatnonzero(frame_fields(df) == name)
+    if positions.size == 0:
+        return None
+    return df.iloc[:, positions[0]]
+
+
+def field_values(df: pd.DataFrame, name: str) -> np.ndarray:
+    """Return a column as a float array, with missing columns as all-NaN."""
+    column = frame_field(df, name)
+    if column is None:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(column, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def to_nullable_objects(values: np.ndarray, dtype=float) -> np.ndarray:
+    """Convert a float array to Python scalars of ``dtype`` with NaN as ``None``."""
+    missing = np.isnan(values)
+    out = np.where(missing, 0, values).astype(dtype).astype(object)
+    out[missing] = None
+    return out
+
+
+def frame_to_rows(ticker: str, interval: str, df: pd.DataFrame) -> list[tuple]:
+    """Convert an OHLCV frame into ``stock_ohlcv`` insert tuples.
+
+    Every column is converted in bulk, so the cost per bar is a single tuple
+    allocation. Bars without a valid timestamp are dropped.
+    """
+    if df is None or df.empty:
+        return []
+
+    idx = frame_index(df)
+    valid = ~idx.isna()
+    dropped = int((~valid).sum())
+    if dropped:
+        logger.warning(f"⚠️ Skipping {dropped} rows without a timestamp for {ticker} ({interval})")
+
+    if dropped:
+        idx = idx[valid]
+        values = {field: field_values(df, field)[valid] for field in OHLCV_FIELDS}
+    else:
+        values = {field: field_values(df, field) for field in OHLCV_FIELDS}
+
+    timestamps = idx.to_pydatetime()
+    columns = [to_nullable_objects(values[field]) for field in PRICE_FIELDS]
+    columns.append(to_nullable_objects(values["Volume"], np.int64))
+
+    n = len(timestamps)
+    return list(zip(repeat(ticker, n), repeat(interval, n), timestamps, *columns))
+
+
+def rows_update(ticker: str, interval: str, rows, new_rows: int) -> dict:
+    """Describe ``new_rows`` stored from ``rows`` as a ``stock.updated`` update.
+
+    ``first_ts``/``last_ts`` span all of ``rows``, so a consumer whose
+    window already covers them reloads it instead of reading past it.
+    """
+    timestamps = [row[2] for row in rows]
+    return {
+        "ticker": ticker,
+        "interval": interval,
+        "new_rows": new_rows,
+        "first_ts": min(timestamps),
+        "last_ts": max(timestamps),
+    }
+
+
+def frame_to_bars(df: pd.DataFrame, after=None) -> dict:
+    """Encode the bars of ``df`` newer than ``after`` as columnar lists.
+
+    The result is small enough to embed in an event: ``ts`` holds epoch
+    seconds, the lowercase OHLCV keys hold one value per bar and missing
+    values are ``None``.
+    """
+    idx = frame_index(df)
+    if idx.tz is None:
+        idx = idx.tz_localize("UTC")
+    keep = ~idx.isna()
+    if after is not None:
+        after = pd.Timestamp(after)
+        keep &= idx > (after.tz_localize("UTC") if after.tzinfo is None else after)
+
+    epoch = (idx[keep] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    bars = {"ts": [int(ts) for ts in epoch]}
+    for field in PRICE_FIELDS:
+        bars[field.lower()] = to_nullable_objects(field_values(df, field)[keep]).tolist()
+    bars["volume"] = to_nullable_objects(field_values(df, "Volume")[keep], np.int64).tolist()
+    return bars
+
+
+def resample_ohlcv(df: pd.DataFrame, step: timedelta, base_step: timedelta) -> pd.DataFrame:
+    """Aggregate ``base_step`` bars into ``step`` bars, keeping complete buckets only.
+
+    Buckets are aligned to the epoch (so 1h bars start on the hour) and use
+    first/max/min/last/sum for open/high/low/close/volume. The trailing
+    bucket is dropped until a base bar covering its end has been seen.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+
+    rule = pd.Timedelta(step)
+    grouped = df.resample(rule, label="left", closed="left", origin="epoch")
+    bars = grouped.agg(
+        {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    )
+    bars = bars[grouped["Close"].count() > 0]
+    return bars[bars.index + rule <= df.index[-1] + pd.Timedelta(base_step)]
@@ -0,0 +1,188 @@
+"""Find and track missing bars in ``stock_ohlcv``.
+
+Expected bars are generated in SQL from the trading sessions of the
+range being scanned, and consecutive missing bars are collapsed into
+``(gap_start, gap_end)`` ranges with the gaps-and-islands technique. Found
+gaps are kept in ``stock_ohlcv_gaps``; ``stock_ohlcv_gap_scan`` records
+how far each ``(ticker, interval)`` has been scanned so every cycle only
+looks at bars added since the previous one.
+"""
+from datetime import datetime, time, timedelta, timezone
+
+try:  # allow running as a script without package context
+    from .intervals import interval_to_timedelta  # type: ignore
+except Exception:  # pragma: no cover - fallback for Docker build
+    from intervals import interval_to_timedelta  # type: ignore
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# A bucket counts as present when any stored bar falls inside it, so bars
+# that are aligned differently from the session grid are not reported.
+FIND_GAPS_SQL = """
+WITH expected AS (
+    SELECT b.bucket, row_number() OVER (ORDER BY b.bucket) AS n
+    FROM unnest(%(opens)s::timestamptz[], %(closes)s::timestamptz[]) AS s(open, close)
+    CROSS JOIN LATERAL generate_series(
+        s.open, s.close - interval '1 microsecond', %(step)s::interval
+    ) AS b(bucket)
+    WHERE b.bucket >= %(start)s AND b.bucket < %(end)s
+), missing AS (
+    SELECT e.bucket, e.n - row_number() OVER (ORDER BY e.n) AS island
+    FROM expected e
+    WHERE NOT EXISTS (
+        SELECT 1 FROM stock_ohlcv o
+        WHERE o.ticker = %(ticker)s AND o.interval = %(interval)s
+          AND o.ts >= e.bucket AND o.ts < e.bucket + %(step)s::interval
+    )
+)
+SELECT min(bucket), max(bucket), count(*) FROM missing GROUP BY island ORDER BY 1
+"""
+
+
+def align_to_epoch(ts: datetime, step: timedelta) -> datetime:
+    return EPOCH + ((ts - EPOCH) // step) * step
+
+
+def expected_windows(
+    calendar, ticker: str, interval: str, start: datetime, end: datetime, resampled: bool = False
+):
+    """Return the ``(open, close)`` windows in which ``ticker`` should have bars.
+
+    Buckets are laid out from each window's open: exchange sessions for
+    intraday equity bars, UTC midnights of trading days for daily equity
+    bars, and a single epoch-aligned window for tickers that never close.
+    ``resampled`` series are built from base bars on epoch-aligned buckets
+    (1h bars start on the hour), so their session opens are floored to match.
+    """
+    step = interval_to_timedelta(interval)
+    if calendar.always_open(ticker):
+        first = EPOCH + ((start - EPOCH) // step) * step
+        return [(first, end)]
+    if interval.endswith("d"):
+        return [
+            (
+                datetime.combine(day, time(0), timezone.utc),
+                datetime.combine(day + timedelta(days=1), time(0), timezone.utc),
+            )
+            for day in calendar.trading_days(start, end)
+        ]
+    sessions = calendar.sessions(start, end)
+    if resampled:
+        return [(align_to_epoch(open_, step), close) for open_, close in sessions]
+    return sessions
+
+
+def find_gaps(
+    cur, calendar, ticker: str, interval: str, start: datetime, end: datetime, resampled: bool = False
+):
+    """Return ``(gap_start, gap_end, missing_bars)`` for bars missing in ``[start, end)``."""
+    windows = expected_windows(calendar, ticker, interval, start, end, resampled)
+    if not windows:
+        return []
+    cur.execute(
+        FIND_GAPS_SQL,
+        {
+            "opens": [w[0] for w in windows],
+            "closes": [w[1] for w in windows],
+            "step": interval_to_timedelta(interval),
+            "start": start,
+            "end": end,
+            "ticker": ticker,
+            "interval": interval,
+        },
+    )
+    return cur.fetchall()
+
+
+def record_gaps(
+    cur, ticker: str, interval: str, start: datetime, end: datetime, gaps, attempts: int = 0
+) -> None:
+    """Replace the indexed gaps starting in ``[start, end)`` with ``gaps``.
+
+    Gaps that are found again keep their refetch attempt count; new ones
+    start at ``attempts``.
+    """
+    cur.execute(
+        """
+        DELETE FROM stock_ohlcv_gaps
+        WHERE ticker = %s AND interval = %s AND gap_start >= %s AND gap_start < %s
+          AND NOT (gap_start = ANY(%s::timestamptz[]))
+        """,
+        (ticker, interval, start, end, [g[0] for g in gaps]),
+    )
+    for gap_start, gap_end, missing in gaps:
+        cur.execute(
+            """
+            INSERT INTO stock_ohlcv_gaps
+                (ticker, interval, gap_start, gap_end, missing_bars, refetch_attempts)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (ticker, interval, gap_start)
+            DO UPDATE SET gap_end = EXCLUDED.gap_end, missing_bars = EXCLUDED.missing_bars
+            """,
+            (ticker, interval, gap_start, gap_end, missing, attempts),
+        )
+
+
+def scan_pair(cur, calendar, ticker: str, interval: str, resampled: bool = False) -> int:
+    """Scan the bars stored since the last scan and index any gaps among them.
+
+    The first scan of a pair covers its whole history. Returns the number
+    of gaps found. See ``expected_windows`` for ``resampled``.
+    """
+    cur.execute(
+        """
+        SELECT
+            (SELECT scanned_through FROM stock_ohlcv_gap_scan WHERE ticker = %s AND interval = %s),
+            (SELECT MIN(ts) FROM stock_ohlcv WHERE ticker = %s AND interval = %s),
+            (SELECT MAX(ts) FROM stock_ohlcv WHERE ticker = %s AND interval = %s)
+        """,
+        (ticker, interval) * 3,
+    )
+    scanned_through, first_ts, last_ts = cur.fetchone()
+    if last_ts is None:
+        return 0
+    start = scanned_through or first_ts
+    if start >= last_ts:
+        return 0
+
+    gaps = find_gaps(cur, calendar, ticker, interval, start, last_ts, resampled)
+    record_gaps(cur, ticker, interval, start, last_ts, gaps)
+    cur.execute(
+        """
+        INSERT INTO stock_ohlcv_gap_scan (ticker, interval, scanned_through)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (ticker, interval) DO UPDATE SET scanned_through = EXCLUDED.scanned_through
+        """,
+        (ticker, interval, last_ts),
+    )
+    return len(gaps)
+
+
+def open_gaps(
+    cur, tickers, interval: str, max_attempts: int, since: datetime | None = None, limit: int = 10
+):
+    """Return up to ``limit`` gaps still worth refetching, newest first.
+
+    Rows are ``(ticker, gap_start, gap_end, refetch_attempts)``.
+    """
+    cur.execute(
+        """
+        SELECT ticker, gap_start, gap_end, refetch_attempts FROM stock_ohlcv_gaps
+        WHERE ticker = ANY(%s) AND interval = %s AND refetch_attempts < %s
+          AND (%s::timestamptz IS NULL OR gap_start >= %s)
+        ORDER BY gap_start DESC
+        LIMIT %s
+        """,
+        (list(tickers), interval, max_attempts, since, since, limit),
+    )
+    return cur.fetchall()
+
+
+def mark_refetch_attempt(cur, ticker: str, interval: str, gap_start: datetime) -> None:
+    cur.execute(
+        """
+        UPDATE stock_ohlcv_gaps SET refetch_attempts = refetch_attempts + 1
+        WHERE ticker = %s AND interval = %s AND gap_start = %s
+        """,
+        (ticker, interval, gap_start),
+    )
@@ -21,6 +21,7 @@ def main():
         "intervals": intervals,
         "replicas": 1,
         "env": env,
+        "scheduler": os.getenv("PUT_SCHEDULER", "false").lower() == "true",
     }
 
     values_path = Path(__file__).resolve().parent / "put_values.yaml"
@@ -0,0 +1,38 @@
+"""Bar interval helpers and the history limits yfinance applies to them."""
+from datetime import timedelta
+
+
+def interval_to_timedelta(interval: str) -> timedelta:
+    """Return the bar length of an interval string such as ``5m`` or ``1h``."""
+    units = {"m": "minutes", "h": "hours", "d": "days"}
+    unit = units.get(interval[-1:])
+    if unit is None or not interval[:-1].isdigit():
+        raise ValueError(f"unsupported interval: {interval}")
+    return timedelta(**{unit: int(interval[:-1])})
+
+
+def max_lookback(interval: str) -> timedelta | None:
+    """Return how far back yfinance serves intraday data for ``interval``."""
+    if interval == "1m":
+        return timedelta(days=7)
+    if interval.endswith("m"):
+        return timedelta(days=60)
+    if interval.endswith("h"):
+        return timedelta(days=730)
+    return None
+
+
+def max_request_span(interval: str) -> timedelta:
+    """Return the longest date range to ask for in a single download.
+
+    Intraday spans stay just inside yfinance's per-request caps. Daily bars
+    have no cap, so they are split into years to give backfills something
+    to parallelise.
+    """
+    if interval == "1m":
+        return timedelta(days=7)
+    if interval.endswith("m"):
+        return timedelta(days=59)
+    if interval.endswith("h"):
+        return timedelta(days=729)
+    return timedelta(days=365)
@@ -0,0 +1,127 @@
+"""Exchange trading sessions used to skip fetches while the market is closed."""
+import json
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from threading import Lock
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALENDAR_PATH = Path(__file__).with_name("market_holidays.json")
+
+
+def _parse_time(value: str) -> time:
+    hour, minute = value.split(":")
+    return time(int(hour), int(minute))
+
+
+class TradingCalendar:
+    """Regular sessions of a single exchange plus its holidays and early closes.
+
+    Tickers ending in one of ``always_open_suffixes`` (crypto pairs such as
+    ``BTC-USD``) trade around the clock and are never skipped.
+    """
+
+    def __init__(
+        self,
+        tz: str = "America/New_York",
+        open_time: time = time(9, 30),
+        close_time: time = time(16, 0),
+        holidays=(),
+        early_closes=None,
+        always_open_suffixes=("-USD",),
+    ):
+        self.tz = ZoneInfo(tz)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.holidays = {date.fromisoformat(str(d)) for d in holidays}
+        self.early_closes = {
+            date.fromisoformat(str(d)): _parse_time(t) for d, t in (early_closes or {}).items()
+        }
+        self.always_open_suffixes = tuple(always_open_suffixes)
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_CALENDAR_PATH) -> "TradingCalendar":
+        with open(path) as fh:
+            spec = json.load(fh)
+        return cls(
+            tz=spec.get("timezone", "America/New_York"),
+            open_time=_parse_time(spec.get("open", "09:30")),
+            close_time=_parse_time(spec.get("close", "16:00")),
+            holidays=spec.get("holidays", []),
+            early_closes=spec.get("early_closes", {}),
+            always_open_suffixes=spec.get("always_open_suffixes", ["-USD"]),
+        )
+
+    def always_open(self, ticker: str) -> bool:
+        return ticker.endswith(self.always_open_suffixes)
+
+    def session(self, day: date) -> tuple[datetime, datetime] | None:
+        """Return the UTC open and close of ``day``, or ``None`` if closed."""
+        if day.weekday() >= 5 or day in self.holidays:
+            return None
+        close_time = self.early_closes.get(day, self.close_time)
+        opens = datetime.combine(day, self.open_time, self.tz)
+        closes = datetime.combine(day, close_time, self.tz)
+        return opens.astimezone(timezone.utc), closes.astimezone(timezone.utc)
+
+    def sessions(self, start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+        """Return the UTC sessions overlapping ``[start, end)``."""
+        day = start.astimezone(self.tz).date()
+        last = end.astimezone(self.tz).date()
+        found = []
+        while day <= last:
+            session = self.session(day)
+            if session is not None and session[1] > start and session[0] < end:
+                found.append(session)
+            day += timedelta(days=1)
+        return found
+
+    def trading_days(self, start: datetime, end: datetime) -> list[date]:
+        """Return the exchange dates with a session overlapping ``[start, end)``."""
+        return [opens.astimezone(self.tz).date() for opens, _ in self.sessions(start, end)]
+
+    def is_open(self, now: datetime) -> bool:
+        session = self.session(now.astimezone(self.tz).date())
+        return session is not None and session[0] <= now < session[1]
+
+    def last_close(self, now: datetime) -> datetime | None:
+        """Return the close of the latest session that opened by ``now``."""
+        today = now.astimezone(self.tz).date()
+        for offset in range(15):
+            session = self.session(today - timedelta(days=offset))
+            if session is not None and session[0] <= now:
+                return session[1]
+        return None
+
+    def should_fetch(self, ticker: str, last_ts, now: datetime, step: timedelta) -> bool:
+        """Return whether ``ticker`` can have bars newer than ``last_ts``.
+
+        Equities are fetched while the market is open, and afterwards only
+        until the final bar of the last session has been stored.
+        """
+        if self.always_open(ticker) or last_ts is None or self.is_open(now):
+            return True
+        if last_ts.tzinfo is None:
+            last_ts = last_ts.replace(tzinfo=timezone.utc)
+        close = self.last_close(now)
+        return close is not None and last_ts < close - step
+
+
+class SkipCounter:
+    """Count fetches avoided per UTC day and log each finished day's total."""
+
+    def __init__(self):
+        self.day: date | None = None
+        self.count = 0
+        self._lock = Lock()
+
+    def add(self, count: int, now: datetime) -> None:
+        day = now.astimezone(timezone.utc).date()
+        with self._lock:
+            if self.day is not None and day != self.day:
+                logger.info(f"📊 Market closed: avoided {self.count} fetches on {self.day}")
+                self.count = 0
+            self.day = day
+            self.count += count
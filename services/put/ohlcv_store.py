@@ -0,0 +1,151 @@
+"""SQL helpers for writing rows into ``stock_ohlcv``."""
+import csv
+import io
+from datetime import datetime
+from threading import Lock
+
+import pandas as pd
+
+OHLCV_COLUMNS = "ticker, interval, ts, open, high, low, close, volume"
+
+
+def execute_ohlcv_rows(cur, rows) -> int:
+    """Insert rows one statement at a time, skipping existing bars."""
+    insert_query = f"""
+        INSERT INTO stock_ohlcv ({OHLCV_COLUMNS})
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (ticker, interval, ts) DO NOTHING;
+    """
+    cur.executemany(insert_query, rows)
+    return cur.rowcount
+
+
+def copy_ohlcv_rows(cur, rows) -> int:
+    """Stream rows into a staging table via COPY and merge them in one statement.
+
+    Returns the number of rows that were actually new in ``stock_ohlcv``.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in row
+        )
+    buf.seek(0)
+
+    cur.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS stock_ohlcv_staging "
+        "(LIKE stock_ohlcv INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;"
+    )
+    # Earlier calls in the same transaction leave their rows staged
+    cur.execute("TRUNCATE stock_ohlcv_staging;")
+    cur.copy_expert(
+        f"COPY stock_ohlcv_staging ({OHLCV_COLUMNS}) FROM STDIN WITH (FORMAT csv)",
+        buf,
+    )
+    cur.execute(
+        f"""
+        INSERT INTO stock_ohlcv ({OHLCV_COLUMNS})
+        SELECT {OHLCV_COLUMNS} FROM stock_ohlcv_staging
+        ON CONFLICT (ticker, interval, ts) DO NOTHING;
+        """
+    )
+    return cur.rowcount
+
+
+def fetch_latest_timestamps(cur, pairs) -> dict:
+    """Return ``{(ticker, interval): MAX(ts)}`` for every pair in one round trip.
+
+    Each pair is resolved with a correlated ``MAX`` so Postgres can answer it
+    from the primary key index instead of aggregating the whole history.
+    Pairs without any stored bars map to ``None``.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return {}
+    cur.execute(
+        """
+        SELECT k.ticker, k.interval, (
+            SELECT MAX(s.ts) FROM stock_ohlcv s
+            WHERE s.ticker = k.ticker AND s.interval = k.interval
+        )
+        FROM unnest(%s::text[], %s::text[]) AS k(ticker, interval)
+        """,
+        ([t for t, _ in pairs], [i for _, i in pairs]),
+    )
+    return {(ticker, interval): ts for ticker, interval, ts in cur.fetchall()}
+
+
+def fetch_bars(cur, ticker: str, interval: str, since=None) -> pd.DataFrame:
+    """Return stored bars at or after ``since`` as a yfinance-style frame."""
+    cur.execute(
+        """
+        SELECT ts, open, high, low, close, volume FROM stock_ohlcv
+        WHERE ticker = %s AND interval = %s AND (%s::timestamptz IS NULL OR ts >= %s)
+        ORDER BY ts
+        """,
+        (ticker, interval, since, since),
+    )
+    df = pd.DataFrame(
+        cur.fetchall(), columns=["Datetime", "Open", "High", "Low", "Close", "Volume"]
+    )
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("Datetime"), utc=True))
+    return df.astype(float)
+
+
+def as_utc(ts) -> datetime:
+    """Return ``ts`` as an aware UTC datetime, treating naive values as UTC."""
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return ts.to_pydatetime()
+
+
+class WatermarkCache:
+    """In-process record of the latest stored bar per ``(ticker, interval)``.
+
+    Unknown pairs are fetched in a single batch through ``loader`` and then
+    kept current by :meth:`advance` after every successful insert, so steady
+    state cycles never query the database for watermarks.
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._values: dict = {}
+        self._lock = Lock()
+
+    def get_many(self, pairs) -> dict:
+        pairs = list(pairs)
+        with self._lock:
+            missing = [p for p in pairs if p not in self._values]
+        if missing:
+            loaded = self.loader(missing)
+            with self._lock:
+                for pair in missing:
+                    ts = loaded.get(pair)
+                    self._values.setdefault(pair, as_utc(ts) if ts is not None else None)
+        with self._lock:
+            return {pair: self._values[pair] for pair in pairs}
+
+    def peek(self, ticker: str, interval: str):
+        with self._lock:
+            return self._values.get((ticker, interval))
+
+    def advance(self, ticker: str, interval: str, ts) -> None:
+        """Move the watermark forward to ``ts`` if it is newer."""
+        if ts is None:
+            return
+        ts = as_utc(ts)
+        with self._lock:
+            current = self._values.get((ticker, interval))
+            if current is None or ts > current:
+                self._values[(ticker, interval)] = ts
+
+    def invalidate(self, ticker: str | None = None, interval: str | None = None) -> None:
+        """Forget cached watermarks so the next lookup reloads them."""
+        with self._lock:
+            for key in list(self._values):
+                if (ticker is None or key[0] == ticker) and (
+                    interval is None or key[1] == interval
+                ):
+                    del self._values[key]
@@ -0,0 +1,148 @@
+"""Market data sources for the put service.
+
+Every provider returns frames shaped like ``yf.download``: one row per bar
+and ``(Price, Ticker)`` columns, so the rest of the pipeline does not care
+where the bars came from.
+"""
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+OHLCV_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def synthetic_tickers(count: int) -> list[str]:
+    """Return ``count`` made-up ticker names for load testing."""
+    return [f"SYN{n:05d}" for n in range(count)]
+
+
+class MarketDataProvider:
+    """Base class for sources of OHLCV bars."""
+
+    name: str = "base"
+
+    @classmethod
+    def from_env(cls) -> "MarketDataProvider":
+        return cls()
+
+    def download(self, tickers, interval: str, start=None, end=None) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def download(self, tickers, interval: str, start=None, end=None) -> pd.DataFrame:
+        return yf.download(
+            tickers=tickers,
+            start=start,
+            end=end,
+            interval=interval,
+            auto_adjust=False,
+            progress=False,
+        )
+
+
+class ReplayProvider(MarketDataProvider):
+    """Replay OHLCV bars from local CSV or Parquet files.
+
+    ``path`` is a single file or a directory of ``<TICKER>.csv`` /
+    ``<TICKER>.parquet`` files, optionally split into one subdirectory per
+    interval. Files need a timestamp index (first column for CSV) and
+    Open/High/Low/Close/Volume columns. Tickers without their own file are
+    served one of the loaded series, so one sample can stand in for any
+    number of synthetic symbols.
+
+    With ``speed`` > 0 a replay clock starts at the first bar when the
+    provider is created and runs ``speed`` times faster than wall time; only
+    bars up to the replay clock are served. ``speed`` 0 serves everything.
+    """
+
+    name = "replay"
+
+    def __init__(self, path, speed: float = 0.0, clock=time.monotonic):
+        self.path = Path(path)
+        self.speed = speed
+        self.clock = clock
+        self.started = clock()
+        self._series: dict[str, dict[str, pd.DataFrame]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ReplayProvider":
+        path = os.getenv("REPLAY_PATH")
+        if not path:
+            raise ValueError("REPLAY_PATH must be set for the replay provider")
+        return cls(path, speed=float(os.getenv("REPLAY_SPEED", "0")))
+
+    def download(self, tickers, interval: str, start=None, end=None) -> pd.DataFrame:
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        series = self._load(interval)
+        names = sorted(series)
+        if not names:
+            return pd.DataFrame()
+
+        upper = self._replay_now(series)
+        frames = {}
+        for position, ticker in enumerate(tickers):
+            df = series.get(ticker)
+            if df is None:
+                df = series[names[position % len(names)]]
+            mask = np.ones(len(df), dtype=bool)
+            if start is not None:
+                mask &= df.index >= _as_utc(start)
+            if end is not None:
+                mask &= df.index < _as_utc(end)
+            if upper is not None:
+                mask &= df.index <= upper
+            frames[ticker] = df.loc[mask]
+
+        df = pd.concat(frames, axis=1, names=["Ticker", "Price"])
+        return df.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+
+    def _replay_now(self, series) -> pd.Timestamp | None:
+        if self.speed <= 0:
+            return None
+        origin = min(df.index[0] for df in series.values() if not df.empty)
+        elapsed = (self.clock() - self.started) * self.speed
+        return origin + pd.Timedelta(seconds=elapsed)
+
+    def _load(self, interval: str) -> dict[str, pd.DataFrame]:
+        if interval not in self._series:
+            root = self.path / interval if (self.path / interval).is_dir() else self.path
+            files = [root] if root.is_file() else sorted(root.glob("*"))
+            self._series[interval] = {
+                f.stem: _read_bars(f) for f in files if f.suffix in (".csv", ".parquet")
+            }
+        return self._series[interval]
+
+
+def _read_bars(path: Path) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, index_col=0)
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.index, utc=True), name="Datetime")
+    return df[[c for c in OHLCV_FIELDS if c in df.columns]].sort_index()
+
+
+def _as_utc(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+PROVIDERS = {
+    YFinanceProvider.name: YFinanceProvider,
+    ReplayProvider.name: ReplayProvider,
+}
+
+
+def get_provider(name: str) -> MarketDataProvider:
+    cls = PROVIDERS.get(name)
+    if cls is None:
+        raise ValueError(f"unsupported market data provider: {name}")
+    return cls.from_env()
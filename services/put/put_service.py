@@ -1,16 +1,94 @@
 # app/services/put_service.py
 import os
+import asyncio
+import heapq
 import logging
 import argparse
 import time
 from datetime import datetime, timedelta, timezone
-from pubsub_wrapper import PubSubClient, load_config, configure_json_logger
-import yfinance as yf
+from pubsub_wrapper import (
+    ConnectionPool,
+    PubSubClient,
+    configure_json_logger,
+    counter,
+    histogram,
+    load_config,
+    start_metrics_server,
+)
 import psycopg2
-import pandas as pd
+from psycopg2.pool import PoolError
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Semaphore, Lock
-from collections import deque
+
+try:  # allow running as a script without package context
+    from .async_pipeline import Pipeline  # type: ignore
+    from .frames import (  # type: ignore
+        bars_after,
+        fill_missing_values,
+        frame_index,
+        frame_to_bars,
+        frame_to_rows,
+        resample_ohlcv,
+        rows_update,
+        split_batch_frame,
+    )
+    from .gaps import (  # type: ignore
+        find_gaps,
+        mark_refetch_attempt,
+        open_gaps,
+        record_gaps,
+        scan_pair,
+    )
+    from .intervals import interval_to_timedelta, max_lookback  # type: ignore
+    from .ohlcv_store import (  # type: ignore
+        WatermarkCache,
+        copy_ohlcv_rows,
+        execute_ohlcv_rows,
+        fetch_bars,
+        fetch_latest_timestamps,
+    )
+    from .market_calendar import (  # type: ignore
+        DEFAULT_CALENDAR_PATH,
+        SkipCounter,
+        TradingCalendar,
+    )
+    from .providers import get_provider, synthetic_tickers  # type: ignore
+    from .rate_limit import TokenBucket  # type: ignore
+    from .spool import Spool  # type: ignore
+except Exception:  # pragma: no cover - fallback for Docker build
+    from async_pipeline import Pipeline  # type: ignore
+    from frames import (  # type: ignore
+        bars_after,
+        fill_missing_values,
+        frame_index,
+        frame_to_bars,
+        frame_to_rows,
+        resample_ohlcv,
+        rows_update,
+        split_batch_frame,
+    )
+    from gaps import (  # type: ignore
+        find_gaps,
+        mark_refetch_attempt,
+        open_gaps,
+        record_gaps,
+        scan_pair,
+    )
+    from intervals import interval_to_timedelta, max_lookback  # type: ignore
+    from ohlcv_store import (  # type: ignore
+        WatermarkCache,
+        copy_ohlcv_rows,
+        execute_ohlcv_rows,
+        fetch_bars,
+        fetch_latest_timestamps,
+    )
+    from market_calendar import (  # type: ignore
+        DEFAULT_CALENDAR_PATH,
+        SkipCounter,
+        TradingCalendar,
+    )
+    from providers import get_provider, synthetic_tickers  # type: ignore
+    from rate_limit import TokenBucket  # type: ignore
+    from spool import Spool  # type: ignore
 
 configure_json_logger()
 logger = logging.getLogger(__name__)
@@ -23,8 +101,12 @@ config = load_config(ENV)
 
 parser = argparse.ArgumentParser(description="Price update service")
 parser.add_argument("-interval", help="interval to process")
+parser.add_argument(
+    "-intervals", help="comma separated intervals to schedule from one process"
+)
 args, _ = parser.parse_known_args()
 SERVICE_INTERVAL = args.interval or os.getenv("INTERVAL")
+SERVICE_INTERVALS = args.intervals or os.getenv("INTERVALS")
 
 bus = PubSubClient(config.get("redis_url"))
 
@@ -35,184 +117,379 @@ DB_CONFIG = {
     "host": config["PGHOST"],
     "port": int(config["PGPORT"]),
 }
+db = ConnectionPool(DB_CONFIG, maxconn=int(os.getenv("DB_POOL_MAX", "5")), name="put")
 
 symbols = config["symbols"]
-api_semaphore = Semaphore(1)  # Single API call at a time for yfinance stability
+provider = get_provider(os.getenv("MARKET_DATA_PROVIDER", "yfinance"))
+
+# Load testing: replace the configured tickers with N synthetic ones per interval
+REPLAY_SYMBOLS = int(os.getenv("REPLAY_SYMBOLS", "0"))
+if REPLAY_SYMBOLS:
+    symbols = [
+        (ticker, interval)
+        for interval in sorted({i for _, i in symbols})
+        for ticker in synthetic_tickers(REPLAY_SYMBOLS)
+    ]
+# Downloads are split into chunks fetched in parallel under a shared rate limit
+FETCH_CHUNK_SIZE = int(os.getenv("FETCH_CHUNK_SIZE", "50"))
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "2"))
+fetch_limiter = TokenBucket(
+    float(os.getenv("FETCH_RATE", "1")), int(os.getenv("FETCH_BURST", "2"))
+)
+
+# Tickers whose watermarks are within this many bars share one download
+FETCH_BUCKET_SPAN_BARS = int(os.getenv("FETCH_BUCKET_SPAN_BARS", "30"))
+
+# Frames with at least this many rows are loaded via COPY instead of executemany
+BULK_INSERT_THRESHOLD = int(os.getenv("BULK_INSERT_THRESHOLD", "500"))
+
+# Coarser intervals built from stored 1m bars after each 1m run instead of downloaded
+RESAMPLE_BASE_INTERVAL = "1m"
+RESAMPLE_INTERVALS = [
+    i.strip() for i in os.getenv("RESAMPLE_INTERVALS", "").split(",") if i.strip()
+]
+
+# "ticker" publishes one stock.updated event per ticker, "batch" one per run
+EVENT_MODE = os.getenv("EVENT_MODE", "ticker")
+
+# Frames with at most this many bars embed them in stock.updated (0 disables)
+INLINE_BARS_MAX = int(os.getenv("INLINE_BARS_MAX", "0"))
+
+# Equity tickers are skipped outside exchange sessions; "-USD" pairs always run
+MARKET_HOURS_ONLY = os.getenv("MARKET_HOURS_ONLY", "true").lower() == "true"
+trading_calendar = TradingCalendar.from_file(
+    os.getenv("MARKET_CALENDAR_PATH", DEFAULT_CALENDAR_PATH)
+)
+skipped_fetches = SkipCounter()
+
+# "threads" runs a cycle with thread pools, "async" as an asyncio stage pipeline
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "threads")
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
+# Index missing bars after every cycle and refetch up to GAP_REFETCH_PER_RUN of them
+GAP_REPAIR = os.getenv("GAP_REPAIR", "false").lower() == "true"
+GAP_REFETCH_PER_RUN = int(os.getenv("GAP_REFETCH_PER_RUN", "10"))
+GAP_REFETCH_ATTEMPTS = int(os.getenv("GAP_REFETCH_ATTEMPTS", "3"))
+
+# Prometheus endpoint for the metrics below; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+run_seconds = histogram("put_run_seconds", "Duration of a put cycle", ("interval",))
+fetch_seconds = histogram("put_fetch_seconds", "Provider download latency", ("interval",))
+fetch_wait_seconds = histogram(
+    "put_fetch_rate_limit_wait_seconds", "Time downloads waited on the rate limiter", ("interval",)
+)
+fetch_errors = counter("put_fetch_errors_total", "Failed provider downloads", ("interval",))
+rows_filtered = counter(
+    "put_rows_filtered_total", "Downloaded rows dropped at or before the watermark", ("interval",)
+)
+rows_sent = counter("put_rows_sent_total", "Rows sent to Postgres", ("interval",))
+rows_inserted_total = counter("put_rows_inserted_total", "New rows written to stock_ohlcv", ("interval",))
+rows_spooled = counter("put_rows_spooled_total", "Rows spooled while Postgres was down", ("interval",))
+events_published = counter("put_events_published_total", "stock.updated events published", ("event_type",))
+
+# Rows that cannot be written while Postgres is unavailable are spooled here
+SPOOL_DIR = os.getenv("SPOOL_DIR")
+spool = (
+    Spool(SPOOL_DIR, int(os.getenv("SPOOL_SEGMENT_BYTES", str(64 * 1024 * 1024))))
+    if SPOOL_DIR
+    else None
+)
+
+
+def load_watermarks(pairs):
+    """Fetch the latest stored timestamp for many (ticker, interval) pairs at once."""
+    with db.connection() as conn:
+        cur = conn.cursor()
+        result = fetch_latest_timestamps(cur, pairs)
+        cur.close()
+    return result
 
 
-def fill_missing_values(df: pd.DataFrame) -> pd.DataFrame:
-    """Forward/back fill NaN values for OHLCV columns."""
-    if df is None or df.empty:
-        return df
+watermarks = WatermarkCache(load_watermarks)
+
 
-    df = df.copy()
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
-        if col in df.columns:
-            df.loc[:, col] = pd.Series(df[col]).ffill().bfill()
+def load_bars(ticker, interval, since=None):
+    with db.connection() as conn:
+        cur = conn.cursor()
+        df = fetch_bars(cur, ticker, interval, since)
+        cur.close()
     return df
 
 
-def get_latest_timestamp(ticker, interval):
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT MAX(ts) FROM stock_ohlcv WHERE ticker = %s AND interval = %s",
-        (ticker, interval),
-    )
-    result = cur.fetchone()[0]
-    cur.close()
-    conn.close()
-    return result
+def ohlcv_rows(ticker, interval, df, after=None) -> list[tuple]:
+    """Fill gaps in ``df`` and convert its bars newer than ``after`` to rows.
 
-
-def insert_ohlcv_records(ticker, interval, df):
+    Passing the stored watermark as ``after`` keeps rows the database
+    already holds from being sent only to be dropped by ``ON CONFLICT``.
+    """
     if df is None or df.empty:
         logger.info(f"⏭ Skipped (no data): {ticker} ({interval})")
-        return 0
+        return []
+
+    filled = fill_missing_values(df)
+    fresh = bars_after(filled, after)
+    if len(fresh) < len(filled):
+        rows_filtered.labels(interval).inc(len(filled) - len(fresh))
+    if fresh.empty:
+        logger.info(f"⏭ Skipped (nothing after {after}): {ticker} ({interval})")
+        return []
 
-    df = fill_missing_values(df.copy())
+    rows = frame_to_rows(ticker, interval, fresh)
+    if not rows:
+        logger.info(f"⏭ Skipped (no parsable rows): {ticker} ({interval})")
+    return rows
 
-    if isinstance(df.index, pd.MultiIndex):
-        df = df.reset_index(level=0)
 
-    df = df.reset_index()
+def write_ohlcv_rows(ticker, interval, rows, bulk: bool | None = None) -> int:
+    """Write ``rows``, spooling them if the database is unreachable."""
+    if not rows:
+        return 0
+    if bulk is None:
+        bulk = len(rows) >= BULK_INSERT_THRESHOLD
 
-    def extract_scalar_timestamp(row):
-        for key in row.keys():
-            if (isinstance(key, tuple) and key[0] in ("Datetime", "Date", "index")) or (
-                isinstance(key, str) and key in ("Datetime", "Date", "index")
-            ):
-                ts = row[key]
-                if isinstance(ts, (pd.Series, pd.DataFrame)):
-                    logger.debug(f"Row[{key}] is not scalar: {ts}")
-                    continue
-                if pd.notna(ts):
-                    ts = pd.to_datetime(ts)
-                    return ts.to_pydatetime() if hasattr(ts, "to_pydatetime") else ts
+    try:
+        with db.connection() as conn:
+            cur = conn.cursor()
+            if bulk:
+                rows_inserted = copy_ohlcv_rows(cur, rows)
+            else:
+                rows_inserted = execute_ohlcv_rows(cur, rows)
+            cur.close()
+        rows_sent.labels(interval).inc(len(rows))
+    except (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError) as e:
+        if spool is None:
+            raise
+        spool.append(rows)
+        rows_spooled.labels(interval).inc(len(rows))
         logger.warning(
-            f"⚠️ No valid timestamp in row: {row.to_dict()} | keys: {list(row.keys())}"
+            f"⚠️ Database unavailable, spooled {len(rows)} rows for {ticker} ({interval}): {e}"
         )
-        raise ValueError("No valid scalar timestamp field found in row")
+        rows_inserted = 0
+    rows_inserted_total.labels(interval).inc(rows_inserted)
+    watermarks.advance(ticker, interval, max(row[2] for row in rows))
+    return rows_inserted
 
-    def extract_field(row, field_name):
-        try:
-            if isinstance(row.index, pd.MultiIndex):
-                return row[(field_name, "")] if (field_name, "") in row else None
-            return row[field_name]
-        except Exception:
-            return None
 
-    rows = []
-    for _, row in df.iterrows():
-        try:
-            ts = extract_scalar_timestamp(row)
-            open_ = extract_field(row, "Open")
-            high = extract_field(row, "High")
-            low = extract_field(row, "Low")
-            close = extract_field(row, "Close")
-            volume_val = extract_field(row, "Volume")
-
-            rows.append(
-                (
-                    ticker,
-                    interval,
-                    ts,
-                    float(open_) if pd.notna(open_) else None,
-                    float(high) if pd.notna(high) else None,
-                    float(low) if pd.notna(low) else None,
-                    float(close) if pd.notna(close) else None,
-                    (
-                        int(volume_val)
-                        if pd.notna(volume_val) and not pd.isnull(volume_val)
-                        else None
-                    ),
-                )
-            )
-        except Exception as e:
-            logger.warning(f"⚠️ Skipping row for {ticker} ({interval}): {e}")
+def insert_ohlcv_records(ticker, interval, df, bulk: bool | None = None, after=None):
+    return write_ohlcv_rows(ticker, interval, ohlcv_rows(ticker, interval, df, after), bulk)
 
-    if not rows:
-        logger.info(f"⏭ Skipped (no parsable rows): {ticker} ({interval})")
-        return 0
 
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    insert_query = """
-        INSERT INTO stock_ohlcv (ticker, interval, ts, open, high, low, close, volume)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (ticker, interval, ts) DO NOTHING;
+def plan_fetch_buckets(tickers, interval, start_map, now: datetime | None = None):
+    """Group tickers with similar watermarks into separate download windows.
+
+    Returns ``(start, tickers)`` pairs. Tickers without a watermark share one
+    bucket with no start date; the rest are grouped so a bucket spans at most
+    ``FETCH_BUCKET_SPAN_BARS`` bars, and no bucket reaches further back than
+    the provider serves for the interval.
     """
-    cur.executemany(insert_query, rows)
-    conn.commit()
-    rows_inserted = cur.rowcount
-    cur.close()
-    conn.close()
-    return rows_inserted
+    now = now or datetime.now(timezone.utc)
+    step = interval_to_timedelta(interval)
+    lookback = max_lookback(interval)
+    floor = now - lookback if lookback else None
+
+    buckets = []
+    new = [t for t in tickers if start_map.get(t) is None]
+    if new:
+        buckets.append((None, new))
+
+    known = sorted(
+        (t for t in tickers if start_map.get(t) is not None), key=lambda t: start_map[t]
+    )
+    anchor = None
+    for ticker in known:
+        ts = start_map[ticker]
+        if anchor is None or ts - anchor > step * FETCH_BUCKET_SPAN_BARS:
+            anchor = ts
+            buckets.append((ts, []))
+        buckets[-1][1].append(ticker)
+
+    planned = []
+    for start, members in buckets:
+        if start is not None:
+            start += timedelta(minutes=1)
+            if floor is not None and start < floor:
+                start = floor
+        planned.append((start, members))
+    return planned
+
+
+def plan_fetch_chunks(tickers, interval, start_map):
+    """Split each watermark bucket into downloads of at most FETCH_CHUNK_SIZE tickers."""
+    return [
+        (start, bucket[i : i + FETCH_CHUNK_SIZE])
+        for start, bucket in plan_fetch_buckets(tickers, interval, start_map)
+        for i in range(0, len(bucket), FETCH_CHUNK_SIZE)
+    ]
+
+
+def iter_fetch_chunks(tickers, interval, start_map):
+    """Download chunks concurrently, yielding each chunk's frames as soon as it lands."""
+    chunks = plan_fetch_chunks(tickers, interval, start_map)
+    with ThreadPoolExecutor(
+        max_workers=FETCH_CONCURRENCY, thread_name_prefix=f"fetch-{interval}"
+    ) as executor:
+        futures = [
+            executor.submit(download_batch, chunk, interval, start)
+            for start, chunk in chunks
+        ]
+        for future in as_completed(futures):
+            yield future.result()
 
 
 def fetch_and_store_batch(tickers, interval, start_map):
-    overall_start = None
-    for t in tickers:
-        ts = start_map.get(t)
-        if ts is not None:
-            if overall_start is None or ts < overall_start:
-                overall_start = ts
+    results = {}
+    for chunk_data in iter_fetch_chunks(tickers, interval, start_map):
+        results.update(chunk_data)
+    return results
 
-    if overall_start is not None:
-        overall_start += timedelta(minutes=1)
 
-    logger.info(f"Fetching batch {tickers} ({interval}) starting from {overall_start}")
+def download_batch(tickers, interval, start, end=None):
+    logger.info(f"Fetching batch {tickers} ({interval}) starting from {start}")
 
+    waited = fetch_limiter.acquire()
+    fetch_wait_seconds.labels(interval).observe(waited)
+    started = time.perf_counter()
     try:
-        with api_semaphore:
-            df = yf.download(
-                tickers=tickers,
-                start=overall_start,
-                interval=interval,
-                auto_adjust=False,
-                progress=False,
-            )
+        df = provider.download(tickers, interval, start=start, end=end)
     except Exception as e:
+        fetch_errors.labels(interval).inc()
         logger.warning(
-            f"⚠️ yfinance download issue for batch {tickers} ({interval}): {e}"
+            f"⚠️ {provider.name} download issue for batch {tickers} ({interval}): {e}"
         )
         return {}
+    elapsed = time.perf_counter() - started
+    fetch_seconds.labels(interval).observe(elapsed)
+    logger.info(
+        f"Fetched {len(tickers)} tickers ({interval}) in {elapsed:.2f}s "
+        f"after {waited:.2f}s rate limit wait"
+    )
 
     if df is None or df.empty:
         logger.info(f"⏭ Skipped (no data): batch {tickers} ({interval})")
         return {}
 
-    results = {}
-    if df.columns.nlevels == 1:
-        # yfinance omits the ticker level when only one ticker is requested
-        results[tickers[0]] = fill_missing_values(df)
-    else:
-        for ticker in tickers:
-            if ticker in df.columns.get_level_values(1):
-                df_ticker = df.xs(ticker, axis=1, level=1).copy()
-                results[ticker] = fill_missing_values(df_ticker)
-            else:
-                logger.warning(
-                    f"⚠️ Ticker '{ticker}' not found in data columns for batch {tickers} ({interval})"
-                )
-                results[ticker] = pd.DataFrame()
+    return split_batch_frame(df, tickers, interval)
 
-    return results
+
+def build_update(ticker, interval, df, rows_inserted, prev_ts=None) -> dict:
+    """Describe an insert of ``rows_inserted`` new bars from ``df``.
+
+    Only bars after the previous watermark (``prev_ts``) count: downloads
+    overlap the stored series, and ``first_ts``/``last_ts`` must span just
+    the written bars. Small updates also carry those bars and ``prev_ts`` so
+    consumers can extend their cached window without reading them back.
+    """
+    update = {"ticker": ticker, "interval": interval, "new_rows": rows_inserted}
+    fresh = bars_after(df, prev_ts)
+    if 0 < len(fresh) <= INLINE_BARS_MAX and prev_ts is not None:
+        update["prev_ts"] = prev_ts
+        update["bars"] = frame_to_bars(fill_missing_values(df), after=prev_ts)
+    idx = frame_index(fresh).dropna()
+    update["first_ts"] = idx.min() if len(idx) else None
+    update["last_ts"] = idx.max() if len(idx) else None
+    return update
+
+
+def announce(update):
+    """Publish a per-ticker ``stock.updated`` event unless running in batch mode."""
+    if EVENT_MODE == "batch":
+        return
+    bus.publish("stock.updated", "stock.updated", update)
+    events_published.labels("stock.updated").inc()
 
 
 def insert_and_publish(ticker, interval, df):
-    rows_inserted = insert_ohlcv_records(ticker, interval, df)
-    if rows_inserted > 0:
-        bus.publish(
-            "stock.updated",
-            "stock.updated",
-            {"ticker": ticker, "interval": interval, "new_rows": rows_inserted},
-        )
-        logger.info(
-            f"✅ Success: {ticker} ({interval}) - Inserted {rows_inserted} new rows"
-        )
-    else:
+    """Insert ``df`` and announce the new rows.
+
+    Returns the update from :func:`build_update` so batch mode can publish
+    it with the rest of the run, or ``None`` when nothing was inserted.
+    """
+    prev_ts = watermarks.peek(ticker, interval)
+    rows_inserted = insert_ohlcv_records(ticker, interval, df, after=prev_ts)
+    if rows_inserted <= 0:
         logger.info(f"⏭ No new rows to insert for {ticker} ({interval})")
+        return None
+
+    update = build_update(ticker, interval, df, rows_inserted, prev_ts)
+    announce(update)
+    logger.info(
+        f"✅ Success: {ticker} ({interval}) - Inserted {rows_inserted} new rows"
+    )
+    return update
+
+
+def load_spooled(rows):
+    """Bulk-load spooled rows in one transaction and announce every pair.
+
+    Spooled rows were never announced, so each pair is announced even when
+    its rows are already stored, as on a re-drain after a failed publish.
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault((row[0], row[1]), []).append(row)
+
+    with db.connection() as conn:
+        cur = conn.cursor()
+        inserted = {pair: copy_ohlcv_rows(cur, group) for pair, group in groups.items()}
+        cur.close()
+
+    updates = []
+    for (ticker, interval), count in inserted.items():
+        update = rows_update(ticker, interval, groups[(ticker, interval)], count)
+        announce(update)
+        updates.append(update)
+    if EVENT_MODE == "batch":
+        publish_updates(updates)
+
+
+def drain_spool():
+    """Load any spooled rows, leaving them on disk if the database is still down."""
+    if spool is None:
+        return
+    try:
+        spool.drain(load_spooled)
+    except (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError) as e:
+        logger.warning(f"⚠️ Spool not drained, database still unavailable: {e}")
+
+
+def publish_updates(updates):
+    """Publish every update of a run as a single batch ``stock.updated`` event."""
+    if not updates:
+        return
+    bus.publish("stock.updated", "stock.updated.batch", {"updates": updates})
+    events_published.labels("stock.updated.batch").inc()
+    logger.info(f"✅ Published batch stock.updated with {len(updates)} updates")
+
+
+def resample_from_base(tickers, now: datetime | None = None):
+    """Build ``RESAMPLE_INTERVALS`` bars for ``tickers`` from their stored 1m bars.
+
+    Only buckets after the latest stored bar of each coarser interval are
+    rebuilt, and pairs whose next bucket cannot have closed yet are skipped
+    without touching the database. Returns the updates that were written.
+    """
+    now = now or datetime.now(timezone.utc)
+    updates = []
+    base_step = interval_to_timedelta(RESAMPLE_BASE_INTERVAL)
+    pairs = [(t, i) for i in RESAMPLE_INTERVALS for t in tickers]
+    latest = watermarks.get_many(pairs)
+    for ticker, interval in pairs:
+        step = interval_to_timedelta(interval)
+        since = latest[(ticker, interval)]
+        if since is not None and now < since + 2 * step:
+            continue
+        try:
+            base = load_bars(ticker, RESAMPLE_BASE_INTERVAL, since + step if since else None)
+            bars = resample_ohlcv(base, step, base_step)
+            if bars.empty:
+                logger.info(f"⏭ No complete {interval} bars to resample for {ticker}")
+                continue
+            update = insert_and_publish(ticker, interval, bars)
+            if update:
+                updates.append(update)
+        except Exception as e:
+            logger.error(f"❌ Error resampling {ticker} to {interval}: {e}")
+    return updates
 
 
 def next_run_time(interval: str, now: datetime | None = None) -> datetime:
@@ -232,7 +509,7 @@ def next_run_time(interval: str, now: datetime | None = None) -> datetime:
         next_time = base + timedelta(hours=step)
     elif interval.endswith("d"):
         step = int(interval[:-1])
-        base = datetime(now.year, now.month, now.day)
+        base = datetime(now.year, now.month, now.day, tzinfo=now.tzinfo)
         next_time = base + timedelta(days=step)
         if next_time <= now:
             next_time += timedelta(days=step)
@@ -254,32 +531,299 @@ def sleep_until_next(interval: str):
         time.sleep(wait)
 
 
-def run(target_interval: str):
+def plan_run(target_interval: str):
+    """Return the tickers to fetch for a cycle and their watermarks, or ``None``."""
     tickers = [t for t, i in symbols if i == target_interval]
     if not tickers:
         logger.warning(f"No tickers configured for interval {target_interval}")
-        return
+        return None
+
+    if target_interval in RESAMPLE_INTERVALS:
+        base = {t for t, i in symbols if i == RESAMPLE_BASE_INTERVAL}
+        resampled = [t for t in tickers if t in base]
+        if resampled:
+            logger.info(
+                f"⏭ {target_interval} bars for {resampled} are resampled from {RESAMPLE_BASE_INTERVAL}"
+            )
+            tickers = [t for t in tickers if t not in base]
+        if not tickers:
+            return None
+
+    latest = watermarks.get_many((t, target_interval) for t in tickers)
+    start_map = {t: latest[(t, target_interval)] for t in tickers}
+
+    if MARKET_HOURS_ONLY:
+        now = datetime.now(timezone.utc)
+        step = interval_to_timedelta(target_interval)
+        closed = [
+            t for t in tickers
+            if not trading_calendar.should_fetch(t, start_map[t], now, step)
+        ]
+        skipped_fetches.add(len(closed), now)
+        if closed:
+            logger.info(f"⏭ Market closed, skipping {closed} ({target_interval})")
+            tickers = [t for t in tickers if t not in closed]
+            start_map = {t: start_map[t] for t in tickers}
+        if not tickers:
+            return None
+    return tickers, start_map
+
+
+def repair_gaps(target_interval: str, tickers, now: datetime | None = None) -> list:
+    """Index new gaps for ``tickers`` and refetch the newest ones still servable.
+
+    Refetched bars are announced like any other insert; the updates are
+    returned for batch mode.
+    """
+    now = now or datetime.now(timezone.utc)
+    step = interval_to_timedelta(target_interval)
+    lookback = max_lookback(target_interval)
+    with db.connection() as conn:
+        cur = conn.cursor()
+        found = sum(scan_pair(cur, trading_calendar, t, target_interval) for t in tickers)
+        pending = open_gaps(
+            cur,
+            tickers,
+            target_interval,
+            GAP_REFETCH_ATTEMPTS,
+            since=now - lookback if lookback else None,
+            limit=GAP_REFETCH_PER_RUN,
+        )
+        for ticker, gap_start, _, _ in pending:
+            mark_refetch_attempt(cur, ticker, target_interval, gap_start)
+        cur.close()
+    if found:
+        logger.info(f"⚠️ Found {found} new gaps for {target_interval}")
+
+    updates = []
+    for ticker, gap_start, gap_end, attempts in pending:
+        end = gap_end + step
+        frames = download_batch([ticker], target_interval, gap_start, end)
+        rows = ohlcv_rows(ticker, target_interval, frames.get(ticker))
+        filled = write_ohlcv_rows(ticker, target_interval, rows)
+        if filled > 0:
+            update = rows_update(ticker, target_interval, rows, filled)
+            announce(update)
+            updates.append(update)
+        with db.connection() as conn:
+            cur = conn.cursor()
+            remaining = find_gaps(cur, trading_calendar, ticker, target_interval, gap_start, end)
+            record_gaps(cur, ticker, target_interval, gap_start, end, remaining, attempts + 1)
+            cur.close()
+        logger.info(
+            f"✅ Refetched gap {gap_start} - {gap_end} for {ticker} ({target_interval}): "
+            f"{filled} rows filled, {sum(g[2] for g in remaining)} bars still missing"
+        )
+    return updates
+
+
+def scan_resampled(tickers):
+    """Index gaps in the ``RESAMPLE_INTERVALS`` series built for ``tickers``.
+
+    They are scanned on the resampler's bucket grid and never refetched,
+    since provider bars would mix sources into them.
+    """
+    with db.connection() as conn:
+        cur = conn.cursor()
+        found = {
+            interval: sum(
+                scan_pair(cur, trading_calendar, t, interval, resampled=True) for t in tickers
+            )
+            for interval in RESAMPLE_INTERVALS
+        }
+        cur.close()
+    for interval, count in found.items():
+        if count:
+            logger.info(f"⚠️ Found {count} new gaps for resampled {interval}")
+
+
+def finish_run(target_interval: str, tickers, updates):
+    if target_interval == RESAMPLE_BASE_INTERVAL and RESAMPLE_INTERVALS:
+        updates.extend(resample_from_base(tickers))
+
+    if EVENT_MODE == "batch":
+        publish_updates(updates)
+
+    if GAP_REPAIR:
+        try:
+            repaired = repair_gaps(target_interval, tickers)
+            if EVENT_MODE == "batch":
+                publish_updates(repaired)
+            if target_interval == RESAMPLE_BASE_INTERVAL and RESAMPLE_INTERVALS:
+                scan_resampled(tickers)
+        except Exception as e:
+            logger.error(f"❌ Gap repair failed for {target_interval}: {e}")
+
+
+def run(target_interval: str):
+    with run_seconds.labels(target_interval).time():
+        if PIPELINE_MODE == "async":
+            asyncio.run(run_async(target_interval))
+        else:
+            run_threads(target_interval)
 
-    start_map = {t: get_latest_timestamp(t, target_interval) for t in tickers}
 
-    batch_data = fetch_and_store_batch(tickers, target_interval, start_map)
+def run_threads(target_interval: str):
+    drain_spool()
+    planned = plan_run(target_interval)
+    if planned is None:
+        return
+    tickers, start_map = planned
 
+    updates = []
     with ThreadPoolExecutor(max_workers=5) as executor:
         futures = []
-        for ticker in tickers:
-            df_ticker = batch_data.get(ticker)
-            if df_ticker is None or df_ticker.empty:
-                logger.info(f"⏭ Skipped (no data): {ticker} ({target_interval})")
-                continue
-            futures.append(
-                executor.submit(insert_and_publish, ticker, target_interval, df_ticker)
-            )
+        # Inserts for a chunk start while later chunks are still downloading
+        for chunk_data in iter_fetch_chunks(tickers, target_interval, start_map):
+            for ticker, df_ticker in chunk_data.items():
+                if df_ticker is None or df_ticker.empty:
+                    logger.info(f"⏭ Skipped (no data): {ticker} ({target_interval})")
+                    continue
+                futures.append(
+                    executor.submit(insert_and_publish, ticker, target_interval, df_ticker)
+                )
         for future in as_completed(futures):
             try:
-                future.result()
+                update = future.result()
+                if update:
+                    updates.append(update)
             except Exception as e:
                 logger.error(f"❌ Error during insert for ticker batch: {e}")
 
+    finish_run(target_interval, tickers, updates)
+
+
+async def run_async(target_interval: str):
+    """Run one cycle as fetch, transform, insert and publish asyncio stages.
+
+    Blocking calls (downloads, psycopg2, Redis) run in worker threads via
+    ``asyncio.to_thread`` and the stages are joined by bounded queues, so
+    downloads, inserts and publishes for different chunks overlap.
+    """
+    await asyncio.to_thread(drain_spool)
+    planned = await asyncio.to_thread(plan_run, target_interval)
+    if planned is None:
+        return
+    tickers, start_map = planned
+
+    async def fetch(chunk):
+        start, batch = chunk
+        frames = await asyncio.to_thread(download_batch, batch, target_interval, start)
+        return list(frames.items())
+
+    async def transform(item):
+        ticker, df = item
+        after = watermarks.peek(ticker, target_interval)
+        try:
+            rows = await asyncio.to_thread(ohlcv_rows, ticker, target_interval, df, after)
+        except Exception as e:
+            logger.error(f"❌ Error preparing rows for {ticker} ({target_interval}): {e}")
+            return []
+        return [(ticker, df, rows)] if rows else []
+
+    async def insert(item):
+        ticker, df, rows = item
+        prev_ts = watermarks.peek(ticker, target_interval)
+        try:
+            count = await asyncio.to_thread(write_ohlcv_rows, ticker, target_interval, rows)
+        except Exception as e:
+            logger.error(f"❌ Error during insert for {ticker} ({target_interval}): {e}")
+            return []
+        if count <= 0:
+            logger.info(f"⏭ No new rows to insert for {ticker} ({target_interval})")
+            return []
+        return [build_update(ticker, target_interval, df, count, prev_ts)]
+
+    async def publish(update):
+        try:
+            await asyncio.to_thread(announce, update)
+        except Exception as e:
+            logger.error(f"❌ Error publishing update for {update['ticker']}: {e}")
+        logger.info(
+            f"✅ Success: {update['ticker']} ({target_interval}) - Inserted {update['new_rows']} new rows"
+        )
+        return [update]
+
+    pipeline = (
+        Pipeline(PIPELINE_QUEUE_SIZE)
+        .add(fetch, workers=FETCH_CONCURRENCY)
+        .add(transform)
+        .add(insert, workers=db.maxconn)
+        .add(publish)
+    )
+    updates = await pipeline.run(plan_fetch_chunks(tickers, target_interval, start_map))
+    await asyncio.to_thread(finish_run, target_interval, tickers, updates)
+
+
+class IntervalScheduler:
+    """Drive several intervals from one process using a heap of deadlines.
+
+    Every interval gets its own single worker thread, so a slow 1d backfill
+    can only delay later ticks of 1d. A tick that comes due while the
+    previous run of the same interval is still going is skipped. Intervals
+    that come due together share one watermark query, run off the
+    scheduling loop so a slow or failing database only holds up those
+    runs, which then look their watermarks up themselves.
+    """
+
+    def __init__(self, intervals, runner=None, now: datetime | None = None):
+        now = now or datetime.now(timezone.utc)
+        self.runner = runner or run
+        self.deadlines = [(now, interval) for interval in intervals]
+        heapq.heapify(self.deadlines)
+        self.executors = {
+            interval: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"put-{interval}")
+            for interval in intervals
+        }
+        self.prefetcher = ThreadPoolExecutor(
+            max_workers=len(self.executors), thread_name_prefix="put-watermarks"
+        )
+        self.running = {}
+
+    def pop_due(self, now: datetime) -> list[str]:
+        """Return intervals whose deadline has passed and schedule their next tick."""
+        due = []
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, interval = heapq.heappop(self.deadlines)
+            due.append(interval)
+            heapq.heappush(self.deadlines, (next_run_time(interval, now), interval))
+        return due
+
+    def dispatch(self, intervals):
+        ready = []
+        for interval in intervals:
+            future = self.running.get(interval)
+            if future is not None and not future.done():
+                logger.warning(f"⚠️ Previous {interval} run still in progress, skipping tick")
+                continue
+            ready.append(interval)
+        if not ready:
+            return
+        pairs = [(t, i) for t, i in symbols if i in ready]
+        prefetch = self.prefetcher.submit(watermarks.get_many, pairs)
+        for interval in ready:
+            self.running[interval] = self.executors[interval].submit(self._run, interval, prefetch)
+
+    def _run(self, interval: str, prefetch=None):
+        if prefetch is not None:
+            try:
+                prefetch.result()
+            except Exception as e:
+                logger.warning(f"⚠️ Watermark prefetch failed before {interval} run: {e}")
+        try:
+            self.runner(interval)
+        except Exception as e:
+            logger.error(f"❌ Scheduled run failed for {interval}: {e}")
+
+    def run_forever(self):
+        while True:
+            self.dispatch(self.pop_due(datetime.now(timezone.utc)))
+            next_ts = self.deadlines[0][0]
+            wait = (next_ts - datetime.now(timezone.utc)).total_seconds()
+            if wait > 0:
+                logger.info(f"Sleeping {wait:.1f}s until next run at {next_ts}")
+                time.sleep(wait)
+
 
 def run_forever(interval: str):
     run(interval)
@@ -290,8 +834,15 @@ def run_forever(interval: str):
 
 
 if __name__ == "__main__":
-    if not SERVICE_INTERVAL:
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    if SERVICE_INTERVALS:
+        IntervalScheduler(
+            [i.strip() for i in SERVICE_INTERVALS.split(",") if i.strip()]
+        ).run_forever()
+    elif SERVICE_INTERVAL:
+        run_forever(SERVICE_INTERVAL)
+    else:
         raise SystemExit(
-            "INTERVAL must be provided via argument or environment variable"
+            "INTERVAL or INTERVALS must be provided via argument or environment variable"
         )
-    run_forever(SERVICE_INTERVAL)
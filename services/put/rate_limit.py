@@ -0,0 +1,38 @@
+"""Rate limiting for calls to market data providers."""
+import time
+from threading import Lock
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing ``rate`` calls per second.
+
+    Up to ``burst`` unused tokens are saved, so short bursts go out
+    immediately while the long-run rate stays bounded. :meth:`acquire`
+    blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(self.burst)
+        self.updated = clock()
+        self._lock = Lock()
+
+    def acquire(self) -> float:
+        """Take one token, returning how long the caller waited for it."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+            waited += wait
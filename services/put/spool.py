@@ -0,0 +1,169 @@
+"""Durable on-disk buffer for ``stock_ohlcv`` rows that could not be written.
+
+Rows are appended to numbered segment files as length-prefixed, CRC-checked
+binary records. Each record holds the bars of one ticker/interval as a
+timestamp column plus five float columns, so a spooled frame costs about
+48 bytes per bar. :meth:`Spool.drain` replays closed segments oldest first
+and deletes each one once its rows have been loaded.
+"""
+import logging
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"OHLC"
+FRAME = struct.Struct("<4sII")  # magic, payload length, crc32
+HEADER = struct.Struct("<HHI")  # ticker length, interval length, bar count
+SEGMENT_SUFFIX = ".spool"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_rows(ticker: str, interval: str, rows) -> bytes:
+    """Pack rows of one ticker/interval into a record payload."""
+    ticker_bytes = ticker.encode()
+    interval_bytes = interval.encode()
+    ts = np.array([_to_micros(row[2]) for row in rows], dtype="<i8")
+    values = np.array(
+        [[np.nan if v is None else v for v in row[3:8]] for row in rows], dtype="<f8"
+    ).reshape(len(rows), 5)
+    return b"".join(
+        [
+            HEADER.pack(len(ticker_bytes), len(interval_bytes), len(rows)),
+            ticker_bytes,
+            interval_bytes,
+            ts.tobytes(),
+            np.ascontiguousarray(values.T).tobytes(),
+        ]
+    )
+
+
+def decode_rows(payload: bytes) -> list[tuple]:
+    """Unpack a record payload back into ``stock_ohlcv`` row tuples."""
+    ticker_len, interval_len, n = HEADER.unpack_from(payload)
+    offset = HEADER.size
+    ticker = payload[offset : offset + ticker_len].decode()
+    offset += ticker_len
+    interval = payload[offset : offset + interval_len].decode()
+    offset += interval_len
+    ts = np.frombuffer(payload, dtype="<i8", count=n, offset=offset)
+    offset += 8 * n
+    columns = np.frombuffer(payload, dtype="<f8", count=5 * n, offset=offset).reshape(5, n)
+
+    prices = [[None if np.isnan(v) else float(v) for v in col] for col in columns[:4]]
+    volume = [None if np.isnan(v) else int(v) for v in columns[4]]
+    timestamps = [EPOCH + timedelta(microseconds=int(us)) for us in ts]
+    return [
+        (ticker, interval, timestamps[i], prices[0][i], prices[1][i], prices[2][i], prices[3][i], volume[i])
+        for i in range(n)
+    ]
+
+
+def _to_micros(ts) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    delta = ts - EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class Spool:
+    """Append-only segment files under ``directory``.
+
+    Appends go to the newest segment until it grows past ``segment_bytes``.
+    Every append is flushed and fsynced before returning, so rows survive a
+    crash of the service once :meth:`append` has returned.
+    """
+
+    def __init__(self, directory, segment_bytes: int = 64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self._lock = Lock()
+        self._drain_lock = Lock()
+        self._current = None
+        existing = self.segments()
+        self._seq = int(existing[-1].stem) + 1 if existing else 0
+
+    def segments(self) -> list[Path]:
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def append(self, rows) -> None:
+        """Write ``rows`` to the spool, one record per ticker/interval."""
+        groups: dict[tuple[str, str], list] = {}
+        for row in rows:
+            groups.setdefault((row[0], row[1]), []).append(row)
+        records = []
+        for (ticker, interval), group in groups.items():
+            payload = encode_rows(ticker, interval, group)
+            records.append(FRAME.pack(MAGIC, len(payload), zlib.crc32(payload)) + payload)
+
+        with self._lock:
+            fh = self._segment()
+            fh.write(b"".join(records))
+            fh.flush()
+            os.fsync(fh.fileno())
+            if fh.tell() >= self.segment_bytes:
+                self._close_segment()
+
+    def drain(self, loader) -> int:
+        """Pass each segment's rows to ``loader`` in order, deleting loaded segments.
+
+        ``loader`` receives every row of one segment. If it raises, that
+        segment and all later ones are kept for the next attempt. Returns
+        the number of rows handed to ``loader``.
+        """
+        with self._drain_lock:
+            with self._lock:
+                self._close_segment()
+                segments = self.segments()
+
+            drained = 0
+            for path in segments:
+                rows = read_segment(path)
+                if rows:
+                    loader(rows)
+                path.unlink()
+                drained += len(rows)
+                logger.info(f"✅ Drained {len(rows)} spooled rows from {path.name}")
+            return drained
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_segment()
+
+    def _segment(self):
+        if self._current is None:
+            path = self.directory / f"{self._seq:012d}{SEGMENT_SUFFIX}"
+            self._seq += 1
+            self._current = open(path, "ab")
+        return self._current
+
+    def _close_segment(self) -> None:
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+def read_segment(path) -> list[tuple]:
+    """Read every intact record of a segment, ignoring a torn tail."""
+    data = Path(path).read_bytes()
+    rows = []
+    offset = 0
+    while offset + FRAME.size <= len(data):
+        magic, length, crc = FRAME.unpack_from(data, offset)
+        payload = data[offset + FRAME.size : offset + FRAME.size + length]
+        if magic != MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+            break
+        rows.extend(decode_rows(payload))
+        offset += FRAME.size + length
+    if offset != len(data):
+        logger.warning(
+            f"⚠️ Ignoring {len(data) - offset} unreadable bytes at the end of {Path(path).name}"
+        )
+    return rows
@@ -1,8 +1,9 @@
 import importlib
+import json
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pandas as pd
 
@@ -103,6 +104,132 @@ class TestFetchAndStoreBatch(unittest.TestCase):
         assert not result["AAPL"].isna().any().any()
 
 
+    def test_split_fills_batch_in_place_and_returns_views(self):
+        import numpy as np
+        from services.put.frames import split_batch_frame
+        df = make_multi_index_df()
+        df.loc[df.index[1], ("Close", "MSFT")] = float("nan")
+        frames = split_batch_frame(df, ["AAPL", "MSFT"], "1d")
+        assert df[("Close", "MSFT")].tolist() == [1.0, 1.0]
+        assert list(frames["MSFT"].columns) == ["Adj Close", "Close", "High", "Low", "Open", "Volume"]
+        assert frames["MSFT"]["Close"].tolist() == [1.0, 1.0]
+        assert np.shares_memory(frames["AAPL"]["Open"].to_numpy(), df[("Open", "AAPL")].to_numpy())
+
+    def test_split_handles_unevenly_spaced_columns(self):
+        from services.put.frames import split_batch_frame
+        df = make_multi_index_df().drop(columns=[("High", "AAPL")])
+        frames = split_batch_frame(df, ["AAPL", "MSFT"], "1d")
+        assert list(frames["AAPL"].columns) == ["Adj Close", "Close", "Low", "Open", "Volume"]
+        assert len(frames["MSFT"].columns) == 6
+
+class TestPlanFetchBuckets(unittest.TestCase):
+    def test_groups_by_watermark_and_caps_lookback(self):
+        ps = load_put_service()
+        now = datetime(2024, 3, 10, 12, 0, tzinfo=timezone.utc)
+        recent = datetime(2024, 3, 10, 11, 50, tzinfo=timezone.utc)
+        start_map = {
+            'AAPL': recent,
+            'MSFT': recent + ps.timedelta(minutes=2),
+            'LAG': recent - ps.timedelta(hours=3),
+            'OLD': datetime(2024, 1, 1, tzinfo=timezone.utc),
+            'NEW': None,
+        }
+        buckets = ps.plan_fetch_buckets(list(start_map), '1m', start_map, now)
+        assert buckets == [
+            (None, ['NEW']),
+            (now - ps.timedelta(days=7), ['OLD']),
+            (recent - ps.timedelta(hours=3) + ps.timedelta(minutes=1), ['LAG']),
+            (recent + ps.timedelta(minutes=1), ['AAPL', 'MSFT']),
+        ]
+
+    def test_each_bucket_is_downloaded_separately(self):
+        ps = load_put_service()
+        df = make_multi_index_df()
+        start_map = {'AAPL': datetime(2024, 1, 1), 'MSFT': datetime(2020, 1, 1)}
+        with patch('yfinance.download', return_value=df) as mock_dl:
+            result = ps.fetch_and_store_batch(['AAPL', 'MSFT'], '1d', start_map)
+        assert mock_dl.call_count == 2
+        starts = sorted(c.kwargs['start'] for c in mock_dl.call_args_list)
+        assert starts == [datetime(2020, 1, 1, 0, 1), datetime(2024, 1, 1, 0, 1)]
+        assert set(result) == {'AAPL', 'MSFT'}
+
+    def test_interval_to_timedelta(self):
+        ps = load_put_service()
+        assert ps.interval_to_timedelta('5m') == ps.timedelta(minutes=5)
+        assert ps.interval_to_timedelta('1h') == ps.timedelta(hours=1)
+        with self.assertRaises(ValueError):
+            ps.interval_to_timedelta('1wk')
+
+
+class TestReplayProvider(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        index = pd.date_range('2024-01-01', periods=5, freq='min', tz='UTC', name='Datetime')
+        df = pd.DataFrame({'Open': range(5), 'High': range(5), 'Low': range(5),
+                           'Close': range(5), 'Volume': range(5)}, index=index, dtype=float)
+        df.to_csv(f'{self.tmp.name}/AAPL.csv')
+
+    def test_serves_window_and_clones_unknown_tickers(self):
+        from services.put.providers import ReplayProvider
+        from services.put.frames import split_batch_frame
+        provider = ReplayProvider(self.tmp.name)
+        df = provider.download(['AAPL', 'SYN00001'], '1m', start=datetime(2024, 1, 1, 0, 2))
+        assert df.columns.names == ['Price', 'Ticker']
+        frames = split_batch_frame(df, ['AAPL', 'SYN00001'], '1m')
+        assert list(frames['AAPL']['Close']) == [2.0, 3.0, 4.0]
+        pd.testing.assert_frame_equal(frames['AAPL'], frames['SYN00001'])
+
+    def test_replay_clock_limits_bars(self):
+        from services.put.providers import ReplayProvider
+        now = [0.0]
+        provider = ReplayProvider(self.tmp.name, speed=60.0, clock=lambda: now[0])
+        now[0] = 2.0
+        df = provider.download(['AAPL'], '1m')
+        assert len(df) == 3
+
+    def test_unknown_provider_raises(self):
+        from services.put.providers import get_provider
+        with self.assertRaises(ValueError):
+            get_provider('nope')
+
+
+class TestChunkedFetch(unittest.TestCase):
+    def test_buckets_are_split_into_chunks(self):
+        ps = load_put_service()
+        ps.FETCH_CHUNK_SIZE = 2
+        tickers = ['A', 'B', 'C', 'D', 'E']
+        chunks = ps.plan_fetch_chunks(tickers, '1d', {t: None for t in tickers})
+        assert chunks == [(None, ['A', 'B']), (None, ['C', 'D']), (None, ['E'])]
+
+    def test_chunks_are_fetched_under_rate_limit(self):
+        ps = load_put_service()
+        ps.FETCH_CHUNK_SIZE = 1
+        df = make_multi_index_df()
+        with patch.object(ps.fetch_limiter, 'acquire', return_value=0.0) as mock_acquire, \
+             patch('yfinance.download', return_value=df) as mock_dl:
+            chunks = list(ps.iter_fetch_chunks(['AAPL', 'MSFT'], '1d', {'AAPL': None, 'MSFT': None}))
+        assert mock_acquire.call_count == 2
+        assert mock_dl.call_count == 2
+        assert sorted(t for chunk in chunks for t in chunk) == ['AAPL', 'MSFT']
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        from services.put.rate_limit import TokenBucket
+        now = [0.0]
+        sleeps = []
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+        bucket = TokenBucket(rate=2.0, burst=2, clock=lambda: now[0], sleep=sleep)
+        assert bucket.acquire() == 0.0
+        assert bucket.acquire() == 0.0
+        assert bucket.acquire() == 0.5
+        assert sleeps == [0.5]
+
+
 class TestInsertAndPublish(unittest.TestCase):
     def test_publish_on_successful_insert(self):
         ps = load_put_service()
@@ -115,7 +242,13 @@ class TestInsertAndPublish(unittest.TestCase):
             topic, event_type, payload = mock_pub.call_args.args
             assert topic == "stock.updated"
             assert event_type == "stock.updated"
-            assert payload == {"ticker": "AAPL", "interval": "1d", "new_rows": 2}
+            assert payload == {
+                "ticker": "AAPL",
+                "interval": "1d",
+                "new_rows": 2,
+                "first_ts": pd.Timestamp("2024-01-01"),
+                "last_ts": pd.Timestamp("2024-01-02"),
+            }
 
     def test_no_publish_when_no_rows_inserted(self):
         ps = load_put_service()
@@ -132,6 +265,52 @@ class TestInsertAndPublish(unittest.TestCase):
                 ps.insert_and_publish("AAPL", "1d", make_single_level_df())
             mock_pub.assert_not_called()
 
+    def test_batch_mode_returns_update_without_publishing(self):
+        ps = load_put_service()
+        ps.EVENT_MODE = "batch"
+        df = make_single_level_df()
+        with patch.object(ps, "insert_ohlcv_records", return_value=2), \
+             patch.object(ps.bus, "publish") as mock_pub:
+            update = ps.insert_and_publish("AAPL", "1d", df)
+        mock_pub.assert_not_called()
+        assert update == {
+            "ticker": "AAPL",
+            "interval": "1d",
+            "new_rows": 2,
+            "first_ts": pd.Timestamp("2024-01-01"),
+            "last_ts": pd.Timestamp("2024-01-02"),
+        }
+
+    def test_inline_bars_after_previous_watermark(self):
+        ps = load_put_service()
+        ps.INLINE_BARS_MAX = 10
+        ps.watermarks.advance("AAPL", "1d", pd.Timestamp("2024-01-01", tz="UTC"))
+        df = make_single_level_df()
+        df.loc[df.index[1], "Close"] = float("nan")
+        with patch.object(ps, "insert_ohlcv_records", return_value=1), \
+             patch.object(ps.bus, "publish") as mock_pub:
+            ps.insert_and_publish("AAPL", "1d", df)
+        payload = mock_pub.call_args.args[2]
+        assert payload["prev_ts"] == pd.Timestamp("2024-01-01", tz="UTC")
+        assert payload["bars"] == {
+            "ts": [1704153600],
+            "open": [2.0],
+            "high": [2.0],
+            "low": [2.0],
+            "close": [1.0],
+            "volume": [2],
+        }
+
+    def test_update_spans_only_bars_after_watermark(self):
+        ps = load_put_service()
+        ps.INLINE_BARS_MAX = 1
+        prev_ts = pd.Timestamp("2024-01-01", tz="UTC")
+        # the download overlaps the stored bar at the watermark
+        update = ps.build_update("AAPL", "1d", make_single_level_df(), 1, prev_ts)
+        assert update["first_ts"] == update["last_ts"] == pd.Timestamp("2024-01-02")
+        assert update["bars"]["ts"] == [1704153600]
+        assert update["prev_ts"] == prev_ts
+
     def test_publish_error_propagates(self):
         ps = load_put_service()
         with patch.object(ps, "insert_ohlcv_records", return_value=1), \
@@ -159,18 +338,48 @@ class TestFillMissingValues(unittest.TestCase):
         assert not filled.isna().any().any()
 
 
-class TestGetLatestTimestamp(unittest.TestCase):
-    def test_fetches_latest_timestamp(self):
+class TestWatermarks(unittest.TestCase):
+    def test_load_watermarks_single_query(self):
         ps = load_put_service()
         mock_conn = patch('psycopg2.connect').start()
         self.addCleanup(patch.stopall)
         cur = mock_conn.return_value.cursor.return_value
-        cur.fetchone.return_value = [datetime(2024, 1, 1)]
-        ts = ps.get_latest_timestamp('AAPL', '1d')
-        assert ts == datetime(2024, 1, 1)
+        cur.fetchall.return_value = [('AAPL', '1d', datetime(2024, 1, 1)), ('MSFT', '1d', None)]
+        result = ps.load_watermarks([('AAPL', '1d'), ('MSFT', '1d')])
+        assert result == {('AAPL', '1d'): datetime(2024, 1, 1), ('MSFT', '1d'): None}
         cur.execute.assert_called_once()
-        cur.close.assert_called_once()
-        mock_conn.return_value.close.assert_called_once()
+        assert cur.execute.call_args.args[1] == (['AAPL', 'MSFT'], ['1d', '1d'])
+        mock_conn.assert_called_once()
+
+    def test_cache_loads_missing_pairs_once(self):
+        from services.put.ohlcv_store import WatermarkCache
+        loader = MagicMock(return_value={('AAPL', '1m'): datetime(2024, 1, 1)})
+        cache = WatermarkCache(loader)
+        first = cache.get_many([('AAPL', '1m'), ('MSFT', '1m')])
+        second = cache.get_many([('AAPL', '1m'), ('MSFT', '1m')])
+        loader.assert_called_once_with([('AAPL', '1m'), ('MSFT', '1m')])
+        assert first == second
+        assert first[('AAPL', '1m')] == datetime(2024, 1, 1, tzinfo=timezone.utc)
+        assert first[('MSFT', '1m')] is None
+
+    def test_advance_only_moves_forward(self):
+        from services.put.ohlcv_store import WatermarkCache
+        cache = WatermarkCache(MagicMock(return_value={}))
+        cache.advance('AAPL', '1m', pd.Timestamp('2024-01-02', tz='America/New_York'))
+        cache.advance('AAPL', '1m', datetime(2024, 1, 1))
+        assert cache.peek('AAPL', '1m') == datetime(2024, 1, 2, 5, tzinfo=timezone.utc)
+        cache.invalidate(ticker='AAPL')
+        assert cache.peek('AAPL', '1m') is None
+
+    def test_insert_advances_watermark(self):
+        ps = load_put_service()
+        df = pd.DataFrame({'Open':[1.0, 1.0],'High':[2.0, 2.0],'Low':[1.5, 1.5],'Close':[1.8, 1.8],'Volume':[10, 10]},
+                          index=pd.date_range('2024-01-01', periods=2, tz='UTC'))
+        mock_conn = patch('psycopg2.connect').start()
+        self.addCleanup(patch.stopall)
+        mock_conn.return_value.cursor.return_value.rowcount = 2
+        ps.insert_ohlcv_records('AAPL', '1d', df)
+        assert ps.watermarks.peek('AAPL', '1d') == datetime(2024, 1, 2, tzinfo=timezone.utc)
 
 
 class TestInsertOhlcvRecords(unittest.TestCase):
@@ -189,6 +398,225 @@ class TestInsertOhlcvRecords(unittest.TestCase):
         cur.close.assert_called_once()
         mock_conn.return_value.close.assert_called_once()
 
+    def test_large_frames_use_copy(self):
+        ps = load_put_service()
+        n = ps.BULK_INSERT_THRESHOLD
+        df = pd.DataFrame({'Open':[1.0]*n,'High':[2.0]*n,'Low':[0.5]*n,'Close':[1.5]*n,'Volume':[10]*n},
+                          index=pd.date_range('2024-01-01', periods=n, freq='min', tz='UTC'))
+        mock_conn = patch('psycopg2.connect').start()
+        self.addCleanup(patch.stopall)
+        cur = mock_conn.return_value.cursor.return_value
+        cur.rowcount = n
+        inserted = ps.insert_ohlcv_records('AAPL','1m',df)
+        assert inserted == n
+        cur.executemany.assert_not_called()
+        cur.copy_expert.assert_called_once()
+        buf = cur.copy_expert.call_args.args[1]
+        lines = buf.getvalue().splitlines()
+        assert len(lines) == n
+        assert lines[0] == 'AAPL,1m,2024-01-01T00:00:00+00:00,1.0,2.0,0.5,1.5,10'
+        assert 'ON CONFLICT' in cur.execute.call_args.args[0]
+        mock_conn.return_value.commit.assert_called_once()
+
+    def test_rows_at_or_before_watermark_are_not_sent(self):
+        ps = load_put_service()
+        df = pd.DataFrame({'Open':[1.0]*4,'High':[2.0]*4,'Low':[0.5]*4,'Close':[1.5]*4,'Volume':[10]*4},
+                          index=pd.date_range('2024-01-01', periods=4, freq='min', tz='UTC'))
+        ps.watermarks.advance('AAPL', '1m', datetime(2024, 1, 1, 0, 1, tzinfo=timezone.utc))
+        mock_conn = patch('psycopg2.connect').start()
+        self.addCleanup(patch.stopall)
+        cur = mock_conn.return_value.cursor.return_value
+        cur.rowcount = 2
+        filtered = ps.rows_filtered.labels('1m')
+        sent = ps.rows_sent.labels('1m')
+        filtered_before, sent_before = filtered.value, sent.value
+        with patch.object(ps.bus, 'publish'):
+            update = ps.insert_and_publish('AAPL', '1m', df)
+        rows = cur.executemany.call_args.args[1]
+        assert [r[2].minute for r in rows] == [2, 3]
+        assert update['new_rows'] == 2
+        assert filtered.value - filtered_before == 2
+        assert sent.value - sent_before == 2
+
+    def test_nothing_sent_when_all_rows_are_stored(self):
+        ps = load_put_service()
+        df = pd.DataFrame({'Open':[1.0],'High':[2.0],'Low':[1.5],'Close':[1.8],'Volume':[10]},
+                          index=[pd.Timestamp('2024-01-01')])
+        with patch('psycopg2.connect') as mock_conn:
+            inserted = ps.insert_ohlcv_records('AAPL', '1d', df, after=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        assert inserted == 0
+        mock_conn.assert_not_called()
+
+    def test_copy_writes_null_for_missing_values(self):
+        from services.put.ohlcv_store import copy_ohlcv_rows
+        cur = MagicMock()
+        cur.rowcount = 1
+        rows = [('AAPL', '1d', datetime(2024, 1, 1), 1.0, None, None, 2.0, None)]
+        assert copy_ohlcv_rows(cur, rows) == 1
+        buf = cur.copy_expert.call_args.args[1]
+        assert buf.getvalue() == 'AAPL,1d,2024-01-01T00:00:00,1.0,,,2.0,\r\n'
+
+    def test_copy_clears_rows_staged_earlier_in_the_transaction(self):
+        from services.put.ohlcv_store import copy_ohlcv_rows
+        cur = MagicMock()
+        copy_ohlcv_rows(cur, [('AAPL', '1d', datetime(2024, 1, 1), 1.0, 1.0, 1.0, 1.0, 1)])
+        statements = [c.args[0] for c in cur.method_calls if c.args]
+        truncate = next(i for i, s in enumerate(statements) if 'TRUNCATE' in s)
+        copy = next(i for i, s in enumerate(statements) if s.startswith('COPY'))
+        assert truncate < copy
+
+
+class TestSpool(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.rows = [
+            ('AAPL', '1m', datetime(2024, 1, 1, 0, m, tzinfo=timezone.utc), 1.5, 2.0, None, 1.0, 100)
+            for m in range(3)
+        ] + [('MSFT', '1d', datetime(2024, 1, 2, tzinfo=timezone.utc), 1.0, 1.0, 1.0, 1.0, None)]
+
+    def test_round_trip_and_rotation(self):
+        from services.put.spool import Spool
+        spool = Spool(self.tmp.name, segment_bytes=100)
+        spool.append(self.rows[:3])
+        spool.append(self.rows[3:])
+        assert len(spool.segments()) == 2
+        drained = []
+        assert spool.drain(drained.append) == 4
+        assert drained == [self.rows[:3], self.rows[3:]]
+        assert spool.segments() == []
+
+    def test_failed_load_keeps_segment(self):
+        from services.put.spool import Spool
+        spool = Spool(self.tmp.name)
+        spool.append(self.rows)
+        with self.assertRaises(RuntimeError):
+            spool.drain(MagicMock(side_effect=RuntimeError('db down')))
+        reopened = Spool(self.tmp.name)
+        drained = []
+        reopened.drain(drained.extend)
+        assert drained == self.rows
+
+    def test_torn_tail_is_ignored(self):
+        from services.put.spool import Spool, read_segment
+        spool = Spool(self.tmp.name)
+        spool.append(self.rows)
+        spool.close()
+        path = spool.segments()[0]
+        with open(path, 'ab') as fh:
+            fh.write(b'OHLC\x10\x00')
+        assert read_segment(path) == self.rows
+
+    def test_insert_spools_when_database_is_down(self):
+        import psycopg2
+        from services.put.spool import Spool
+        ps = load_put_service()
+        ps.spool = Spool(self.tmp.name)
+        df = pd.DataFrame({'Open':[1.0],'High':[2.0],'Low':[1.5],'Close':[1.8],'Volume':[10]},
+                          index=[pd.Timestamp('2024-01-01', tz='UTC')])
+        with patch('psycopg2.connect', side_effect=psycopg2.OperationalError('down')):
+            assert ps.insert_ohlcv_records('AAPL', '1d', df) == 0
+        assert ps.watermarks.peek('AAPL', '1d') == pd.Timestamp('2024-01-01', tz='UTC')
+
+        mock_conn = patch('psycopg2.connect').start()
+        self.addCleanup(patch.stopall)
+        cur = mock_conn.return_value.cursor.return_value
+        cur.rowcount = 1
+        with patch.object(ps.bus, 'publish') as mock_pub:
+            ps.drain_spool()
+        cur.copy_expert.assert_called_once()
+        mock_conn.return_value.commit.assert_called_once()
+        day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        assert mock_pub.call_args.args[2] == {
+            'ticker': 'AAPL', 'interval': '1d', 'new_rows': 1, 'first_ts': day, 'last_ts': day,
+        }
+        assert ps.spool.segments() == []
+
+    def test_redrain_after_failed_publish_announces_stored_rows(self):
+        from services.put.spool import Spool
+        ps = load_put_service()
+        ps.spool = Spool(self.tmp.name)
+        ps.spool.append(self.rows[:3])
+        mock_conn = patch('psycopg2.connect').start()
+        self.addCleanup(patch.stopall)
+        cur = mock_conn.return_value.cursor.return_value
+        cur.rowcount = 3
+        with patch.object(ps.bus, 'publish', side_effect=ConnectionError('redis down')):
+            with self.assertRaises(ConnectionError):
+                ps.drain_spool()
+        assert len(ps.spool.segments()) == 1
+
+        cur.rowcount = 0
+        with patch.object(ps.bus, 'publish') as mock_pub:
+            ps.drain_spool()
+        payload = mock_pub.call_args.args[2]
+        assert (payload['ticker'], payload['new_rows'], payload['first_ts']) == ('AAPL', 0, self.rows[0][2])
+        assert ps.spool.segments() == []
+
+    def test_drained_rows_behind_a_buffered_window_are_announced_with_their_span(self):
+        from services.put.spool import Spool
+        ps = load_put_service()
+        ps.spool = Spool(self.tmp.name)
+        ps.spool.append(self.rows[:3])
+        # live bars moved the watermark on while the segment was waiting
+        ps.watermarks.advance('AAPL', '1m', datetime(2024, 1, 1, 0, 30, tzinfo=timezone.utc))
+        mock_conn = patch('psycopg2.connect').start()
+        self.addCleanup(patch.stopall)
+        mock_conn.return_value.cursor.return_value.rowcount = 3
+        with patch.object(ps.bus, 'publish') as mock_pub:
+            ps.drain_spool()
+        event = json.loads(json.dumps(mock_pub.call_args.args[2], default=ps.bus._json_default))
+        assert event['first_ts'] == '2024-01-01T00:00:00+00:00'
+        assert event['last_ts'] == '2024-01-01T00:02:00+00:00'
+
+
+class TestFrameToRows(unittest.TestCase):
+    def test_converts_columns_with_nan_as_none(self):
+        from services.put.frames import frame_to_rows
+        df = pd.DataFrame(
+            {'Open': [1.0, float('nan')], 'High': [2.0, 3.0], 'Low': [0.5, 1.0],
+             'Close': [1.5, 2.5], 'Volume': [10.0, float('nan')]},
+            index=pd.date_range('2024-01-01', periods=2, tz='UTC', name='Datetime'),
+        )
+        rows = frame_to_rows('AAPL', '1d', df)
+        assert rows == [
+            ('AAPL', '1d', datetime(2024, 1, 1, tzinfo=timezone.utc), 1.0, 2.0, 0.5, 1.5, 10),
+            ('AAPL', '1d', datetime(2024, 1, 2, tzinfo=timezone.utc), None, 3.0, 1.0, 2.5, None),
+        ]
+        assert type(rows[0][3]) is float
+        assert type(rows[0][7]) is int
+
+    def test_bars_after_keeps_newer_and_undated_bars(self):
+        from services.put.frames import bars_after
+        df = pd.DataFrame({'Close': [1.0, 2.0, 3.0]},
+                          index=pd.DatetimeIndex(['2024-01-01', None, '2024-01-03'], name='Datetime'))
+        kept = bars_after(df, datetime(2024, 1, 1, tzinfo=timezone.utc))
+        assert kept['Close'].tolist() == [2.0, 3.0]
+        assert bars_after(df, None) is df
+        assert bars_after(df, pd.Timestamp('2023-12-31')) is df
+
+    def test_multi_index_rows_and_columns(self):
+        from services.put.frames import frame_to_rows
+        index = pd.MultiIndex.from_product(
+            [['AAPL'], pd.date_range('2024-01-01', periods=2)], names=['Ticker', 'Date']
+        )
+        columns = pd.MultiIndex.from_tuples(
+            [('Open', ''), ('High', ''), ('Low', ''), ('Close', ''), ('Volume', '')]
+        )
+        df = pd.DataFrame([[1.0, 2.0, 0.5, 1.5, 10], [2.0, 3.0, 1.0, 2.5, 20]],
+                          index=index, columns=columns)
+        rows = frame_to_rows('AAPL', '1d', df)
+        assert [r[2] for r in rows] == [datetime(2024, 1, 1), datetime(2024, 1, 2)]
+        assert rows[1][3:] == (2.0, 3.0, 1.0, 2.5, 20)
+
+    def test_drops_rows_without_timestamp(self):
+        from services.put.frames import frame_to_rows
+        df = pd.DataFrame({'Open': [1.0, 2.0], 'Close': [1.0, 2.0]},
+                          index=pd.DatetimeIndex(['2024-01-01', None]))
+        rows = frame_to_rows('AAPL', '1d', df)
+        assert rows == [('AAPL', '1d', datetime(2024, 1, 1), 1.0, None, None, 1.0, None)]
+
 
 class TestNextRunTime(unittest.TestCase):
     def test_calculates_next_minute_interval(self):
@@ -209,6 +637,12 @@ class TestNextRunTime(unittest.TestCase):
         nxt = ps.next_run_time('1d', now)
         assert nxt == datetime(2024,1,2,0,0,30)
 
+    def test_day_interval_keeps_timezone(self):
+        ps = load_put_service()
+        now = datetime(2024,1,1,12,0,0,tzinfo=ps.timezone.utc)
+        nxt = ps.next_run_time('1d', now)
+        assert nxt == datetime(2024,1,2,0,0,30,tzinfo=ps.timezone.utc)
+
     def test_invalid_interval_raises(self):
         ps = load_put_service()
         with self.assertRaises(ValueError):
@@ -244,17 +678,496 @@ class TestRunIntegration(unittest.TestCase):
         ps = load_put_service()
         ps.symbols = [('AAPL','1d'), ('MSFT','1d')]
         data = pd.DataFrame({'Open':[1], 'High':[1], 'Low':[1], 'Close':[1], 'Volume':[1]}, index=[pd.Timestamp('2024-01-01')])
-        with patch.object(ps, 'get_latest_timestamp', return_value=None) as mock_get, \
-             patch.object(ps, 'fetch_and_store_batch', return_value={'AAPL': data, 'MSFT': data}) as mock_fetch, \
+        with patch.object(ps.watermarks, 'loader', return_value={}) as mock_get, \
+             patch.object(ps, 'iter_fetch_chunks', return_value=iter([{'AAPL': data}, {'MSFT': data}])) as mock_fetch, \
              patch.object(ps, 'insert_and_publish') as mock_insert, \
              patch('services.put.put_service.ThreadPoolExecutor', return_value=DummyExecutor()) as mock_exec, \
              patch('services.put.put_service.as_completed', side_effect=lambda x: x):
             ps.run('1d')
-            assert mock_get.call_count == 2
+            assert mock_get.call_count == 1
+            assert mock_get.call_args.args[0] == [('AAPL', '1d'), ('MSFT', '1d')]
             mock_fetch.assert_called_once()
+            assert mock_fetch.call_args.args[2] == {'AAPL': None, 'MSFT': None}
             assert mock_insert.call_count == 2
 
 
+    def test_batch_mode_publishes_one_event_per_run(self):
+        ps = load_put_service()
+        ps.EVENT_MODE = 'batch'
+        ps.symbols = [('AAPL','1d'), ('MSFT','1d')]
+        data = pd.DataFrame({'Open':[1], 'High':[1], 'Low':[1], 'Close':[1], 'Volume':[1]}, index=[pd.Timestamp('2024-01-01')])
+        with patch.object(ps.watermarks, 'loader', return_value={}), \
+             patch.object(ps, 'iter_fetch_chunks', return_value=iter([{'AAPL': data, 'MSFT': data}])), \
+             patch.object(ps, 'insert_ohlcv_records', return_value=1), \
+             patch.object(ps.bus, 'publish') as mock_pub, \
+             patch('services.put.put_service.ThreadPoolExecutor', return_value=DummyExecutor()), \
+             patch('services.put.put_service.as_completed', side_effect=lambda x: x):
+            ps.run('1d')
+        mock_pub.assert_called_once()
+        topic, event_type, payload = mock_pub.call_args.args
+        assert (topic, event_type) == ('stock.updated', 'stock.updated.batch')
+        assert [u['ticker'] for u in payload['updates']] == ['AAPL', 'MSFT']
+        assert payload['updates'][0]['last_ts'] == pd.Timestamp('2024-01-01')
+
+
+class TestResample(unittest.TestCase):
+    def make_minutes(self, periods):
+        index = pd.date_range('2024-01-01 09:58', periods=periods, freq='min', tz='UTC')
+        close = [float(n) for n in range(periods)]
+        return pd.DataFrame(
+            {'Open': close, 'High': [c + 1 for c in close], 'Low': [c - 1 for c in close],
+             'Close': close, 'Volume': [10.0] * periods},
+            index=index,
+        )
+
+    def test_resample_ohlcv_aggregates_complete_buckets(self):
+        from datetime import timedelta
+        from services.put.frames import resample_ohlcv
+        df = self.make_minutes(9)  # 09:58 .. 10:06
+        df.loc[df.index[3], 'Open'] = float('nan')
+        bars = resample_ohlcv(df, timedelta(minutes=5), timedelta(minutes=1))
+        assert list(bars.index) == [
+            pd.Timestamp('2024-01-01 09:55', tz='UTC'),
+            pd.Timestamp('2024-01-01 10:00', tz='UTC'),
+        ]
+        first, second = bars.iloc[0], bars.iloc[1]
+        assert (first['Open'], first['High'], first['Low'], first['Close'], first['Volume']) == (0, 2, -1, 1, 20)
+        # the missing open at 10:01 is skipped, not propagated
+        assert (second['Open'], second['High'], second['Low'], second['Close'], second['Volume']) == (2, 7, 1, 6, 50)
+
+    def test_run_skips_download_for_resampled_intervals(self):
+        ps = load_put_service()
+        ps.symbols = [('AAPL', '1m'), ('AAPL', '5m'), ('MSFT', '5m')]
+        ps.RESAMPLE_INTERVALS = ['5m']
+        with patch.object(ps.watermarks, 'loader', return_value={}), \
+             patch.object(ps, 'iter_fetch_chunks', return_value=iter([])) as mock_fetch:
+            ps.run('5m')
+        assert mock_fetch.call_args.args[0] == ['MSFT']
+
+    def test_resample_from_base_inserts_new_buckets(self):
+        ps = load_put_service()
+        ps.RESAMPLE_INTERVALS = ['5m', '1h']
+        last_5m = datetime(2024, 1, 1, 9, 55, tzinfo=timezone.utc)
+        last_1h = datetime(2024, 1, 1, 9, 0, tzinfo=timezone.utc)
+        now = datetime(2024, 1, 1, 10, 7, 30, tzinfo=timezone.utc)
+        loader = {('AAPL', '5m'): last_5m, ('AAPL', '1h'): last_1h}
+        with patch.object(ps.watermarks, 'loader', return_value=loader), \
+             patch.object(ps, 'load_bars', return_value=self.make_minutes(10)) as mock_load, \
+             patch.object(ps, 'insert_and_publish') as mock_insert:
+            ps.resample_from_base(['AAPL'], now=now)
+        # the 10:00-11:00 hour cannot have closed yet, so only 5m is rebuilt
+        mock_load.assert_called_once_with('AAPL', '1m', datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc))
+        ticker, interval, bars = mock_insert.call_args.args
+        assert (ticker, interval) == ('AAPL', '5m')
+        assert len(bars) == 2
+
+
+class TestAsyncPipeline(unittest.TestCase):
+    def test_stages_fan_out_and_drop(self):
+        import asyncio
+        from services.put.async_pipeline import Pipeline
+
+        async def split(n):
+            return [n] * n
+
+        async def odd(n):
+            await asyncio.sleep(0)
+            return [n] if n % 2 else []
+
+        pipeline = Pipeline(queue_size=1).add(split, workers=2).add(odd, workers=3)
+        assert sorted(asyncio.run(pipeline.run([1, 2, 3]))) == [1, 3, 3, 3]
+
+    def test_stage_error_propagates(self):
+        import asyncio
+        from services.put.async_pipeline import Pipeline
+
+        async def boom(n):
+            raise ValueError(n)
+
+        with self.assertRaises(ValueError):
+            asyncio.run(Pipeline().add(boom).run([1]))
+
+    def test_run_async_inserts_and_publishes_in_batch(self):
+        ps = load_put_service()
+        ps.PIPELINE_MODE = 'async'
+        ps.EVENT_MODE = 'batch'
+        ps.symbols = [('AAPL', '1d'), ('MSFT', '1d')]
+        data = pd.DataFrame({'Open':[1.0], 'High':[1.0], 'Low':[1.0], 'Close':[1.0], 'Volume':[1]},
+                            index=[pd.Timestamp('2024-01-01')])
+        with patch.object(ps.watermarks, 'loader', return_value={}), \
+             patch.object(ps, 'download_batch', return_value={'AAPL': data, 'MSFT': pd.DataFrame()}) as mock_dl, \
+             patch.object(ps, 'write_ohlcv_rows', return_value=1) as mock_write, \
+             patch.object(ps.bus, 'publish') as mock_pub:
+            ps.run('1d')
+        mock_dl.assert_called_once_with(['AAPL', 'MSFT'], '1d', None)
+        mock_write.assert_called_once()
+        assert mock_write.call_args.args[2][0][:3] == ('AAPL', '1d', pd.Timestamp('2024-01-01').to_pydatetime())
+        payload = mock_pub.call_args.args[2]
+        assert [u['ticker'] for u in payload['updates']] == ['AAPL']
+
+    def test_run_async_isolates_transform_errors_per_ticker(self):
+        ps = load_put_service()
+        ps.PIPELINE_MODE = 'async'
+        ps.EVENT_MODE = 'batch'
+        ps.symbols = [('AAPL', '1d'), ('MSFT', '1d')]
+        data = pd.DataFrame({'Open':[1.0], 'High':[1.0], 'Low':[1.0], 'Close':[1.0], 'Volume':[1]},
+                            index=[pd.Timestamp('2024-01-01')])
+        real_rows = ps.ohlcv_rows
+
+        def rows(ticker, *args):
+            if ticker == 'MSFT':
+                raise ValueError('malformed frame')
+            return real_rows(ticker, *args)
+
+        with patch.object(ps.watermarks, 'loader', return_value={}), \
+             patch.object(ps, 'download_batch', return_value={'AAPL': data, 'MSFT': data}), \
+             patch.object(ps, 'ohlcv_rows', side_effect=rows), \
+             patch.object(ps, 'write_ohlcv_rows', return_value=1) as mock_write, \
+             patch.object(ps.bus, 'publish') as mock_pub:
+            ps.run('1d')
+        assert mock_write.call_args.args[0] == 'AAPL'
+        payload = mock_pub.call_args.args[2]
+        assert [u['ticker'] for u in payload['updates']] == ['AAPL']
+
+
+class TestBackfill(unittest.TestCase):
+    def test_plan_windows_respects_request_span_and_lookback(self):
+        from datetime import timedelta
+        from services.put.backfill import plan_windows
+        now = datetime(2024, 3, 1, tzinfo=timezone.utc)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        windows = plan_windows('1m', start, now, now=now)
+        # the grid runs in 7-day steps from the requested start; the first
+        # window within reach is clamped to the lookback
+        assert windows == [
+            (start + timedelta(days=49), now - timedelta(days=7), start + timedelta(days=56)),
+            (start + timedelta(days=56), start + timedelta(days=56), now),
+        ]
+        windows = plan_windows('1d', datetime(2020, 1, 1, tzinfo=timezone.utc), now, now=now)
+        assert len(windows) == 5
+        assert windows[0][2] == windows[1][1]
+        assert windows[-1][2] == now
+
+    def test_intraday_backfill_resumes_with_a_later_clock(self):
+        import tempfile
+        from datetime import timedelta
+        from services.put.backfill import Checkpoint, backfill
+        start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 6, 1, tzinfo=timezone.utc)
+        calls = []
+
+        def fake_load(provider, pool, limiter, interval, window_start, window_end, tickers, bus):
+            calls.append(window_start)
+            if window_end == end:
+                raise RuntimeError('rate limited')
+            return 10
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f'{tmp}/ck.json'
+            with patch('services.put.backfill.load_unit', side_effect=fake_load):
+                now = datetime(2024, 6, 1, 15, 4, 5, 123456, tzinfo=timezone.utc)
+                assert backfill(None, None, None, ['AAPL'], '1h', start, end,
+                                checkpoint=Checkpoint(path), now=now) == (10, 1)
+                first_window = calls[0]
+                calls.clear()
+                later = now + timedelta(hours=26, microseconds=17)
+                assert backfill(None, None, None, ['AAPL'], '1h', start, end,
+                                checkpoint=Checkpoint(path), now=later) == (0, 1)
+        assert first_window == now - timedelta(days=730)
+        assert len(calls) == 1 and calls[0] != first_window
+
+    def test_backfill_loads_pending_units_and_resumes(self):
+        import tempfile
+        from services.put.backfill import Checkpoint, backfill
+        start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 6, 1, tzinfo=timezone.utc)
+        calls = []
+
+        def fake_load(provider, pool, limiter, interval, window_start, window_end, tickers, bus):
+            calls.append((window_start, tuple(tickers)))
+            if window_start == start and tickers == ['MSFT']:
+                raise RuntimeError('rate limited')
+            return 10
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f'{tmp}/ck.json'
+            with patch('services.put.backfill.load_unit', side_effect=fake_load):
+                inserted, failed = backfill(None, None, None, ['AAPL', 'MSFT'], '1d', start, end,
+                                            chunk_size=1, checkpoint=Checkpoint(path))
+                assert (inserted, failed) == (30, 1)
+                calls.clear()
+                inserted, failed = backfill(None, None, None, ['AAPL', 'MSFT'], '1d', start, end,
+                                            chunk_size=1, checkpoint=Checkpoint(path))
+        assert calls == [(start, ('MSFT',))]
+        assert (inserted, failed) == (0, 1)
+
+
+    def test_load_unit_announces_tickers_with_new_bars(self):
+        from services.put import backfill
+        pool, bus = MagicMock(), MagicMock()
+        provider = MagicMock()
+        provider.download.return_value = make_single_level_df()
+        frames = {'AAPL': make_single_level_df(), 'MSFT': make_single_level_df()}
+        with patch.object(backfill, 'split_batch_frame', return_value=frames), \
+             patch.object(backfill, 'copy_ohlcv_rows', side_effect=[2, 0]) as mock_copy:
+            inserted = backfill.load_unit(provider, pool, MagicMock(), '1d', None, None,
+                                          ['AAPL', 'MSFT'], bus)
+        assert inserted == 2
+        assert [c.args[1][0][0] for c in mock_copy.call_args_list] == ['AAPL', 'MSFT']
+        topic, event_type, payload = bus.publish.call_args.args
+        assert (topic, event_type) == ('stock.updated', 'stock.updated.batch')
+        assert [(u['ticker'], u['new_rows']) for u in payload['updates']] == [('AAPL', 2)]
+        assert payload['updates'][0]['first_ts'] == datetime(2024, 1, 1)
+
+
+class TestTradingCalendar(unittest.TestCase):
+    def setUp(self):
+        from services.put.market_calendar import TradingCalendar
+        self.cal = TradingCalendar.from_file()
+
+    def test_sessions_respect_weekends_holidays_and_early_closes(self):
+        from datetime import date
+        assert self.cal.session(date(2025, 7, 5)) is None  # Saturday
+        assert self.cal.session(date(2025, 12, 25)) is None
+        opens, closes = self.cal.session(date(2025, 7, 3))
+        assert opens == datetime(2025, 7, 3, 13, 30, tzinfo=timezone.utc)
+        assert closes == datetime(2025, 7, 3, 17, 0, tzinfo=timezone.utc)
+        # standard time shifts the UTC session by an hour
+        assert self.cal.session(date(2025, 1, 6))[0] == datetime(2025, 1, 6, 14, 30, tzinfo=timezone.utc)
+
+    def test_should_fetch_until_final_bar_of_session(self):
+        from datetime import timedelta
+        step = timedelta(minutes=1)
+        friday_close = datetime(2025, 3, 7, 21, 0, tzinfo=timezone.utc)
+        saturday = datetime(2025, 3, 8, 12, 0, tzinfo=timezone.utc)
+        during = datetime(2025, 3, 7, 15, 0, tzinfo=timezone.utc)
+        assert self.cal.should_fetch('AAPL', during - step, during, step)
+        assert self.cal.should_fetch('AAPL', friday_close - 2 * step, saturday, step)
+        assert not self.cal.should_fetch('AAPL', friday_close - step, saturday, step)
+        assert self.cal.should_fetch('BTC-USD', saturday, saturday, step)
+        assert self.cal.should_fetch('AAPL', None, saturday, step)
+        monday_pre_open = datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)
+        assert not self.cal.should_fetch('AAPL', friday_close - step, monday_pre_open, step)
+
+    def test_daily_bars_wait_for_next_session(self):
+        from datetime import timedelta
+        step = timedelta(days=1)
+        wed_midnight = datetime(2025, 3, 12, 0, 0, tzinfo=timezone.utc)
+        assert self.cal.should_fetch('AAPL', datetime(2025, 3, 10), wed_midnight, step)
+        assert not self.cal.should_fetch('AAPL', datetime(2025, 3, 11), wed_midnight, step)
+
+    def test_skip_counter_reports_finished_days(self):
+        from services.put.market_calendar import SkipCounter
+        counter = SkipCounter()
+        counter.add(3, datetime(2025, 3, 8, 1, tzinfo=timezone.utc))
+        counter.add(2, datetime(2025, 3, 8, 2, tzinfo=timezone.utc))
+        with self.assertLogs('services.put.market_calendar', level='INFO') as logs:
+            counter.add(1, datetime(2025, 3, 9, 0, tzinfo=timezone.utc))
+        assert 'avoided 5 fetches on 2025-03-08' in logs.output[0]
+        assert counter.count == 1
+
+    def test_run_skips_closed_markets(self):
+        ps = load_put_service()
+        ps.symbols = [('AAPL', '1m'), ('BTC-USD', '1m')]
+        ps.MARKET_HOURS_ONLY = True
+        with patch.object(ps.watermarks, 'loader', return_value={}), \
+             patch.object(ps.trading_calendar, 'should_fetch', side_effect=lambda t, *a: t == 'BTC-USD'), \
+             patch.object(ps, 'iter_fetch_chunks', return_value=iter([])) as mock_fetch:
+            ps.run('1m')
+        assert mock_fetch.call_args.args[0] == ['BTC-USD']
+        assert ps.skipped_fetches.count == 1
+
+
+class TestGaps(unittest.TestCase):
+    def setUp(self):
+        from services.put.market_calendar import TradingCalendar
+        self.cal = TradingCalendar.from_file()
+
+    def test_expected_windows_follow_sessions(self):
+        from services.put.gaps import expected_windows
+        fri = datetime(2025, 3, 7, 15, 0, tzinfo=timezone.utc)
+        tue = datetime(2025, 3, 11, 15, 0, tzinfo=timezone.utc)
+        windows = expected_windows(self.cal, 'AAPL', '1h', fri, tue)
+        assert [w[0].day for w in windows] == [7, 10, 11]
+        assert windows[1][0] == datetime(2025, 3, 10, 13, 30, tzinfo=timezone.utc)
+        daily = expected_windows(self.cal, 'AAPL', '1d', fri, tue)
+        assert daily[0] == (
+            datetime(2025, 3, 7, tzinfo=timezone.utc), datetime(2025, 3, 8, tzinfo=timezone.utc)
+        )
+        assert len(daily) == 3
+        crypto = expected_windows(self.cal, 'BTC-USD', '1h', fri.replace(minute=20), tue)
+        assert crypto == [(fri, tue)]
+
+    def test_find_gaps_passes_session_bounds(self):
+        from datetime import timedelta
+        from services.put.gaps import find_gaps
+        cur = MagicMock()
+        cur.fetchall.return_value = [('gap',)]
+        start = datetime(2025, 3, 8, tzinfo=timezone.utc)
+        end = datetime(2025, 3, 11, tzinfo=timezone.utc)
+        assert find_gaps(cur, self.cal, 'AAPL', '1h', start, end) == [('gap',)]
+        params = cur.execute.call_args.args[1]
+        assert params['opens'] == [datetime(2025, 3, 10, 13, 30, tzinfo=timezone.utc)]
+        assert params['step'] == timedelta(hours=1)
+        cur.reset_mock()
+        weekend_end = datetime(2025, 3, 10, tzinfo=timezone.utc)
+        assert find_gaps(cur, self.cal, 'AAPL', '1h', start, weekend_end) == []
+        cur.execute.assert_not_called()
+
+    def test_resampled_session_has_no_gaps(self):
+        from datetime import timedelta
+        from services.put.frames import resample_ohlcv
+        from services.put.gaps import expected_windows
+        open_, close = self.cal.session(datetime(2025, 3, 10).date())
+        minutes = pd.date_range(open_, close, freq='min', inclusive='left')
+        base = pd.DataFrame(
+            {'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': 1.0, 'Volume': 1}, index=minutes
+        )
+        stored = resample_ohlcv(base, timedelta(hours=1), timedelta(minutes=1)).index
+
+        def missing(resampled):
+            # the buckets FIND_GAPS_SQL reports, computed in Python
+            buckets = []
+            for start, end in expected_windows(self.cal, 'AAPL', '1h', open_, close, resampled):
+                bucket = start
+                while bucket < end:
+                    inside = (stored >= bucket) & (stored < bucket + timedelta(hours=1))
+                    if open_ <= bucket < close and not inside.any():
+                        buckets.append(bucket)
+                    bucket += timedelta(hours=1)
+            return buckets
+
+        assert missing(resampled=True) == []
+        # session-aligned buckets miss the resampled 19:00 bar
+        assert missing(resampled=False) == [datetime(2025, 3, 10, 19, 30, tzinfo=timezone.utc)]
+
+    def test_base_run_scans_resampled_pairs_on_their_grid(self):
+        ps = load_put_service()
+        ps.GAP_REPAIR = True
+        ps.RESAMPLE_INTERVALS = ['1h']
+        # pairs come from the JSON config as lists
+        ps.symbols = [['AAPL', '1m'], ['AAPL', '1h'], ['MSFT', '1h']]
+        with patch.object(ps.watermarks, 'loader', return_value={}):
+            assert ps.plan_run('1h')[0] == ['MSFT']
+        with patch.object(ps, 'db'), \
+             patch.object(ps, 'resample_from_base', return_value=[]), \
+             patch.object(ps, 'repair_gaps') as mock_repair, \
+             patch.object(ps, 'scan_pair', return_value=0) as mock_scan:
+            ps.finish_run('1m', ['AAPL'], [])
+        mock_repair.assert_called_once_with('1m', ['AAPL'])
+        assert [(c.args[2:], c.kwargs) for c in mock_scan.call_args_list] == [
+            (('AAPL', '1h'), {'resampled': True})
+        ]
+
+    def test_scan_pair_resumes_from_previous_scan(self):
+        from services.put import gaps
+        scanned = datetime(2025, 3, 10, 15, 30, tzinfo=timezone.utc)
+        last = datetime(2025, 3, 10, 19, 30, tzinfo=timezone.utc)
+        cur = MagicMock()
+        cur.fetchone.return_value = (scanned, datetime(2025, 1, 2, tzinfo=timezone.utc), last)
+        with patch.object(gaps, 'find_gaps', return_value=[(scanned, scanned, 1)]) as mock_find, \
+             patch.object(gaps, 'record_gaps') as mock_record:
+            assert gaps.scan_pair(cur, self.cal, 'AAPL', '1h') == 1
+        assert mock_find.call_args.args[-3:] == (scanned, last, False)
+        mock_record.assert_called_once_with(cur, 'AAPL', '1h', scanned, last, [(scanned, scanned, 1)])
+        assert cur.execute.call_args.args[1] == ('AAPL', '1h', last)
+
+        cur.fetchone.return_value = (last, None, last)
+        with patch.object(gaps, 'find_gaps') as mock_find:
+            assert gaps.scan_pair(cur, self.cal, 'AAPL', '1h') == 0
+        mock_find.assert_not_called()
+
+    def test_repair_gaps_refetches_window_and_rescans(self):
+        from datetime import timedelta
+        ps = load_put_service()
+        gap_start = datetime(2025, 3, 10, 15, 30, tzinfo=timezone.utc)
+        gap_end = gap_start + timedelta(hours=1)
+        data = pd.DataFrame({'Open': [1.0]}, index=[gap_start])
+        row = ('AAPL', '1h', gap_start, 1.0, 1.0, 1.0, 1.0, 1)
+        with patch.object(ps, 'db') as mock_db, \
+             patch.object(ps, 'scan_pair', return_value=1), \
+             patch.object(ps, 'open_gaps', return_value=[('AAPL', gap_start, gap_end, 0)]), \
+             patch.object(ps, 'mark_refetch_attempt') as mock_mark, \
+             patch.object(ps, 'download_batch', return_value={'AAPL': data}) as mock_dl, \
+             patch.object(ps, 'ohlcv_rows', return_value=[row]), \
+             patch.object(ps, 'write_ohlcv_rows', return_value=1) as mock_write, \
+             patch.object(ps, 'find_gaps', return_value=[]) as mock_find, \
+             patch.object(ps, 'record_gaps') as mock_record, \
+             patch.object(ps, 'announce') as mock_announce:
+            repaired = ps.repair_gaps('1h', ['AAPL'], now=gap_end + timedelta(days=1))
+        assert mock_db.connection.call_count == 2
+        assert mock_mark.call_args.args[1:] == ('AAPL', '1h', gap_start)
+        mock_dl.assert_called_once_with(['AAPL'], '1h', gap_start, gap_end + timedelta(hours=1))
+        mock_write.assert_called_once_with('AAPL', '1h', [row])
+        assert mock_find.call_args.args[-2:] == (gap_start, gap_end + timedelta(hours=1))
+        assert mock_record.call_args.args[-2:] == ([], 1)
+        # windows already past the gap must reload, so the fill is announced
+        mock_announce.assert_called_once_with(repaired[0])
+        assert (repaired[0]['first_ts'], repaired[0]['new_rows']) == (gap_start, 1)
+
+    def test_finish_run_only_repairs_when_enabled(self):
+        ps = load_put_service()
+        with patch.object(ps, 'repair_gaps') as mock_repair:
+            ps.finish_run('1h', ['AAPL'], [])
+            mock_repair.assert_not_called()
+            ps.GAP_REPAIR = True
+            mock_repair.side_effect = RuntimeError('boom')
+            ps.finish_run('1h', ['AAPL'], [])
+        mock_repair.assert_called_once_with('1h', ['AAPL'])
+
+
+class TestIntervalScheduler(unittest.TestCase):
+    def test_pop_due_reschedules_intervals(self):
+        ps = load_put_service()
+        now = datetime(2024,1,1,0,0,0,tzinfo=timezone.utc)
+        sched = ps.IntervalScheduler(['1m', '5m', '1h'], runner=lambda i: None, now=now)
+        assert sorted(sched.pop_due(now)) == ['1h', '1m', '5m']
+        assert sched.pop_due(now) == []
+        tick = datetime(2024,1,1,0,5,30,tzinfo=timezone.utc)
+        assert sorted(sched.pop_due(tick)) == ['1m', '5m']
+        assert sched.deadlines[0][0] == datetime(2024,1,1,0,6,30,tzinfo=timezone.utc)
+
+    def test_dispatch_shares_watermarks_and_skips_busy_interval(self):
+        ps = load_put_service()
+        ps.symbols = [('AAPL', '1m'), ('AAPL', '1h'), ('BTC-USD', '1d')]
+        runs = []
+        sched = ps.IntervalScheduler(['1m', '1h'], runner=runs.append)
+        sched.executors = {i: DummyExecutor() for i in sched.executors}
+        sched.prefetcher = DummyExecutor()
+        busy = MagicMock()
+        busy.done.return_value = False
+        sched.running['1h'] = busy
+        with patch.object(ps.watermarks, 'loader', return_value={}) as mock_load:
+            sched.dispatch(['1m', '1h'])
+        mock_load.assert_called_once_with([('AAPL', '1m')])
+        assert runs == ['1m']
+
+    def test_watermark_prefetch_does_not_block_or_kill_the_loop(self):
+        import threading
+        ps = load_put_service()
+        ps.symbols = [('AAPL', '1m'), ('AAPL', '1h')]
+        runs = []
+        sched = ps.IntervalScheduler(['1m', '1h'], runner=runs.append)
+        release = threading.Event()
+
+        def slow_failing_load(pairs):
+            release.wait(5)
+            raise RuntimeError('database is down')
+
+        with patch.object(ps.watermarks, 'loader', side_effect=slow_failing_load):
+            sched.dispatch(['1m', '1h'])
+            assert runs == []
+            release.set()
+            for future in sched.running.values():
+                future.result(timeout=5)
+        assert sorted(runs) == ['1h', '1m']
+
+    def test_failed_run_is_logged_not_raised(self):
+        ps = load_put_service()
+        sched = ps.IntervalScheduler(['1m'], runner=MagicMock(side_effect=Exception('boom')))
+        sched._run('1m')
+
+
 class TestRunForever(unittest.TestCase):
     def test_run_forever_loops(self):
         ps = load_put_service()
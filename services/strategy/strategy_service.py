@@ -6,16 +6,36 @@ from dataclasses import dataclass
 from typing import List, Optional, Dict
 
 import pandas as pd
-import psycopg2
 
-from pubsub_wrapper import PubSubClient, load_config, configure_json_logger
-
-try:  # optional dependency for ADX calculation
-    import talib  # type: ignore
-except Exception:  # pragma: no cover
-    from types import SimpleNamespace
-
-    talib = SimpleNamespace()
+from pubsub_wrapper import (
+    ConnectionPool,
+    PubSubClient,
+    configure_json_logger,
+    counter,
+    event_updates,
+    histogram,
+    load_config,
+    observe_event_lag,
+    start_metrics_server,
+)
+
+# Indicator library for ADX: "talib" or "numpy" (no C library needed)
+TA_BACKEND = os.getenv("TA_BACKEND", "talib").lower()
+
+if TA_BACKEND == "numpy":
+    try:  # allow running as a script without package context
+        from ..ta.algorithms import numpy_backend as talib  # type: ignore
+    except Exception:  # pragma: no cover - fallback for Docker build
+        import numpy_backend as talib  # type: ignore
+elif TA_BACKEND == "talib":
+    try:  # optional dependency for ADX calculation
+        import talib  # type: ignore
+    except Exception:  # pragma: no cover
+        from types import SimpleNamespace
+
+        talib = SimpleNamespace()
+else:
+    raise ValueError(f"unsupported TA backend: {TA_BACKEND}")
 
 configure_json_logger()
 logger = logging.getLogger(__name__)
@@ -36,25 +56,34 @@ DB_CONFIG = {
     "host": config["PGHOST"],
     "port": int(config["PGPORT"]),
 }
+db = ConnectionPool(DB_CONFIG, maxconn=int(os.getenv("DB_POOL_MAX", "2")), name="strategy")
 
 bus = PubSubClient(config.get("redis_url"))
 LOOKBACK_ROWS = 250
 
+# Prometheus endpoint for the metrics below; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+evaluate_seconds = histogram(
+    "strategy_evaluate_seconds", "Time to evaluate a strategy for one update", ("strategy",)
+)
+signals_published = counter(
+    "strategy_signals_total", "Signals published", ("strategy", "action")
+)
+
 
 def fetch_recent_ohlcv(ticker: str, interval: str, limit: int = LOOKBACK_ROWS) -> pd.DataFrame:
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT ts, open, high, low, close, volume FROM stock_ohlcv
-        WHERE ticker = %s AND interval = %s
-        ORDER BY ts DESC LIMIT %s
-        """,
-        (ticker, interval, limit),
-    )
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT ts, open, high, low, close, volume FROM stock_ohlcv
+            WHERE ticker = %s AND interval = %s
+            ORDER BY ts DESC LIMIT %s
+            """,
+            (ticker, interval, limit),
+        )
+        rows = cur.fetchall()
+        cur.close()
     if not rows:
         return pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
     df = pd.DataFrame(rows, columns=["ts", "open", "high", "low", "close", "volume"])
@@ -62,16 +91,15 @@ def fetch_recent_ohlcv(ticker: str, interval: str, limit: int = LOOKBACK_ROWS) -
 
 
 def fetch_latest(table: str, ticker: str, interval: str) -> Optional[Dict[str, float]]:
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    cur.execute(
-        f"SELECT * FROM {table} WHERE ticker = %s AND interval = %s ORDER BY ts DESC LIMIT 1",
-        (ticker, interval),
-    )
-    row = cur.fetchone()
-    desc = [d[0] for d in cur.description] if cur.description else []
-    cur.close()
-    conn.close()
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT * FROM {table} WHERE ticker = %s AND interval = %s ORDER BY ts DESC LIMIT 1",
+            (ticker, interval),
+        )
+        row = cur.fetchone()
+        desc = [d[0] for d in cur.description] if cur.description else []
+        cur.close()
     if not row:
         return None
     return dict(zip(desc, row))
@@ -279,40 +307,50 @@ def get_strategy(name: str, db_config: dict) -> BaseStrategy:
 strategy = get_strategy(STRATEGY_NAME, DB_CONFIG)
 
 
+def handle_update(ticker: str, interval: str, indicator: Optional[str]):
+    with evaluate_seconds.labels(strategy.name).time():
+        signals = strategy.evaluate(ticker, interval)
+    latest_ohlcv = {}
+    if signals:
+        ohlcv_df = fetch_recent_ohlcv(ticker, interval, limit=1)
+        latest_ohlcv = (
+            ohlcv_df.iloc[-1].to_dict() if not ohlcv_df.empty else {}
+        )
+    for sig in signals:
+        event_payload = {
+            **sig,
+            "indicator": indicator,
+            "ohlcv": latest_ohlcv,
+        }
+        bus.publish(
+            "strategy.signal",
+            f"strategy.signal.{sig['action'].lower()}",
+            event_payload,
+        )
+        signals_published.labels(strategy.name, sig["action"]).inc()
+        logger.info(f"Published signal {event_payload}")
+
+
 def run():
     logger.info(f"Strategy service '{strategy.name}' starting")
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
     pubsub = bus.subscribe("ta.updated")
     logger.info(f"Subscribed to 'ta.updated' on {config.get('redis_url')}")
     for msg in pubsub.listen():
         if msg["type"] != "message":
             continue
         event = json.loads(msg["data"])
+        observe_event_lag("ta.updated", event)
         payload = event.get("payload", {})
-        ticker = payload.get("ticker")
-        interval = payload.get("interval")
-        if not ticker or not interval:
-            continue
-        indicator = payload.get("indicator")
-        signals = strategy.evaluate(ticker, interval)
-        latest_ohlcv = {}
-        if signals:
-            ohlcv_df = fetch_recent_ohlcv(ticker, interval, limit=1)
-            latest_ohlcv = (
-                ohlcv_df.iloc[-1].to_dict() if not ohlcv_df.empty else {}
-            )
-        for sig in signals:
-            event_payload = {
-                **sig,
-                "indicator": indicator,
-                "ohlcv": latest_ohlcv,
-            }
-            bus.publish(
-                "strategy.signal",
-                f"strategy.signal.{sig['action'].lower()}",
-                event_payload,
-            )
-            logger.info(f"Published signal {event_payload}")
-
+        # batch events carry one entry per ticker under "updates"
+        for update in event_updates(payload):
+            ticker = update.get("ticker")
+            interval = update.get("interval")
+            if not ticker or not interval:
+                continue
+            indicator = update.get("indicator", payload.get("indicator"))
+            handle_update(ticker, interval, indicator)
 
 if __name__ == "__main__":
     run()
@@ -42,6 +42,25 @@ class TestGoldenCross(unittest.TestCase):
         assert result == [{"ticker": "AAPL", "interval": "1d", "action": "BUY"}]
 
 
+class TestADXMACD(unittest.TestCase):
+    def test_buy_signal_with_numpy_backend(self):
+        with patch.dict("os.environ", {"TA_BACKEND": "numpy"}):
+            ss = load_strategy_service()
+        close = [float(i) for i in range(60)]
+        df = pd.DataFrame({
+            "ts": pd.date_range("2024-01-01", periods=60),
+            "open": close,
+            "high": [c + 1 for c in close],
+            "low": [c - 1 for c in close],
+            "close": close,
+            "volume": 1,
+        })
+        with patch.object(ss, "fetch_recent_ohlcv", return_value=df), \
+             patch.object(ss, "fetch_latest", return_value={"macd_crossover_type": "bullish"}):
+            result = ss.ADXMACDStrategy({}).evaluate("AAPL", "1d")
+        assert result == [{"ticker": "AAPL", "interval": "1d", "action": "BUY"}]
+
+
 class TestRunIntegration(unittest.TestCase):
     def test_run_publishes_with_indicator_and_ohlcv(self):
         ss = load_strategy_service()
@@ -86,6 +105,32 @@ class TestRunIntegration(unittest.TestCase):
         assert payload["indicator"] == "macd"
         assert payload["ohlcv"] == df.iloc[-1].to_dict()
 
+    def test_run_evaluates_each_update_of_a_batch(self):
+        ss = load_strategy_service()
+        payload = {
+            "indicator": "rsi",
+            "updates": [
+                {"ticker": "AAPL", "interval": "1d"},
+                {"ticker": "MSFT", "interval": "1h", "indicator": "macd"},
+            ],
+        }
+        message = {"type": "message", "data": json.dumps({"payload": payload})}
+
+        class DummySub:
+            def listen(self_inner):
+                yield message
+                raise KeyboardInterrupt()
+
+        with patch.object(ss.bus, "subscribe", return_value=DummySub()), \
+             patch.object(ss, "handle_update") as mock_handle:
+            with self.assertRaises(KeyboardInterrupt):
+                ss.run()
+
+        assert [c.args for c in mock_handle.call_args_list] == [
+            ("AAPL", "1d", "rsi"),
+            ("MSFT", "1h", "macd"),
+        ]
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -13,8 +13,8 @@ ALGORITHMS = {
 }
 
 
-def get_algorithm(name: str, db_config: dict):
+def get_algorithm(name: str, db_config: dict, pool=None):
     cls = ALGORITHMS.get(name)
     if cls is None:
         raise ValueError(f"unsupported TA algorithm: {name}")
-    return cls(db_config)
+    return cls(db_config, pool)
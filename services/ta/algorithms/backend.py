@@ -0,0 +1,21 @@
+"""Select the indicator library the algorithms call as ``talib``.
+
+``TA_BACKEND=talib`` (the default) uses the TA-Lib bindings; ``numpy`` uses
+the vectorised functions in ``numpy_backend``, which need no C library.
+"""
+import os
+
+# Indicator library: "talib" or "numpy"
+TA_BACKEND = os.getenv("TA_BACKEND", "talib").lower()
+
+if TA_BACKEND == "numpy":
+    from . import numpy_backend as talib
+elif TA_BACKEND == "talib":
+    try:  # pragma: no cover - optional dependency
+        import talib  # type: ignore
+    except Exception:  # pragma: no cover - allow missing C library
+        from types import SimpleNamespace
+
+        talib = SimpleNamespace()  # allows patching in tests without real library
+else:
+    raise ValueError(f"unsupported TA backend: {TA_BACKEND}")
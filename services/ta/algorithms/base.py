@@ -1,5 +1,8 @@
+from contextlib import contextmanager
+
 import pandas as pd
-import psycopg2
+from psycopg2.extras import Json
+from pubsub_wrapper import ConnectionPool
 
 
 class BaseTAAlgorithm:
@@ -7,26 +10,40 @@ class BaseTAAlgorithm:
 
     name: str = "base"
     table_name: str
+    # IndicatorState subclass used by ``process_incremental``
+    state_class = None
 
-    def __init__(self, db_config: dict):
+    def __init__(self, db_config: dict, pool: ConnectionPool | None = None):
         self.db_config = db_config
+        self.pool = pool or ConnectionPool(db_config)
+        # (ticker, interval) -> (state, last_ts) for incremental mode
+        self.states: dict = {}
 
-    def get_latest_ts(self, ticker: str, interval: str):
-        conn = psycopg2.connect(**self.db_config)
-        cur = conn.cursor()
-        cur.execute(
-            f"SELECT MAX(ts) FROM {self.table_name} WHERE ticker = %s AND interval = %s",
-            (ticker, interval),
-        )
-        result = cur.fetchone()[0]
-        cur.close()
-        conn.close()
-        return result
+    @contextmanager
+    def cursor(self, cur=None):
+        """Yield ``cur`` if given, else a cursor on a pooled connection committed on exit."""
+        if cur is not None:
+            yield cur
+            return
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+    def get_latest_ts(self, ticker: str, interval: str, cur=None):
+        with self.cursor(cur) as cur:
+            cur.execute(
+                f"SELECT MAX(ts) FROM {self.table_name} WHERE ticker = %s AND interval = %s",
+                (ticker, interval),
+            )
+            return cur.fetchone()[0]
 
-    def process(self, ticker: str, interval: str, price_df: pd.DataFrame) -> int:
+    def process(self, ticker: str, interval: str, price_df: pd.DataFrame, cur=None) -> int:
         if price_df is None or price_df.empty:
             return 0
-        last_ts = self.get_latest_ts(ticker, interval)
+        last_ts = self.get_latest_ts(ticker, interval, cur)
         df = self.calculate(price_df)
         if df is None or df.empty or "ts" not in df.columns:
             return 0
@@ -34,10 +51,113 @@ class BaseTAAlgorithm:
             df = df[df["ts"] > last_ts]
         if df.empty:
             return 0
-        return self.insert_records(ticker, interval, df)
+        return self.insert_records(ticker, interval, df, cur)
+
+    def load_state(self, ticker: str, interval: str, cur=None):
+        """Return the persisted ``(state, last_ts)``, or ``(None, None)``."""
+        with self.cursor(cur) as cur:
+            cur.execute(
+                """
+                SELECT last_ts, state FROM stock_ta_state
+                WHERE ticker = %s AND interval = %s AND indicator = %s
+                """,
+                (ticker, interval, self.name),
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None, None
+        return self.state_class.from_dict(row[1]), pd.Timestamp(row[0])
+
+    def save_state(self, cur, ticker: str, interval: str, last_ts, state) -> None:
+        cur.execute(
+            """
+            INSERT INTO stock_ta_state (ticker, interval, indicator, last_ts, state)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (ticker, interval, indicator) DO UPDATE
+            SET last_ts = EXCLUDED.last_ts,
+                state = EXCLUDED.state,
+                updated_at = now();
+            """,
+            (ticker, interval, self.name, last_ts.to_pydatetime(), Json(state.to_dict())),
+        )
+
+    def fetch_bars(self, ticker: str, interval: str, after=None, cur=None) -> pd.DataFrame:
+        """Closes and volumes after ``after`` (all of them when ``None``), oldest first."""
+        with self.cursor(cur) as cur:
+            cur.execute(
+                """
+                SELECT ts, close, volume FROM stock_ohlcv
+                WHERE ticker = %s AND interval = %s AND (%s::timestamptz IS NULL OR ts > %s)
+                ORDER BY ts
+                """,
+                (ticker, interval, after, after),
+            )
+            rows = cur.fetchall()
+        return pd.DataFrame(rows, columns=["ts", "close", "volume"])
+
+    def process_incremental(
+        self, ticker: str, interval: str, price_df: pd.DataFrame | None = None, cur=None
+    ) -> int:
+        """Advance the stored state over bars it has not seen and store their values.
+
+        ``price_df`` is used when it reaches back to the state's last bar,
+        and the missing bars are queried when it does not. State and rows
+        commit together. A pair without stored state falls back to
+        :meth:`process`: seeding folds its whole history, which the backlog
+        pass does in chunks (see ``backlog.process_pair``).
+        """
+        key = (ticker, interval)
+        state, last_ts = self.states.get(key) or self.load_state(ticker, interval, cur)
+        if state is None:
+            return self.process(ticker, interval, price_df, cur)
+        if price_df is not None and not price_df.empty and (
+            pd.to_datetime(price_df["ts"], utc=True).iloc[0] <= last_ts
+        ):
+            bars = price_df
+        else:
+            bars = self.fetch_bars(ticker, interval, after=last_ts, cur=cur)
+        state = state.copy()
+        df, last_ts = self.advance(state, bars, last_ts, last_ts)
+        if last_ts is None:
+            return 0
+        with self.cursor(cur) as cur:
+            rows = self.insert_records(ticker, interval, df, cur)
+            self.save_state(cur, ticker, interval, last_ts, state)
+        self.states[key] = (state, last_ts)
+        return rows
+
+    def advance(self, state, bars: pd.DataFrame, last_ts=None, written_after=None):
+        """Fold the ``bars`` after ``last_ts`` into ``state``.
+
+        Returns the values of bars after ``written_after`` as a frame and
+        the timestamp of the last bar folded in, or ``None`` if there was none.
+        """
+        if bars.empty:
+            return pd.DataFrame(columns=["ts", *state.fields]), None
+        ts = pd.to_datetime(bars["ts"], utc=True)
+        if last_ts is not None:
+            bars, ts = bars[ts > last_ts], ts[ts > last_ts]
+        written_after = pd.Timestamp(written_after) if written_after is not None else None
+
+        records = []
+        last_ts = None
+        for bar_ts, close, volume in zip(ts, bars["close"], bars["volume"]):
+            if pd.isna(close):
+                continue
+            out = state.update(float(close), 0.0 if pd.isna(volume) else float(volume))
+            last_ts = bar_ts
+            if written_after is None or bar_ts > written_after:
+                records.append({"ts": bar_ts, **out})
+        return pd.DataFrame(records, columns=["ts", *state.fields]), last_ts
 
     def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
         raise NotImplementedError
 
-    def insert_records(self, ticker: str, interval: str, df: pd.DataFrame) -> int:
+    def insert_records(self, ticker: str, interval: str, df: pd.DataFrame, cur=None) -> int:
         raise NotImplementedError
+
+    def execute_insert(self, query: str, data: list, cur=None) -> int:
+        """Run ``query`` for every row of ``data`` on ``cur`` or a pooled connection."""
+        with self.cursor(cur) as cur:
+            cur.executemany(query, data)
+            return cur.rowcount
@@ -1,18 +1,14 @@
 import pandas as pd
-import psycopg2
-try:  # pragma: no cover - optional dependency
-    import talib  # type: ignore
-except Exception:  # pragma: no cover - allow missing C library
-    from types import SimpleNamespace
-
-    talib = SimpleNamespace()
 
+from .backend import talib
 from .base import BaseTAAlgorithm
+from .incremental import BollingerState
 
 
 class BollingerBands(BaseTAAlgorithm):
     name = "bollingerbands"
     table_name = "stock_ta_bollinger_bands"
+    state_class = BollingerState
 
     def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
         if df.empty:
@@ -30,11 +26,9 @@ class BollingerBands(BaseTAAlgorithm):
             }
         )
 
-    def insert_records(self, ticker: str, interval: str, df: pd.DataFrame) -> int:
+    def insert_records(self, ticker: str, interval: str, df: pd.DataFrame, cur=None) -> int:
         if df is None or df.empty:
             return 0
-        conn = psycopg2.connect(**self.db_config)
-        cur = conn.cursor()
         insert_query = """
             INSERT INTO stock_ta_bollinger_bands (ticker, interval, ts, bb_upper, bb_middle, bb_lower)
             VALUES (%s, %s, %s, %s, %s, %s)
@@ -54,9 +48,4 @@ class BollingerBands(BaseTAAlgorithm):
             )
             for row in df.itertuples(index=False)
         ]
-        cur.executemany(insert_query, data)
-        conn.commit()
-        rows_inserted = cur.rowcount
-        cur.close()
-        conn.close()
-        return rows_inserted
+        return self.execute_insert(insert_query, data, cur)
@@ -0,0 +1,222 @@
+"""Running indicator state that is advanced one bar at a time.
+
+Each state reproduces TA-Lib's default parameters and arithmetic (seeds,
+smoothing and the order of floating point operations), so folding a
+series in bar by bar yields the same values as one TA-Lib call over the
+whole series. States serialise to plain JSON for ``stock_ta_state``.
+"""
+import math
+from collections import deque
+
+# TA-Lib's TA_EPSILON, used by its zero checks in RSI and BBANDS
+EPSILON = 1e-8
+
+
+class IndicatorState:
+    """Base class: ``update`` folds in one bar and returns its output values."""
+
+    fields: tuple = ()
+
+    def update(self, close: float, volume: float) -> dict:
+        raise NotImplementedError
+
+    def to_dict(self) -> dict:
+        data = {}
+        for key, value in self.__dict__.items():
+            if isinstance(value, IndicatorState):
+                value = value.to_dict()
+            elif isinstance(value, deque):
+                value = list(value)
+            data[key] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndicatorState":
+        state = cls()
+        for key, value in data.items():
+            current = getattr(state, key)
+            if isinstance(current, IndicatorState):
+                value = type(current).from_dict(value)
+            elif isinstance(current, deque):
+                value = deque(value)
+            setattr(state, key, value)
+        return state
+
+    def copy(self) -> "IndicatorState":
+        return type(self).from_dict(self.to_dict())
+
+
+class EMAState(IndicatorState):
+    """Exponential average seeded with the simple average of its first ``period`` inputs."""
+
+    fields = ("ema",)
+
+    def __init__(self, period: int = 30):
+        self.period = period
+        self.count = 0
+        self.total = 0.0
+        self.value = None
+
+    def update(self, close: float, volume: float = 0.0) -> dict:
+        if self.value is None:
+            self.total += close
+            self.count += 1
+            if self.count == self.period:
+                self.value = self.total / self.period
+        else:
+            k = 2.0 / (self.period + 1)
+            self.value = ((close - self.value) * k) + self.value
+        return {"ema": self.value}
+
+
+class MACDState(IndicatorState):
+    """MACD(12, 26, 9) with TA-Lib's seeding.
+
+    TA-Lib seeds both averages so they start on the same bar: the slow
+    average from bars 0-25 and the fast one from bars 14-25. The signal
+    line is seeded from the first nine MACD values, so every output starts
+    at bar 33 and earlier bars get ``None``.
+    """
+
+    fields = (
+        "macd",
+        "macd_signal",
+        "macd_hist",
+        "macd_diff",
+        "macd_crossover",
+        "macd_crossover_type",
+    )
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.bars = 0
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal = EMAState(signal)
+        self.prev_diff = None
+
+    def update(self, close: float, volume: float = 0.0) -> dict:
+        if self.bars >= self.slow.period - self.fast.period:
+            self.fast.update(close)
+        self.slow.update(close)
+        self.bars += 1
+
+        out = dict.fromkeys(self.fields)
+        out["macd_crossover"] = False
+        if self.slow.value is None:
+            return out
+        macd = self.fast.value - self.slow.value
+        signal = self.signal.update(macd)["ema"]
+        if signal is None:
+            return out
+
+        diff = macd - signal
+        out.update(macd=macd, macd_signal=signal, macd_hist=diff, macd_diff=diff)
+        if self.prev_diff is not None:
+            if diff >= 0 and self.prev_diff < 0:
+                out.update(macd_crossover=True, macd_crossover_type="bullish")
+            elif diff <= 0 and self.prev_diff > 0:
+                out.update(macd_crossover=True, macd_crossover_type="bearish")
+        self.prev_diff = diff
+        return out
+
+
+class RSIState(IndicatorState):
+    """RSI(14) with Wilder smoothing, seeded from the first 14 changes."""
+
+    fields = ("rsi",)
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.changes = 0
+        self.gain = 0.0
+        self.loss = 0.0
+
+    def update(self, close: float, volume: float = 0.0) -> dict:
+        if self.prev_close is None:
+            self.prev_close = close
+            return {"rsi": None}
+        change = close - self.prev_close
+        self.prev_close = close
+        if self.changes >= self.period:
+            self.loss *= self.period - 1
+            self.gain *= self.period - 1
+        if change < 0:
+            self.loss -= change
+        else:
+            self.gain += change
+        self.changes += 1
+        if self.changes < self.period:
+            return {"rsi": None}
+        self.loss /= self.period
+        self.gain /= self.period
+        total = self.gain + self.loss
+        return {"rsi": 100.0 * (self.gain / total) if not -EPSILON < total < EPSILON else 0.0}
+
+
+class SMAState(IndicatorState):
+    """Simple average over ``period`` bars kept as a running sum."""
+
+    fields = ("sma",)
+
+    def __init__(self, period: int = 30):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+
+    def update(self, close: float, volume: float = 0.0) -> dict:
+        self.window.append(close)
+        self.total += close
+        if len(self.window) < self.period:
+            return {"sma": None}
+        sma = self.total / self.period
+        self.total -= self.window.popleft()
+        return {"sma": sma}
+
+
+class BollingerState(IndicatorState):
+    """Bollinger Bands(20, 2, 2) over a simple average and population deviation."""
+
+    fields = ("bb_upper", "bb_middle", "bb_lower")
+
+    def __init__(self, period: int = 20, deviations: float = 2.0):
+        self.period = period
+        self.deviations = deviations
+        self.window = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, close: float, volume: float = 0.0) -> dict:
+        self.window.append(close)
+        self.total += close
+        self.total_sq += close * close
+        if len(self.window) < self.period:
+            return dict.fromkeys(self.fields)
+        oldest = self.window.popleft()
+        middle = self.total / self.period
+        self.total -= oldest
+        variance = self.total_sq / self.period
+        self.total_sq -= oldest * oldest
+        variance -= middle * middle
+        width = (math.sqrt(variance) if variance >= EPSILON else 0.0) * self.deviations
+        return {"bb_upper": middle + width, "bb_middle": middle, "bb_lower": middle - width}
+
+
+class OBVState(IndicatorState):
+    """On-balance volume, starting from the first bar's volume."""
+
+    fields = ("obv",)
+
+    def __init__(self):
+        self.prev_close = None
+        self.obv = 0.0
+
+    def update(self, close: float, volume: float) -> dict:
+        if self.prev_close is None:
+            self.obv = volume
+        elif close > self.prev_close:
+            self.obv += volume
+        elif close < self.prev_close:
+            self.obv -= volume
+        self.prev_close = close
+        return {"obv": self.obv}
@@ -1,19 +1,15 @@
 import numpy as np
 import pandas as pd
-import psycopg2
-try:  # pragma: no cover - optional dependency
-    import talib  # type: ignore
-except Exception:  # pragma: no cover - allow missing C library
-    from types import SimpleNamespace
-
-    talib = SimpleNamespace()  # allows patching in tests without real library
 
+from .backend import talib
 from .base import BaseTAAlgorithm
+from .incremental import MACDState
 
 
 class MACD(BaseTAAlgorithm):
     name = "macd"
     table_name = "stock_ta_macd"
+    state_class = MACDState
 
     def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
         if df.empty:
@@ -53,11 +49,9 @@ class MACD(BaseTAAlgorithm):
 
         return res
 
-    def insert_records(self, ticker: str, interval: str, df: pd.DataFrame) -> int:
+    def insert_records(self, ticker: str, interval: str, df: pd.DataFrame, cur=None) -> int:
         if df is None or df.empty:
             return 0
-        conn = psycopg2.connect(**self.db_config)
-        cur = conn.cursor()
         insert_query = """
             INSERT INTO stock_ta_macd (
                 ticker, interval, ts, macd, macd_signal, macd_hist, macd_diff,
@@ -85,9 +79,4 @@ class MACD(BaseTAAlgorithm):
             )
             for row in df.itertuples(index=False)
         ]
-        cur.executemany(insert_query, data)
-        conn.commit()
-        rows_inserted = cur.rowcount
-        cur.close()
-        conn.close()
-        return rows_inserted
+        return self.execute_insert(insert_query, data, cur)
@@ -0,0 +1,212 @@
+"""Vectorised NumPy versions of the TA-Lib functions the services use.
+
+``MACD``, ``RSI``, ``SMA``, ``BBANDS``, ``OBV`` and ``ADX`` take the same
+arguments and defaults as their TA-Lib counterparts and return arrays of
+the same length with ``NaN`` over the lookback, so this module can stand
+in for ``talib``. Seeds and zero checks follow TA-Lib's C code; results
+agree to rounding. As with the TA-Lib wrapper, leading ``NaN`` inputs are
+skipped; later ones propagate into every value that depends on them.
+
+The exponential recurrences (EMA and Wilder smoothing) are evaluated in
+blocks: every block's response from a zero start is one matrix product,
+and only the value carried from block to block is stepped in Python.
+Window sums use strided views rather than a running total, so they do
+not drift over long series. Only NumPy is required.
+"""
+from functools import wraps
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# TA-Lib's TA_EPSILON, used by its zero checks
+EPSILON = 1e-8
+
+# Bars per block of the blocked recurrence
+BLOCK = 256
+
+
+def _linear_filter(x: np.ndarray, a: float, b: float, y0: float) -> np.ndarray:
+    """Return ``y[t] = a * y[t-1] + b * x[t]`` for every ``t``, starting from ``y[-1] = y0``."""
+    n = len(x)
+    if n == 0:
+        return np.empty(0)
+    blocks = np.zeros(-(-n // BLOCK) * BLOCK)
+    blocks[:n] = x
+    blocks = blocks.reshape(-1, BLOCK) * b
+    powers = a ** np.arange(BLOCK + 1, dtype=float)
+    lag = np.subtract.outer(np.arange(BLOCK), np.arange(BLOCK))
+    # response[j] of a block = sum over i <= j of a**(j - i) * input[i]
+    response = np.where(lag >= 0, powers[np.clip(lag, 0, BLOCK)], 0.0)
+    local = blocks @ response.T
+
+    carry = np.empty(len(local))
+    prev = y0
+    for k, last in enumerate(local[:, -1]):
+        carry[k] = prev
+        prev = powers[BLOCK] * prev + last
+    return (local + carry[:, None] * powers[1:]).ravel()[:n]
+
+
+def _from_first_valid(inputs: int):
+    """Run the wrapped indicator from the first bar where its ``inputs`` arrays are all valid."""
+
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            arrays = [np.asarray(a, dtype=float) for a in args[:inputs]]
+            valid = np.flatnonzero(~np.any(np.isnan(arrays), axis=0))
+            start = valid[0] if len(valid) else len(arrays[0])
+            result = func(*(a[start:] for a in arrays), *args[inputs:], **kwargs)
+            if start == 0:
+                return result
+            pad = np.full(start, np.nan)
+            if isinstance(result, tuple):
+                return tuple(np.concatenate([pad, r]) for r in result)
+            return np.concatenate([pad, result])
+
+        return wrapper
+
+    return decorate
+
+
+def _nan_from_first_nan(x: np.ndarray, start: int) -> int:
+    """Index from which a recurrence over ``x[start:]`` is ``NaN``, or ``len(x)``."""
+    bad = np.flatnonzero(np.isnan(x[start:]))
+    return start + bad[0] if len(bad) else len(x)
+
+
+def _ema(x: np.ndarray, period: int, start: int) -> np.ndarray:
+    """EMA whose first value, at ``start``, is the mean of the ``period`` inputs ending there."""
+    out = np.full(len(x), np.nan)
+    first = start - period + 1
+    if first < 0 or start >= len(x):
+        return out
+    out[start] = np.cumsum(x[first:start + 1])[-1] / period
+    stop = _nan_from_first_nan(x, start + 1)
+    k = 2.0 / (period + 1)
+    out[start + 1:stop] = _linear_filter(x[start + 1:stop], 1.0 - k, k, out[start])
+    return out
+
+
+def _window_sum(x: np.ndarray, period: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        out[period - 1:] = sliding_window_view(x, period).sum(axis=1)
+    return out
+
+
+@_from_first_valid(1)
+def MACD(real, fastperiod: int = 12, slowperiod: int = 26, signalperiod: int = 9):
+    """Return ``(macd, signal, hist)``; all three start at bar ``slow + signal - 2``."""
+    if slowperiod < fastperiod:
+        fastperiod, slowperiod = slowperiod, fastperiod
+    start = slowperiod - 1
+    macd = _ema(real, fastperiod, start) - _ema(real, slowperiod, start)
+    signal = _ema(macd, signalperiod, start + signalperiod - 1)
+    macd[: start + signalperiod - 1] = np.nan
+    return macd, signal, macd - signal
+
+
+@_from_first_valid(1)
+def RSI(real, timeperiod: int = 14):
+    out = np.full(len(real), np.nan)
+    if len(real) <= timeperiod:
+        return out
+    diff = np.diff(real)
+    gain = np.where(diff < 0, 0.0, diff)
+    loss = np.where(diff < 0, -diff, 0.0)
+
+    avg_gain = np.empty(len(diff))
+    avg_loss = np.empty(len(diff))
+    avg_gain[timeperiod - 1] = np.cumsum(gain[:timeperiod])[-1] / timeperiod
+    avg_loss[timeperiod - 1] = np.cumsum(loss[:timeperiod])[-1] / timeperiod
+    a = (timeperiod - 1) / timeperiod
+    rest = slice(timeperiod, len(diff))
+    avg_gain[rest] = _linear_filter(gain[rest], a, 1.0 / timeperiod, avg_gain[timeperiod - 1])
+    avg_loss[rest] = _linear_filter(loss[rest], a, 1.0 / timeperiod, avg_loss[timeperiod - 1])
+    stop = _nan_from_first_nan(diff, 0)
+    avg_gain[stop:] = np.nan
+
+    total = avg_gain[timeperiod - 1:] + avg_loss[timeperiod - 1:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = np.where(np.abs(total) < EPSILON, 0.0, 100.0 * (avg_gain[timeperiod - 1:] / total))
+    rsi[np.isnan(total)] = np.nan
+    out[timeperiod:] = rsi
+    return out
+
+
+@_from_first_valid(1)
+def SMA(real, timeperiod: int = 30):
+    return _window_sum(real, timeperiod) / timeperiod
+
+
+@_from_first_valid(1)
+def BBANDS(real, timeperiod: int = 20, nbdevup: float = 2.0, nbdevdn: float = 2.0, matype: int = 0):
+    """Return ``(upper, middle, lower)`` around a simple average (``matype`` 0 only)."""
+    if matype != 0:
+        raise ValueError("only matype=0 (simple moving average) is supported")
+    middle = _window_sum(real, timeperiod) / timeperiod
+    variance = _window_sum(real * real, timeperiod) / timeperiod - middle * middle
+    with np.errstate(invalid="ignore"):
+        deviation = np.where(variance >= EPSILON, np.sqrt(np.maximum(variance, 0.0)), 0.0)
+    deviation[np.isnan(variance)] = np.nan
+    return middle + deviation * nbdevup, middle, middle - deviation * nbdevdn
+
+
+@_from_first_valid(2)
+def OBV(real, volume):
+    if not len(real):
+        return np.empty(0)
+    diff = np.diff(real)
+    step = np.sign(diff) * volume[1:]
+    return np.cumsum(np.concatenate([volume[:1], step]))
+
+
+def _wilder_sum(x: np.ndarray, period: int) -> np.ndarray:
+    """TA-Lib's smoothed DM/TR sums over ``x[1:]``, defined from ``period - 1``."""
+    out = np.full(len(x), np.nan)
+    out[period - 1] = np.cumsum(x[1:period])[-1]
+    out[period:] = _linear_filter(x[period:], 1.0 - 1.0 / period, 1.0, out[period - 1])
+    return out
+
+
+@_from_first_valid(3)
+def ADX(high, low, close, timeperiod: int = 14):
+    n = timeperiod
+    out = np.full(len(close), np.nan)
+    if len(close) < 2 * n:
+        return out
+
+    diff_plus = np.concatenate([[0.0], np.diff(high)])
+    diff_minus = np.concatenate([[0.0], -np.diff(low)])
+    is_minus = (diff_minus > 0) & (diff_plus < diff_minus)
+    minus_dm = np.where(is_minus, diff_minus, 0.0)
+    plus_dm = np.where(~is_minus & (diff_plus > 0) & (diff_plus > diff_minus), diff_plus, 0.0)
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    true_range = np.maximum.reduce(
+        [high - low, np.abs(high - prev_close), np.abs(low - prev_close)]
+    )
+
+    tr = _wilder_sum(true_range, n)[n:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        minus_di = 100.0 * (_wilder_sum(minus_dm, n)[n:] / tr)
+        plus_di = 100.0 * (_wilder_sum(plus_dm, n)[n:] / tr)
+        di_sum = minus_di + plus_di
+        dx = 100.0 * (np.abs(minus_di - plus_di) / di_sum)
+    # TA-Lib leaves the average unchanged on bars where DX is undefined
+    defined = (np.abs(tr) >= EPSILON) & (np.abs(di_sum) >= EPSILON)
+
+    first = np.where(defined[:n], dx[:n], 0.0)
+    adx = np.empty(len(dx) - n + 1)
+    adx[0] = np.cumsum(first)[-1] / n
+    tail_dx, tail_defined = dx[n:], defined[n:]
+    edges = np.flatnonzero(np.diff(np.concatenate([[False], tail_defined, [False]])))
+    prev_end, prev = 0, adx[0]
+    for run_start, run_end in zip(edges[::2], edges[1::2]):
+        adx[1 + prev_end:1 + run_start] = prev
+        run = _linear_filter(tail_dx[run_start:run_end], (n - 1) / n, 1.0 / n, prev)
+        adx[1 + run_start:1 + run_end] = run
+        prev_end, prev = run_end, run[-1]
+    adx[1 + prev_end:] = prev
+    out[2 * n - 1:] = adx
+    return out
@@ -1,18 +1,14 @@
 import pandas as pd
-import psycopg2
-try:  # pragma: no cover - optional dependency
-    import talib  # type: ignore
-except Exception:  # pragma: no cover - allow missing C library
-    from types import SimpleNamespace
-
-    talib = SimpleNamespace()
 
+from .backend import talib
 from .base import BaseTAAlgorithm
+from .incremental import OBVState
 
 
 class OBV(BaseTAAlgorithm):
     name = "obv"
     table_name = "stock_ta_obv"
+    state_class = OBVState
 
     def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
         if df.empty:
@@ -24,11 +20,9 @@ class OBV(BaseTAAlgorithm):
         obv = talib.OBV(closes, volumes)
         return pd.DataFrame({"ts": df["ts"], "obv": obv})
 
-    def insert_records(self, ticker: str, interval: str, df: pd.DataFrame) -> int:
+    def insert_records(self, ticker: str, interval: str, df: pd.DataFrame, cur=None) -> int:
         if df is None or df.empty:
             return 0
-        conn = psycopg2.connect(**self.db_config)
-        cur = conn.cursor()
         insert_query = """
             INSERT INTO stock_ta_obv (ticker, interval, ts, obv)
             VALUES (%s, %s, %s, %s)
@@ -44,9 +38,4 @@ class OBV(BaseTAAlgorithm):
             )
             for row in df.itertuples(index=False)
         ]
-        cur.executemany(insert_query, data)
-        conn.commit()
-        rows_inserted = cur.rowcount
-        cur.close()
-        conn.close()
-        return rows_inserted
+        return self.execute_insert(insert_query, data, cur)
@@ -1,18 +1,14 @@
 import pandas as pd
-import psycopg2
-try:  # pragma: no cover - optional dependency
-    import talib  # type: ignore
-except Exception:  # pragma: no cover - allow missing C library
-    from types import SimpleNamespace
-
-    talib = SimpleNamespace()
 
+from .backend import talib
 from .base import BaseTAAlgorithm
+from .incremental import SMAState
 
 
 class SMA(BaseTAAlgorithm):
     name = "sma"
     table_name = "stock_ta_sma"
+    state_class = SMAState
 
     def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
         if df.empty:
@@ -23,11 +19,9 @@ class SMA(BaseTAAlgorithm):
         sma = talib.SMA(closes)
         return pd.DataFrame({"ts": df["ts"], "sma": sma})
 
-    def insert_records(self, ticker: str, interval: str, df: pd.DataFrame) -> int:
+    def insert_records(self, ticker: str, interval: str, df: pd.DataFrame, cur=None) -> int:
         if df is None or df.empty:
             return 0
-        conn = psycopg2.connect(**self.db_config)
-        cur = conn.cursor()
         insert_query = """
             INSERT INTO stock_ta_sma (ticker, interval, ts, sma)
             VALUES (%s, %s, %s, %s)
@@ -43,9 +37,4 @@ class SMA(BaseTAAlgorithm):
             )
             for row in df.itertuples(index=False)
         ]
-        cur.executemany(insert_query, data)
-        conn.commit()
-        rows_inserted = cur.rowcount
-        cur.close()
-        conn.close()
-        return rows_inserted
+        return self.execute_insert(insert_query, data, cur)
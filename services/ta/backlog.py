@@ -0,0 +1,135 @@
+"""Stream stored bars through indicator state to catch up on the backlog.
+
+A pair's history is read from a named (server-side) cursor ``chunk_rows``
+bars at a time and folded into every algorithm's incremental state, so
+the values equal one pass over the full history while memory is bounded
+by the chunk size. Rows and state commit per chunk, which also lets an
+interrupted backlog resume from the stored state.
+
+``init_worker`` and ``catch_up`` run pairs in a process pool, each worker
+with its own connection pool and algorithm instances.
+"""
+import logging
+import time
+
+import pandas as pd
+from pubsub_wrapper import ConnectionPool
+
+try:  # allow running as a script without package context
+    from .algorithms import get_algorithm  # type: ignore
+except Exception:  # pragma: no cover - fallback for Docker build
+    from algorithms import get_algorithm  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Connection pool and algorithms of a backlog worker process
+_worker: dict = {}
+
+BARS_SQL = """
+    SELECT ts, close, volume FROM stock_ohlcv
+    WHERE ticker = %s AND interval = %s AND (%s::timestamptz IS NULL OR ts > %s)
+    ORDER BY ts
+"""
+
+
+def stream_bars(conn, ticker: str, interval: str, after=None, chunk_rows: int = 50_000):
+    """Yield the bars after ``after`` as frames of at most ``chunk_rows`` rows."""
+    cur = conn.cursor(name="ta_backlog")
+    try:
+        cur.execute(BARS_SQL, (ticker, interval, after, after))
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield pd.DataFrame(rows, columns=["ts", "close", "volume"])
+    finally:
+        cur.close()
+
+
+def starting_points(algorithms, ticker: str, interval: str, written_after: dict | None = None) -> dict:
+    """Return ``alg -> [state, last_ts, written_after]`` to resume each algorithm from.
+
+    Algorithms without stored state start from scratch and only write bars
+    newer than their indicator table. ``written_after`` maps names to the
+    table's latest ts as read before live events could add newer rows;
+    names missing from it are looked up now.
+    """
+    key = (ticker, interval)
+    written_after = written_after or {}
+    progress = {}
+    for alg in algorithms:
+        state, last_ts = alg.states.get(key) or alg.load_state(ticker, interval)
+        after = last_ts
+        if state is None:
+            state = alg.state_class()
+            if alg.name in written_after:
+                after = written_after[alg.name]
+            else:
+                after = alg.get_latest_ts(ticker, interval)
+        progress[alg] = [state, last_ts, after]
+    return progress
+
+
+def process_pair(
+    pool, algorithms, ticker: str, interval: str, chunk_rows: int, written_after: dict | None = None
+) -> dict:
+    """Bring ``algorithms`` up to date for one pair and return new rows per indicator.
+
+    The history is streamed once for all algorithms from the earliest point
+    any of them needs. Each chunk is written in one transaction with a
+    savepoint per algorithm; one that fails is rolled back and dropped for
+    the rest of the stream while the others carry on. See
+    ``starting_points`` for ``written_after``.
+    """
+    key = (ticker, interval)
+    progress = starting_points(algorithms, ticker, interval, written_after)
+    starts = [last_ts for _, last_ts, _ in progress.values()]
+    after = None if any(ts is None for ts in starts) else min(starts)
+    rows = {alg.name: 0 for alg in algorithms}
+
+    with pool.connection() as read_conn:
+        for chunk in stream_bars(read_conn, ticker, interval, after, chunk_rows):
+            if not progress:
+                break
+            advanced = {}
+            with pool.connection() as conn:
+                cur = conn.cursor()
+                for alg, (state, last_ts, written_after) in list(progress.items()):
+                    cur.execute("SAVEPOINT indicator")
+                    try:
+                        state = state.copy()
+                        df, chunk_last = alg.advance(state, chunk, last_ts, written_after)
+                        if chunk_last is not None:
+                            rows[alg.name] += alg.insert_records(ticker, interval, df, cur)
+                            alg.save_state(cur, ticker, interval, chunk_last, state)
+                            advanced[alg] = (state, chunk_last)
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT indicator")
+                        logger.error(f"❌ {alg.name}: backlog failed for {ticker} ({interval}): {e}")
+                        del progress[alg]
+                        continue
+                    cur.execute("RELEASE SAVEPOINT indicator")
+                cur.close()
+            for alg, (state, last_ts) in advanced.items():
+                progress[alg][:2] = [state, last_ts]
+                alg.states[key] = (state, last_ts)
+    return rows
+
+
+def init_worker(db_config: dict, names) -> None:
+    """Set up a backlog worker process; one connection streams, one writes."""
+    pool = ConnectionPool(db_config, maxconn=2, name="ta_backlog")
+    _worker["pool"] = pool
+    _worker["algorithms"] = {name: get_algorithm(name, db_config, pool) for name in names}
+
+
+def catch_up(ticker: str, interval: str, written_after: dict, chunk_rows: int) -> tuple:
+    """Run ``process_pair`` in a worker and return ``(ticker, interval, rows, seconds)``.
+
+    ``written_after`` maps the names of the algorithms to catch up to their
+    latest indicator ts, see ``starting_points``.
+    """
+    started = time.perf_counter()
+    algorithms = [_worker["algorithms"][name] for name in written_after]
+    rows = process_pair(_worker["pool"], algorithms, ticker, interval, chunk_rows, written_after)
+    return ticker, interval, rows, time.perf_counter() - started
@@ -21,6 +21,7 @@ def main():
         "algorithms": algos,
         "replicas": 1,
         "env": env,
+        "combined": os.getenv("TA_COMBINED", "false").lower() == "true",
     }
 
     values_path = Path(__file__).resolve().parent / "ta_values.yaml"
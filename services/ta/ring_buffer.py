@@ -0,0 +1,111 @@
+"""Rolling OHLCV windows kept in memory per (ticker, interval).
+
+Each ``RingBuffer`` writes every bar twice into preallocated arrays of
+``2 * capacity`` rows, so the newest ``capacity`` bars always form one
+contiguous slice that ``frame`` hands out without copying the prices.
+``RingBufferCache`` bounds how many buffers are kept, dropping the least
+recently used ones and any left idle too long.
+"""
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class RingBuffer:
+    """The most recent ``capacity`` bars of one series."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = np.empty(2 * capacity, dtype="datetime64[ns]")
+        self.values = np.empty((len(FIELDS), 2 * capacity))
+        # bars appended since the buffer was last seeded
+        self.count = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    @property
+    def last_ts(self) -> pd.Timestamp | None:
+        if not self.count:
+            return None
+        return pd.Timestamp(self.ts[(self.count - 1) % self.capacity]).tz_localize("UTC")
+
+    def seed(self, df: pd.DataFrame) -> None:
+        """Replace the contents with the bars of ``df``."""
+        self.count = 0
+        self.append(df)
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Append the bars of ``df``, which must follow the last buffered bar."""
+        if df is None or df.empty:
+            return
+        ts = pd.to_datetime(df["ts"], utc=True).dt.tz_localize(None).to_numpy("datetime64[ns]")
+        values = df[list(FIELDS)].to_numpy(dtype=float).T
+        if len(ts) > self.capacity:
+            self.count += len(ts) - self.capacity
+            ts, values = ts[-self.capacity:], values[:, -self.capacity:]
+        pos = (self.count + np.arange(len(ts))) % self.capacity
+        for offset in (0, self.capacity):
+            self.ts[pos + offset] = ts
+            self.values[:, pos + offset] = values
+        self.count += len(ts)
+
+    def frame(self) -> pd.DataFrame:
+        """The buffered bars, oldest first.
+
+        Price columns are views of the buffer and are only valid until the
+        next ``append`` or ``seed``.
+        """
+        start = self.count % self.capacity if self.count > self.capacity else 0
+        window = slice(start, start + len(self))
+        data = {"ts": pd.Series(self.ts[window]).dt.tz_localize("UTC")}
+        data.update(zip(FIELDS, self.values[:, window]))
+        return pd.DataFrame(data, copy=False)
+
+
+class RingBufferCache:
+    """Ring buffers keyed by (ticker, interval), least recently used first."""
+
+    def __init__(self, capacity: int, max_keys: int, idle_seconds: float):
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        self._buffers: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def get(self, key, now: float | None = None) -> RingBuffer | None:
+        now = time.monotonic() if now is None else now
+        self.evict(now)
+        entry = self._buffers.get(key)
+        if entry is None:
+            return None
+        self._buffers[key] = (entry[0], now)
+        self._buffers.move_to_end(key)
+        return entry[0]
+
+    def seed(self, key, df: pd.DataFrame, now: float | None = None) -> RingBuffer:
+        """(Re)load the buffer for ``key`` from ``df`` and return it."""
+        now = time.monotonic() if now is None else now
+        entry = self._buffers.pop(key, None)
+        buffer = entry[0] if entry else RingBuffer(self.capacity)
+        buffer.seed(df)
+        self._buffers[key] = (buffer, now)
+        self.evict(now)
+        return buffer
+
+    def discard(self, key) -> None:
+        self._buffers.pop(key, None)
+
+    def evict(self, now: float) -> None:
+        """Drop buffers beyond ``max_keys`` and those idle for ``idle_seconds``."""
+        while self._buffers:
+            key, (_, last_used) = next(iter(self._buffers.items()))
+            if len(self._buffers) <= self.max_keys and now - last_used < self.idle_seconds:
+                break
+            del self._buffers[key]
@@ -2,15 +2,35 @@ import os
 import logging
 import json
 import argparse
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
 import pandas as pd
-import psycopg2
 
-from pubsub_wrapper import PubSubClient, load_config, configure_json_logger
+from pubsub_wrapper import (
+    ConnectionPool,
+    PubSubClient,
+    configure_json_logger,
+    counter,
+    event_updates,
+    gauge,
+    histogram,
+    load_config,
+    observe_event_lag,
+    start_metrics_server,
+)
 
 try:  # allow running as a script without package context
-    from .algorithms import get_algorithm  # type: ignore
+    from .algorithms import ALGORITHMS, get_algorithm  # type: ignore
+    from .backlog import catch_up, init_worker, process_pair  # type: ignore
+    from .ring_buffer import RingBufferCache  # type: ignore
 except Exception:  # pragma: no cover - fallback for Docker build
-    from algorithms import get_algorithm  # type: ignore
+    from algorithms import ALGORITHMS, get_algorithm  # type: ignore
+    from backlog import catch_up, init_worker, process_pair  # type: ignore
+    from ring_buffer import RingBufferCache  # type: ignore
 
 configure_json_logger()
 logger = logging.getLogger(__name__)
@@ -22,6 +42,13 @@ parser.add_argument("-ta_name", help="technical indicator name")
 args, _ = parser.parse_known_args()
 
 TA_NAME = args.ta_name or os.getenv("TA_NAME", "macd")
+# One indicator, a comma separated list, or "all"; several indicators share
+# one price read and one transaction per update
+TA_NAMES = (
+    list(ALGORITHMS)
+    if TA_NAME == "all"
+    else [name.strip() for name in TA_NAME.split(",") if name.strip()]
+)
 config = load_config(ENV)
 
 DB_CONFIG = {
@@ -31,60 +58,82 @@ DB_CONFIG = {
     "host": config["PGHOST"],
     "port": int(config["PGPORT"]),
 }
+db = ConnectionPool(DB_CONFIG, maxconn=int(os.getenv("DB_POOL_MAX", "2")), name="ta")
 bus = PubSubClient(config.get("redis_url"))
 
 LOOKBACK_ROWS = 200
 
-algorithm = get_algorithm(TA_NAME, DB_CONFIG)
+# Advance persisted per-(ticker, interval) indicator state instead of
+# recomputing the lookback window on every event
+TA_INCREMENTAL = os.getenv("TA_INCREMENTAL", "false").lower() == "true"
+
+# Bars read per round trip while streaming a pair's history for the backlog
+BACKLOG_CHUNK_ROWS = int(os.getenv("BACKLOG_CHUNK_ROWS", "50000"))
+# Worker processes catching up on the backlog after the live subscription
+# starts; 0 processes it in this process before subscribing
+BACKLOG_WORKERS = int(os.getenv("BACKLOG_WORKERS", "2"))
+
+# In-memory windows are kept for at most this many (ticker, interval) pairs
+WINDOW_CACHE_KEYS = int(os.getenv("WINDOW_CACHE_KEYS", "2000"))
+# Drop a pair's window after this many seconds without an event for it
+WINDOW_IDLE_SECONDS = int(os.getenv("WINDOW_IDLE_SECONDS", "3600"))
+
+# Recent window per (ticker, interval), seeded once and then appended to
+buffers = RingBufferCache(LOOKBACK_ROWS, WINDOW_CACHE_KEYS, WINDOW_IDLE_SECONDS)
+
+# Prometheus endpoint for the metrics below; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+event_seconds = histogram(
+    "ta_event_seconds", "Time to analyse one stock.updated event", ("indicator", "kind")
+)
+rows_written = counter("ta_rows_written_total", "Indicator rows stored", ("indicator",))
+window_loads = counter(
+    "ta_window_loads_total", "Price windows by where they came from", ("indicator", "source")
+)
+window_buffers = gauge("ta_window_buffers", "(ticker, interval) windows held in memory")
+backlog_pair_seconds = histogram(
+    "ta_backlog_pair_seconds", "Time for one (ticker, interval) to catch up on its backlog"
+)
+backlog_pending_pairs = gauge("ta_backlog_pending_pairs", "Pairs still catching up on their backlog")
+startup_seconds = gauge(
+    "ta_startup_seconds", "Seconds from start until live events are handled and the backlog is done", ("stage",)
+)
+
+# Pairs handed to backlog workers that have not caught up yet
+backlog_pending: set = set()
+
+algorithms = [get_algorithm(name, DB_CONFIG, db) for name in TA_NAMES]
+algorithm = algorithms[0]
 
 
 def get_latest_ohlcv_ts(ticker: str, interval: str):
     """Return the most recent timestamp from the price table."""
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT MAX(ts) FROM stock_ohlcv WHERE ticker = %s AND interval = %s",
-        (ticker, interval),
-    )
-    result = cur.fetchone()[0]
-    cur.close()
-    conn.close()
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT MAX(ts) FROM stock_ohlcv WHERE ticker = %s AND interval = %s",
+            (ticker, interval),
+        )
+        result = cur.fetchone()[0]
+        cur.close()
     return result
 
 
-def fetch_all_ohlcv(ticker: str, interval: str) -> pd.DataFrame:
-    """Fetch all OHLCV data for a ticker/interval ordered by timestamp."""
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT ts, open, high, low, close, volume FROM stock_ohlcv WHERE ticker = %s AND interval = %s ORDER BY ts",
-        (ticker, interval),
-    )
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    if not rows:
-        return pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
-    df = pd.DataFrame(rows, columns=["ts", "open", "high", "low", "close", "volume"])
-    return df
-
-
 def fetch_recent_ohlcv(
     ticker: str, interval: str, limit: int = LOOKBACK_ROWS
 ) -> pd.DataFrame:
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT ts, open, high, low, close, volume FROM stock_ohlcv
-        WHERE ticker = %s AND interval = %s
-        ORDER BY ts DESC LIMIT %s
-        """,
-        (ticker, interval, limit),
-    )
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT ts, open, high, low, close, volume FROM stock_ohlcv
+            WHERE ticker = %s AND interval = %s
+            ORDER BY ts DESC LIMIT %s
+            """,
+            (ticker, interval, limit),
+        )
+        rows = cur.fetchall()
+        cur.close()
     if not rows:
         return pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
     df = (
@@ -95,82 +144,367 @@ def fetch_recent_ohlcv(
     return df
 
 
+def fetch_recent_ohlcv_many(pairs, limit: int = LOOKBACK_ROWS, after: dict | None = None) -> dict:
+    """Fetch the recent window for many (ticker, interval) pairs in one query.
+
+    ``after`` optionally maps pairs to a timestamp; only bars newer than it
+    are returned for those pairs.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    columns = ["ts", "open", "high", "low", "close", "volume"]
+    if not pairs:
+        return {}
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT p.ticker, p.interval, b.ts, b.open, b.high, b.low, b.close, b.volume
+            FROM unnest(%s::text[], %s::text[], %s::timestamptz[]) AS p(ticker, interval, after)
+            CROSS JOIN LATERAL (
+                SELECT ts, open, high, low, close, volume FROM stock_ohlcv s
+                WHERE s.ticker = p.ticker AND s.interval = p.interval
+                  AND (p.after IS NULL OR s.ts > p.after)
+                ORDER BY ts DESC LIMIT %s
+            ) b
+            """,
+            (
+                [t for t, _ in pairs],
+                [i for _, i in pairs],
+                [after.get(pair) for pair in pairs] if after else None,
+                limit,
+            ),
+        )
+        rows = cur.fetchall()
+        cur.close()
+    grouped = {pair: [] for pair in pairs}
+    for ticker, interval, *values in rows:
+        grouped[(ticker, interval)].append(values)
+    return {
+        pair: pd.DataFrame(values, columns=columns).sort_values("ts").reset_index(drop=True)
+        for pair, values in grouped.items()
+    }
 
 
-def process_ticker(ticker: str, interval: str) -> int:
-    price_df = fetch_recent_ohlcv(ticker, interval)
+def bars_to_frame(bars: dict) -> pd.DataFrame:
+    """Decode the columnar ``bars`` of a ``stock.updated`` payload."""
+    df = pd.DataFrame({col: bars[col] for col in ["open", "high", "low", "close", "volume"]})
+    df.insert(0, "ts", pd.to_datetime(bars["ts"], unit="s", utc=True))
+    return df
+
+
+def window_source(buffer, update: dict) -> str:
+    """Decide how to bring ``buffer`` up to date for ``update``.
+
+    ``inline`` appends the bars embedded in the update, ``delta`` queries
+    only the bars after the last buffered one, ``resync`` reloads a window
+    that has a gap or whose bars were revised, and ``db`` loads a window
+    that is not buffered yet.
+    """
+    if buffer is None or not len(buffer):
+        return "db"
+    last_ts = buffer.last_ts
+    prev_ts = update.get("prev_ts")
+    if update.get("bars") and prev_ts is not None:
+        return "inline" if pd.Timestamp(prev_ts) == last_ts else "resync"
+    first_ts = update.get("first_ts")
+    if first_ts is not None and pd.Timestamp(first_ts) <= last_ts:
+        return "resync"
+    return "delta"
+
+
+def refresh_windows(updates) -> dict:
+    """Bring the buffered window of every update's pair up to date.
+
+    Pairs needing database reads are loaded together: one query for the
+    bars after buffered windows and one for windows loaded in full.
+    Returns the buffer per (ticker, interval).
+    """
+    refreshed, deltas, reloads = {}, {}, []
+    for update in updates:
+        pair = (update["ticker"], update["interval"])
+        buffer = buffers.get(pair)
+        source = window_source(buffer, update)
+        if source == "inline":
+            buffer.append(bars_to_frame(update["bars"]))
+            refreshed[pair] = buffer
+        elif source == "delta":
+            deltas[pair] = buffer
+        else:
+            reloads.append(pair)
+        window_loads.labels(TA_NAME, source).inc()
+    if deltas:
+        fetched = fetch_recent_ohlcv_many(
+            list(deltas), after={pair: buffer.last_ts for pair, buffer in deltas.items()}
+        )
+        for pair, buffer in deltas.items():
+            buffer.append(fetched[pair])
+            refreshed[pair] = buffer
+    if reloads:
+        for pair, df in fetch_recent_ohlcv_many(reloads).items():
+            refreshed[pair] = buffers.seed(pair, df)
+    window_buffers.set(len(buffers))
+    return refreshed
+
+
+def run_algorithm(alg, ticker: str, interval: str, price_df: pd.DataFrame, cur=None) -> int:
+    # a backlog worker owns the state of pairs still catching up
+    if TA_INCREMENTAL and (ticker, interval) not in backlog_pending:
+        return alg.process_incremental(ticker, interval, price_df, cur=cur)
+    return alg.process(ticker, interval, price_df, cur=cur)
+
+
+def run_algorithms(ticker: str, interval: str, price_df: pd.DataFrame) -> dict:
+    """Run every configured algorithm on ``price_df`` and return new rows per indicator.
+
+    With several algorithms all rows are written in one transaction, each
+    algorithm under its own savepoint so a failing one is rolled back and
+    logged without losing the others.
+    """
+    if len(algorithms) == 1:
+        return {algorithm.name: run_algorithm(algorithm, ticker, interval, price_df)}
+    results = {}
+    try:
+        with db.connection() as conn:
+            cur = conn.cursor()
+            for alg in algorithms:
+                cur.execute("SAVEPOINT indicator")
+                try:
+                    results[alg.name] = run_algorithm(alg, ticker, interval, price_df, cur)
+                except Exception as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT indicator")
+                    alg.states.pop((ticker, interval), None)
+                    logger.error(f"❌ {alg.name}: failed to analyse {ticker} ({interval}): {e}")
+                    continue
+                cur.execute("RELEASE SAVEPOINT indicator")
+            cur.close()
+    except Exception:
+        # cached incremental state may be ahead of what was committed
+        for alg in algorithms:
+            alg.states.pop((ticker, interval), None)
+        raise
+    return results
+
+
+def process_ticker(
+    ticker: str,
+    interval: str,
+    price_df: pd.DataFrame | None = None,
+    update: dict | None = None,
+) -> dict:
+    if price_df is None:
+        update = {**(update or {}), "ticker": ticker, "interval": interval}
+        price_df = refresh_windows([update])[(ticker, interval)].frame()
     if price_df.empty:
         logger.info(f"⏭ No price data for {ticker} ({interval})")
-        return 0
+        return {}
 
-    rows = algorithm.process(ticker, interval, price_df)
-    logger.info(
-        f"✅ {algorithm.name.upper()} stored for {ticker} ({interval}) - {rows} new rows"
+    results = run_algorithms(ticker, interval, price_df)
+    for name, rows in results.items():
+        rows_written.labels(name).inc(rows)
+        logger.info(f"✅ {name.upper()} stored for {ticker} ({interval}) - {rows} new rows")
+    return results
+
+
+def process_batch(updates) -> dict:
+    """Analyse every update of a batch event.
+
+    Windows are refreshed together first, see ``refresh_windows``. Returns
+    the updates with new rows per indicator.
+    """
+    refreshed = refresh_windows(updates)
+    results = {name: [] for name in TA_NAMES}
+    for (ticker, interval), buffer in refreshed.items():
+        try:
+            new_rows = process_ticker(ticker, interval, buffer.frame())
+        except Exception as e:
+            logger.error(f"❌ {TA_NAME}: failed to analyse {ticker} ({interval}): {e}")
+            continue
+        for name, rows in new_rows.items():
+            if rows > 0:
+                results[name].append(
+                    {
+                        "ticker": ticker,
+                        "interval": interval,
+                        "indicator": name,
+                        "new_rows": rows,
+                    }
+                )
+    return results
+
+
+def publish_rows(name: str, ticker: str, interval: str, rows: int) -> None:
+    bus.publish(
+        "ta.updated",
+        f"ta.updated.{name}",
+        {
+            "ticker": ticker,
+            "interval": interval,
+            "indicator": name,
+            "new_rows": rows,
+        },
     )
-    return rows
 
 
-def process_backlog():
-    """Process any OHLCV rows not yet analysed for all configured tickers."""
-    symbols = config.get("symbols", [])
-    for ticker, interval in symbols:
-        latest_ta_ts = algorithm.get_latest_ts(ticker, interval)
-        latest_price_ts = get_latest_ohlcv_ts(ticker, interval)
+def backlog_pairs() -> list[tuple]:
+    """Return ``(ticker, interval, written_after)`` for pairs with unanalysed bars, most behind first.
 
+    ``written_after`` maps each algorithm that is behind to the latest ts
+    in its indicator table (``None`` if empty). With ``TA_INCREMENTAL``
+    algorithms without stored state are queued too, after the lagging
+    pairs, since only the backlog seeds state.
+    """
+    pending = []
+    for ticker, interval in config.get("symbols", []):
+        latest_price_ts = get_latest_ohlcv_ts(ticker, interval)
         if latest_price_ts is None:
             continue
-        if latest_ta_ts and latest_ta_ts >= latest_price_ts:
-            continue
+        written_after, lag = {}, timedelta(0)
+        for alg in algorithms:
+            latest_ta_ts = alg.get_latest_ts(ticker, interval)
+            if not latest_ta_ts:
+                written_after[alg.name] = None
+                lag = timedelta.max
+            elif latest_ta_ts < latest_price_ts:
+                written_after[alg.name] = latest_ta_ts
+                lag = max(lag, latest_price_ts - latest_ta_ts)
+            elif TA_INCREMENTAL and alg.load_state(ticker, interval)[0] is None:
+                written_after[alg.name] = latest_ta_ts
+        if written_after:
+            pending.append((lag, ticker, interval, written_after))
+    pending.sort(key=lambda item: item[0], reverse=True)
+    return [(ticker, interval, after) for _, ticker, interval, after in pending]
 
-        price_df = fetch_all_ohlcv(ticker, interval)
-        if price_df.empty:
-            continue
 
-        price_df = price_df.iloc[LOOKBACK_ROWS:]
-        rows = algorithm.process(ticker, interval, price_df)
+def report_backlog(ticker: str, interval: str, results: dict, seconds: float) -> None:
+    backlog_pair_seconds.observe(seconds)
+    logger.info(f"✅ Caught up {ticker} ({interval}) in {seconds:.1f}s - {results}")
+    for name, rows in results.items():
         if rows > 0:
-            logger.info(
-                f"✅ Processed backlog for {ticker} ({interval}) - {rows} rows"
-            )
-            bus.publish(
-                "ta.updated",
-                f"ta.updated.{TA_NAME}",
-                {
-                    "ticker": ticker,
-                    "interval": interval,
-                    "indicator": TA_NAME,
-                    "new_rows": rows,
-                },
-            )
+            publish_rows(name, ticker, interval, rows)
+
+
+def process_backlog():
+    """Process any OHLCV rows not yet analysed for all configured tickers.
+
+    Each pair's history is streamed in ``BACKLOG_CHUNK_ROWS`` chunks, see
+    ``backlog.process_pair``.
+    """
+    by_name = {alg.name: alg for alg in algorithms}
+    for ticker, interval, written_after in backlog_pairs():
+        started = time.perf_counter()
+        pending = [by_name[name] for name in written_after]
+        try:
+            results = process_pair(db, pending, ticker, interval, BACKLOG_CHUNK_ROWS, written_after)
+        except Exception as e:
+            logger.error(f"❌ {TA_NAME}: backlog failed for {ticker} ({interval}): {e}")
+            continue
+        report_backlog(ticker, interval, results, time.perf_counter() - started)
+
+
+def backlog_executor() -> ProcessPoolExecutor:
+    # fork: spawned workers would re-run this module's startup on import
+    return ProcessPoolExecutor(
+        max_workers=BACKLOG_WORKERS,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=init_worker,
+        initargs=(DB_CONFIG, TA_NAMES),
+    )
+
+
+def queue_backlog() -> list[tuple]:
+    """Find the backlog and mark its pairs pending; call before subscribing.
+
+    Live events for pending pairs write windowed rows, so each pair's
+    ``written_after`` has to be read before any of them arrive.
+    """
+    pairs = backlog_pairs()
+    backlog_pending.update((ticker, interval) for ticker, interval, _ in pairs)
+    backlog_pending_pairs.set(len(backlog_pending))
+    return pairs
+
+
+def process_backlog_parallel(started: float, pairs: list[tuple]):
+    """Catch up on ``pairs`` from ``queue_backlog`` in ``BACKLOG_WORKERS`` processes.
+
+    Runs alongside the live subscription. Until a pair has caught up its
+    live events use the windowed computation, since its incremental state
+    belongs to the worker.
+    """
+    if pairs:
+        logger.info(f"{TA_NAME}: catching up {len(pairs)} pairs in {BACKLOG_WORKERS} workers")
+        with backlog_executor() as executor:
+            futures = {
+                executor.submit(catch_up, ticker, interval, after, BACKLOG_CHUNK_ROWS): (ticker, interval)
+                for ticker, interval, after in pairs
+            }
+            for future in as_completed(futures):
+                ticker, interval = futures[future]
+                backlog_pending.discard((ticker, interval))
+                backlog_pending_pairs.set(len(backlog_pending))
+                try:
+                    _, _, results, seconds = future.result()
+                except Exception as e:
+                    logger.error(f"❌ {TA_NAME}: backlog failed for {ticker} ({interval}): {e}")
+                    continue
+                report_backlog(ticker, interval, results, seconds)
+    elapsed = time.monotonic() - started
+    startup_seconds.labels("caught_up").set(elapsed)
+    logger.info(f"📊 Backlog of {len(pairs)} pairs done {elapsed:.1f}s after start")
+
+
+def handle_event(payload: dict):
+    """Analyse one ``stock.updated`` payload and publish ``ta.updated`` per indicator."""
+    if "updates" in payload:
+        updates = event_updates(payload)
+        logger.info(f"{TA_NAME}: analysing batch of {len(updates)} updates")
+        results = process_batch(updates)
+        for name, updated in results.items():
+            if updated:
+                bus.publish(
+                    "ta.updated",
+                    f"ta.updated.{name}",
+                    {"indicator": name, "updates": updated},
+                )
+        return
+    ticker = payload.get("ticker")
+    interval = payload.get("interval")
+    logger.info(f"{TA_NAME}: analysing {ticker} ({interval})")
+    for name, new_rows in process_ticker(ticker, interval, update=payload).items():
+        if new_rows > 0:
+            publish_rows(name, ticker, interval, new_rows)
+            logger.debug(f"Pushed update to ta.updated: {name} {ticker} {interval}")
 
 
 def run():
+    started = time.monotonic()
     logger.info(f"TA service '{TA_NAME}' starting test")
-    process_backlog()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    if BACKLOG_WORKERS <= 0:
+        process_backlog()
+        startup_seconds.labels("caught_up").set(time.monotonic() - started)
+    else:
+        pairs = queue_backlog()
     pubsub = bus.subscribe("stock.updated")
-    logger.info(f"Subscribed to 'stock.updated' on {config.get('redis_url')}")
+    startup_seconds.labels("live").set(time.monotonic() - started)
+    logger.info(
+        f"Subscribed to 'stock.updated' on {config.get('redis_url')} "
+        f"{time.monotonic() - started:.1f}s after start"
+    )
+    if BACKLOG_WORKERS > 0:
+        threading.Thread(
+            target=process_backlog_parallel, args=(started, pairs), name="backlog", daemon=True
+        ).start()
     for msg in pubsub.listen():
         logger.info(f"Received message: {msg}")
         if msg["type"] != "message":
             continue
         logger.debug(f"Received message: {msg}")
         event = json.loads(msg["data"])
-        ticker = event["payload"].get("ticker")
-        interval = event["payload"].get("interval")
-        logger.info(f"{TA_NAME}: analysing {ticker} ({interval})")
-        new_rows = process_ticker(ticker, interval)
-        if new_rows > 0:
-            bus.publish(
-                "ta.updated",
-                f"ta.updated.{TA_NAME}",
-                {
-                    "ticker": ticker,
-                    "interval": interval,
-                    "indicator": TA_NAME,
-                    "new_rows": new_rows,
-                },
-            )
-            logger.debug(f"Pushed update to ta.updated: {TA_NAME} {ticker} {interval}")
+        observe_event_lag("stock.updated", event)
+        kind = "batch" if "updates" in event["payload"] else "ticker"
+        with event_seconds.labels(TA_NAME, kind).time():
+            handle_event(event["payload"])
 
 
 if __name__ == "__main__":
@@ -26,6 +26,13 @@ def load_ta_service():
         return importlib.import_module("services.ta.ta_service")
 
 
+def make_bars(periods, start="2024-01-01", close=1.0):
+    return pd.DataFrame({
+        "ts": pd.date_range(start, periods=periods, freq="min", tz="UTC"),
+        "open": 1.0, "high": 1.0, "low": 1.0, "close": close, "volume": 1,
+    })
+
+
 class TestAlgorithms(unittest.TestCase):
     def test_macd_crossover_detection(self):
         from services.ta.algorithms.macd import MACD, talib as macd_talib
@@ -111,25 +118,529 @@ class TestAlgorithms(unittest.TestCase):
         pd.testing.assert_series_equal(result["obv"], pd.Series([5, 10]), check_names=False)
 
 
+class TestIncrementalState(unittest.TestCase):
+    def prices(self, n=300, seed=3):
+        rng = np.random.default_rng(seed)
+        close = 100 + rng.standard_normal(n).cumsum()
+        close[50:60] = close[49]
+        volume = rng.integers(1, 1000, n).astype(float)
+        return close, volume
+
+    def test_sma_and_obv_values(self):
+        from services.ta.algorithms.incremental import OBVState, SMAState
+
+        sma = SMAState(3)
+        outs = [sma.update(c)["sma"] for c in [1.0, 2.0, 3.0, 4.0, 5.0]]
+        self.assertEqual(outs, [None, None, 2.0, 3.0, 4.0])
+
+        obv = OBVState()
+        outs = [obv.update(c, v)["obv"] for c, v in [(1, 10), (2, 20), (2, 5), (1, 7)]]
+        self.assertEqual(outs, [10, 30, 30, 23])
+
+    def test_macd_starts_on_bar_33(self):
+        from services.ta.algorithms.incremental import MACDState
+
+        close, _ = self.prices()
+        state = MACDState()
+        outs = [state.update(c) for c in close]
+        self.assertIsNone(outs[32]["macd"])
+        self.assertIsNotNone(outs[33]["macd"])
+        self.assertFalse(outs[33]["macd_crossover"])
+
+    def test_state_round_trips_through_json(self):
+        from services.ta.algorithms.incremental import (
+            BollingerState, MACDState, OBVState, RSIState, SMAState,
+        )
+
+        close, volume = self.prices()
+        for cls in (MACDState, RSIState, SMAState, BollingerState, OBVState):
+            state = cls()
+            for c, v in zip(close[:150], volume[:150]):
+                state.update(c, v)
+            restored = cls.from_dict(json.loads(json.dumps(state.to_dict())))
+            for c, v in zip(close[150:], volume[150:]):
+                self.assertEqual(state.update(c, v), restored.update(c, v), cls.__name__)
+
+
+try:
+    import talib as real_talib
+except Exception:  # pragma: no cover - C library not installed
+    real_talib = None
+
+
+@unittest.skipUnless(
+    hasattr(real_talib, "RSI") and hasattr(real_talib, "BBANDS"), "TA-Lib is not installed"
+)
+class TestIncrementalParity(unittest.TestCase):
+    """Bar-by-bar state must match one TA-Lib call over the whole series."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.close = 100 + rng.standard_normal(1000).cumsum()
+        self.close[200:215] = self.close[199]
+        self.volume = rng.integers(1, 10_000, 1000).astype(float)
+
+    def fold(self, state, field):
+        values = [state.update(c, v)[field] for c, v in zip(self.close, self.volume)]
+        return np.array([np.nan if x is None else x for x in values], dtype=float)
+
+    def assert_parity(self, ours, theirs):
+        np.testing.assert_array_equal(np.isnan(ours), np.isnan(theirs))
+        np.testing.assert_allclose(ours, theirs, rtol=0, atol=1e-8)
+
+    def test_macd(self):
+        from services.ta.algorithms.incremental import MACDState
+
+        macd, signal, hist = real_talib.MACD(self.close)
+        self.assert_parity(self.fold(MACDState(), "macd"), macd)
+        self.assert_parity(self.fold(MACDState(), "macd_signal"), signal)
+        self.assert_parity(self.fold(MACDState(), "macd_hist"), hist)
+
+    def test_rsi(self):
+        from services.ta.algorithms.incremental import RSIState
+
+        self.assert_parity(self.fold(RSIState(), "rsi"), real_talib.RSI(self.close))
+
+    def test_sma(self):
+        from services.ta.algorithms.incremental import SMAState
+
+        self.assert_parity(self.fold(SMAState(), "sma"), real_talib.SMA(self.close))
+
+    def test_bbands(self):
+        from services.ta.algorithms.incremental import BollingerState
+
+        upper, middle, lower = real_talib.BBANDS(self.close)
+        self.assert_parity(self.fold(BollingerState(), "bb_upper"), upper)
+        self.assert_parity(self.fold(BollingerState(), "bb_middle"), middle)
+        self.assert_parity(self.fold(BollingerState(), "bb_lower"), lower)
+
+    def test_obv(self):
+        from services.ta.algorithms.incremental import OBVState
+
+        self.assert_parity(self.fold(OBVState(), "obv"), real_talib.OBV(self.close, self.volume))
+
+
+class TestNumpyBackend(unittest.TestCase):
+    """The vectorised backend must agree with the bar-by-bar state."""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.close = 100 + rng.standard_normal(1000).cumsum()
+        self.close[200:215] = self.close[199]
+        self.volume = rng.integers(1, 10_000, 1000).astype(float)
+
+    def fold(self, state, *fields):
+        rows = [state.update(c, v) for c, v in zip(self.close, self.volume)]
+        return [np.array([np.nan if r[f] is None else r[f] for r in rows]) for f in fields]
+
+    def assert_close(self, ours, theirs):
+        np.testing.assert_array_equal(np.isnan(ours), np.isnan(theirs))
+        np.testing.assert_allclose(ours, theirs, rtol=0, atol=1e-8)
+
+    def test_matches_incremental_state(self):
+        from services.ta.algorithms import numpy_backend as nb
+        from services.ta.algorithms.incremental import (
+            BollingerState, MACDState, OBVState, RSIState, SMAState,
+        )
+
+        cases = [
+            (MACDState(), ("macd", "macd_signal", "macd_hist"), nb.MACD(self.close)),
+            (RSIState(), ("rsi",), (nb.RSI(self.close),)),
+            (SMAState(), ("sma",), (nb.SMA(self.close),)),
+            (BollingerState(), ("bb_upper", "bb_middle", "bb_lower"), nb.BBANDS(self.close)),
+            (OBVState(), ("obv",), (nb.OBV(self.close, self.volume),)),
+        ]
+        for state, fields, outputs in cases:
+            for expected, ours in zip(self.fold(state, *fields), outputs):
+                self.assert_close(ours, expected)
+
+    def test_linear_filter_across_blocks(self):
+        from services.ta.algorithms import numpy_backend as nb
+
+        x = self.close[:700]
+        expected, y = [], 5.0
+        for value in x:
+            y = 0.9 * y + 0.1 * value
+            expected.append(y)
+        np.testing.assert_allclose(nb._linear_filter(x, 0.9, 0.1, 5.0), expected, rtol=1e-12)
+
+    def test_adx_of_steady_trend(self):
+        from services.ta.algorithms import numpy_backend as nb
+
+        close = np.arange(60, dtype=float)
+        adx = nb.ADX(close + 1, close - 1, close)
+        self.assertTrue(np.isnan(adx[:27]).all())
+        np.testing.assert_allclose(adx[27:], 100.0)
+
+    def test_leading_nans_are_skipped(self):
+        from services.ta.algorithms import numpy_backend as nb
+
+        close = self.close.copy()
+        close[:5] = np.nan
+        self.assert_close(nb.RSI(close)[5:], nb.RSI(self.close[5:]))
+        self.assertTrue(np.isnan(nb.RSI(close)[:19]).all())
+
+    def test_backend_selected_by_env(self):
+        from services.ta.algorithms import backend, numpy_backend
+
+        try:
+            with patch.dict("os.environ", {"TA_BACKEND": "numpy"}):
+                self.assertIs(importlib.reload(backend).talib, numpy_backend)
+            with patch.dict("os.environ", {"TA_BACKEND": "pandas"}):
+                with self.assertRaises(ValueError):
+                    importlib.reload(backend)
+        finally:
+            importlib.reload(backend)
+
+
+@unittest.skipUnless(hasattr(real_talib, "ADX"), "TA-Lib is not installed")
+class TestNumpyBackendParity(unittest.TestCase):
+    """Each vectorised function must match TA-Lib on the same arrays."""
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.close = 100 + rng.standard_normal(5000).cumsum()
+        self.close[300:340] = self.close[299]
+        self.high = self.close + rng.random(5000)
+        self.low = self.close - rng.random(5000)
+        self.high[300:340] = self.low[300:340] = self.close[300:340]
+        self.volume = rng.integers(1, 10_000, 5000).astype(float)
+
+    def assert_parity(self, ours, theirs):
+        ours = ours if isinstance(ours, tuple) else (ours,)
+        theirs = theirs if isinstance(theirs, tuple) else (theirs,)
+        for a, b in zip(ours, theirs):
+            np.testing.assert_array_equal(np.isnan(a), np.isnan(b))
+            np.testing.assert_allclose(a, b, rtol=0, atol=1e-8)
+
+    def test_functions(self):
+        from services.ta.algorithms import numpy_backend as nb
+
+        for name in ("MACD", "RSI", "SMA", "BBANDS"):
+            with self.subTest(name):
+                self.assert_parity(getattr(nb, name)(self.close), getattr(real_talib, name)(self.close))
+        self.assert_parity(nb.OBV(self.close, self.volume), real_talib.OBV(self.close, self.volume))
+
+    def test_adx(self):
+        from services.ta.algorithms import numpy_backend as nb
+
+        self.assert_parity(
+            nb.ADX(self.high, self.low, self.close),
+            real_talib.ADX(self.high, self.low, self.close),
+        )
+
+
+class TestProcessIncremental(unittest.TestCase):
+    def bars(self, start, n):
+        return pd.DataFrame({
+            "ts": pd.date_range("2024-01-02 14:30", periods=40, freq="min", tz="UTC")[start:start + n],
+            "close": np.arange(start, start + n, dtype=float) + 1,
+            "volume": [100] * n,
+        })
+
+    def test_without_state_computes_window_and_leaves_seeding_to_backlog(self):
+        from unittest.mock import MagicMock
+        from services.ta.algorithms.sma import SMA
+
+        algo = SMA({}, pool=MagicMock())
+        window = self.bars(30, 5)
+        with patch.object(algo, "load_state", return_value=(None, None)), \
+             patch.object(algo, "fetch_bars") as fetch, \
+             patch.object(algo, "process", return_value=2) as process:
+            self.assertEqual(algo.process_incremental("AAPL", "1m", window), 2)
+        fetch.assert_not_called()
+        process.assert_called_once_with("AAPL", "1m", window, None)
+        self.assertNotIn(("AAPL", "1m"), algo.states)
+
+    def test_advances_stored_state_from_window(self):
+        from unittest.mock import MagicMock
+        from services.ta.algorithms.sma import SMA
+
+        pool = MagicMock()
+        cur = pool.connection.return_value.__enter__.return_value.cursor.return_value
+        algo = SMA({}, pool=pool)
+        history = self.bars(0, 35)
+        state = algo.state_class()
+        for close in history["close"]:
+            state.update(close)
+        algo.states[("AAPL", "1m")] = (state, history["ts"].iloc[-1])
+
+        window = self.bars(30, 7)
+        with patch.object(algo, "fetch_bars") as fetch:
+            algo.process_incremental("AAPL", "1m", window)
+        fetch.assert_not_called()
+        written = cur.executemany.call_args.args[1]
+        self.assertEqual([row[3] for row in written], [21.5, 22.5])
+        self.assertIn("stock_ta_state", cur.execute.call_args.args[0])
+        self.assertEqual(algo.states[("AAPL", "1m")][1], window["ts"].iloc[-1])
+
+    def test_queries_bars_when_window_starts_after_state(self):
+        from unittest.mock import MagicMock
+        from services.ta.algorithms.incremental import OBVState
+        from services.ta.algorithms.obv import OBV
+
+        algo = OBV({}, pool=MagicMock())
+        state = OBVState.from_dict({"prev_close": 5.0, "obv": 1000.0})
+        seen = self.bars(0, 5)
+        algo.states[("AAPL", "1m")] = (state, seen["ts"].iloc[-1])
+        with patch.object(algo, "fetch_bars", return_value=self.bars(5, 3)) as fetch:
+            algo.process_incremental("AAPL", "1m", self.bars(7, 1))
+        fetch.assert_called_once_with("AAPL", "1m", after=seen["ts"].iloc[-1], cur=None)
+        self.assertEqual(algo.states[("AAPL", "1m")][0].obv, 1300.0)
+
+
+class TestBacklog(unittest.TestCase):
+    def history(self, n=80):
+        rng = np.random.default_rng(5)
+        return pd.DataFrame({
+            "ts": pd.date_range("2024-01-01", periods=n, freq="min", tz="UTC"),
+            "close": 100 + rng.standard_normal(n).cumsum(),
+            "volume": rng.integers(1, 100, n),
+        })
+
+    def test_stream_bars_reads_named_cursor_in_chunks(self):
+        from unittest.mock import MagicMock
+        from services.ta.backlog import stream_bars
+
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        rows = list(self.history(5).itertuples(index=False, name=None))
+        cur.fetchmany.side_effect = [rows[:3], rows[3:], []]
+        chunks = list(stream_bars(conn, "AAPL", "1m", chunk_rows=3))
+        conn.cursor.assert_called_once_with(name="ta_backlog")
+        cur.fetchmany.assert_called_with(3)
+        self.assertEqual([len(c) for c in chunks], [3, 2])
+        cur.close.assert_called_once()
+
+    def test_chunked_backlog_matches_one_pass(self):
+        from unittest.mock import MagicMock
+        from services.ta import backlog
+        from services.ta.algorithms.incremental import SMAState
+        from services.ta.algorithms.sma import SMA
+
+        pool = MagicMock()
+        cur = pool.connection.return_value.__enter__.return_value.cursor.return_value
+        algo = SMA({}, pool=pool)
+        history = self.history()
+        chunks = [history.iloc[i:i + 7] for i in range(0, len(history), 7)]
+        with patch.object(algo, "load_state", return_value=(None, None)), \
+             patch.object(algo, "get_latest_ts", return_value=None), \
+             patch.object(backlog, "stream_bars", return_value=iter(chunks)) as stream:
+            backlog.process_pair(pool, [algo], "AAPL", "1m", chunk_rows=7)
+        stream.assert_called_once()
+        self.assertIsNone(stream.call_args.args[3])
+
+        written = [row[3] for call in cur.executemany.call_args_list for row in call.args[1]]
+        state = SMAState()
+        expected = [state.update(c)["sma"] for c in history["close"]]
+        self.assertEqual(written, expected)
+        self.assertEqual(algo.states[("AAPL", "1m")][1], history["ts"].iloc[-1])
+
+    def test_failing_indicator_is_dropped_from_stream(self):
+        from unittest.mock import MagicMock
+        from services.ta import backlog
+        from services.ta.algorithms.obv import OBV
+        from services.ta.algorithms.sma import SMA
+
+        pool = MagicMock()
+        cur = pool.connection.return_value.__enter__.return_value.cursor.return_value
+        sma, obv = SMA({}, pool=pool), OBV({}, pool=pool)
+        history = self.history(20)
+        chunks = [history.iloc[:10], history.iloc[10:]]
+        with patch.object(backlog, "starting_points", return_value={
+                 sma: [sma.state_class(), None, None], obv: [obv.state_class(), None, None]}), \
+             patch.object(backlog, "stream_bars", return_value=iter(chunks)), \
+             patch.object(obv, "insert_records", side_effect=ValueError("boom")) as obv_insert, \
+             patch.object(sma, "insert_records", return_value=10):
+            rows = backlog.process_pair(pool, [sma, obv], "AAPL", "1m", chunk_rows=10)
+        self.assertEqual(rows, {"sma": 20, "obv": 0})
+        obv_insert.assert_called_once()
+        self.assertIn("ROLLBACK TO SAVEPOINT indicator", [c.args[0] for c in cur.execute.call_args_list])
+        self.assertNotIn(("AAPL", "1m"), obv.states)
+
+    def test_live_rows_written_before_worker_starts_are_not_skipped(self):
+        from unittest.mock import MagicMock
+        from services.ta import backlog
+        from services.ta.algorithms.sma import SMA
+
+        pool = MagicMock()
+        cur = pool.connection.return_value.__enter__.return_value.cursor.return_value
+        algo = SMA({}, pool=pool)
+        history = self.history(40)
+        queued_at = history["ts"].iloc[9]
+        # a live event wrote the newest window after the pair was queued
+        with patch.object(algo, "load_state", return_value=(None, None)), \
+             patch.object(algo, "get_latest_ts", return_value=history["ts"].iloc[-1]), \
+             patch.object(backlog, "stream_bars", return_value=iter([history])):
+            backlog.process_pair(pool, [algo], "AAPL", "1m", 50, {"sma": queued_at})
+
+        written = [row[2] for call in cur.executemany.call_args_list for row in call.args[1]]
+        self.assertEqual(written, list(history["ts"].iloc[10:]))
+
+
 class TestTAService(unittest.TestCase):
     def test_process_ticker_delegates(self):
         ts = load_ta_service()
-        df = pd.DataFrame({
-            "ts": pd.date_range("2024-01-01", periods=2),
-            "open": [1, 1],
-            "high": [1, 1],
-            "low": [1, 1],
-            "close": [1, 1],
-            "volume": [1, 1],
-        })
+        df = make_bars(2)
 
-        with patch.object(ts, "fetch_recent_ohlcv", return_value=df) as mock_fetch, \
+        with patch.object(ts, "fetch_recent_ohlcv_many", return_value={("AAPL", "1d"): df}) as mock_fetch, \
              patch.object(ts.algorithm, "process", return_value=3) as mock_proc:
             rows = ts.process_ticker("AAPL", "1d")
 
-        mock_fetch.assert_called_once()
+        mock_fetch.assert_called_once_with([("AAPL", "1d")])
         mock_proc.assert_called_once()
-        assert rows == 3
+        assert rows == {"macd": 3}
+
+    def test_process_ticker_appends_contiguous_inline_bars(self):
+        ts = load_ta_service()
+        cached = make_bars(ts.LOOKBACK_ROWS)
+        buffer = ts.buffers.seed(("AAPL", "1m"), cached)
+        last = cached["ts"].iloc[-1]
+        update = {
+            "prev_ts": last.isoformat(),
+            "bars": {
+                "ts": [int(last.timestamp()) + 60],
+                "open": [2.0], "high": [2.0], "low": [2.0], "close": [2.0], "volume": [5],
+            },
+        }
+        with patch.object(ts, "fetch_recent_ohlcv_many") as mock_fetch, \
+             patch.object(ts.algorithm, "process", return_value=1) as mock_proc:
+            ts.process_ticker("AAPL", "1m", update=update)
+        mock_fetch.assert_not_called()
+        window = mock_proc.call_args.args[2]
+        assert len(window) == ts.LOOKBACK_ROWS
+        assert window["ts"].iloc[-1] == last + pd.Timedelta(minutes=1)
+        assert window["close"].iloc[-1] == 2.0
+        assert np.shares_memory(window["close"].to_numpy(), buffer.values)
+
+    def test_process_ticker_resyncs_when_inline_bars_have_a_gap(self):
+        ts = load_ta_service()
+        ts.buffers.seed(("AAPL", "1m"), make_bars(1))
+        update = {
+            "prev_ts": "2024-01-01T00:05:00+00:00",
+            "bars": {"ts": [1704067560], "open": [1.0], "high": [1.0], "low": [1.0], "close": [1.0], "volume": [1]},
+        }
+        windows = {("AAPL", "1m"): make_bars(3)}
+        with patch.object(ts, "fetch_recent_ohlcv_many", return_value=windows) as mock_fetch, \
+             patch.object(ts.algorithm, "process", return_value=1):
+            ts.process_ticker("AAPL", "1m", update=update)
+        mock_fetch.assert_called_once_with([("AAPL", "1m")])
+        assert len(ts.buffers.get(("AAPL", "1m"))) == 3
+
+    def test_process_ticker_resyncs_revised_bars(self):
+        ts = load_ta_service()
+        ts.buffers.seed(("AAPL", "1m"), make_bars(5))
+        update = {"first_ts": "2024-01-01T00:02:00+00:00"}
+        with patch.object(ts, "fetch_recent_ohlcv_many", return_value={("AAPL", "1m"): make_bars(5)}) as mock_fetch, \
+             patch.object(ts.algorithm, "process", return_value=1):
+            ts.process_ticker("AAPL", "1m", update=update)
+        mock_fetch.assert_called_once_with([("AAPL", "1m")])
+
+    def test_drained_spool_segment_behind_buffered_window_reloads_it(self):
+        ts = load_ta_service()
+        ts.buffers.seed(("AAPL", "1m"), make_bars(10))
+        # per-ticker event of a spool drain for bars under the buffered ones
+        payload = {
+            "ticker": "AAPL", "interval": "1m", "new_rows": 3,
+            "first_ts": "2024-01-01T00:02:00+00:00", "last_ts": "2024-01-01T00:04:00+00:00",
+        }
+        window = make_bars(10, close=2.0)
+        with patch.object(ts, "fetch_recent_ohlcv_many", return_value={("AAPL", "1m"): window}) as mock_fetch, \
+             patch.object(ts.algorithm, "process", return_value=0) as mock_proc:
+            ts.handle_event(payload)
+        mock_fetch.assert_called_once_with([("AAPL", "1m")])
+        assert list(mock_proc.call_args.args[2]["close"]) == [2.0] * 10
+
+    def test_process_ticker_reads_only_new_bars_of_buffered_window(self):
+        ts = load_ta_service()
+        ts.buffers.seed(("AAPL", "1m"), make_bars(5))
+        last = pd.Timestamp("2024-01-01 00:04", tz="UTC")
+        new = {("AAPL", "1m"): make_bars(2, start="2024-01-01 00:05", close=3.0)}
+        with patch.object(ts, "fetch_recent_ohlcv_many", return_value=new) as mock_fetch, \
+             patch.object(ts.algorithm, "process", return_value=1) as mock_proc:
+            ts.process_ticker("AAPL", "1m", update={"new_rows": 2})
+        mock_fetch.assert_called_once_with([("AAPL", "1m")], after={("AAPL", "1m"): last})
+        window = mock_proc.call_args.args[2]
+        assert list(window["close"]) == [1.0] * 5 + [3.0] * 2
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_window_matches_tail_across_wraparound(self):
+        from services.ta.ring_buffer import RingBuffer
+
+        rng = np.random.default_rng(0)
+        full = pd.DataFrame({
+            "ts": pd.date_range("2024-01-01", periods=300, freq="min", tz="UTC", unit="ns"),
+            **{f: rng.random(300) for f in ["open", "high", "low", "close", "volume"]},
+        })
+        buffer = RingBuffer(7)
+        end = 0
+        while end < len(full):
+            step = int(rng.integers(1, 12))
+            buffer.append(full.iloc[end:end + step])
+            end = min(end + step, len(full))
+            expected = full.iloc[max(0, end - 7):end].reset_index(drop=True)
+            pd.testing.assert_frame_equal(buffer.frame(), expected)
+            assert buffer.last_ts == expected["ts"].iloc[-1]
+
+    def test_cache_evicts_least_recent_and_idle_keys(self):
+        from services.ta.ring_buffer import RingBufferCache
+
+        bars = make_bars(2)
+        cache = RingBufferCache(capacity=4, max_keys=2, idle_seconds=60)
+        cache.seed("a", bars, now=0)
+        cache.seed("b", bars, now=1)
+        assert cache.get("a", now=2) is not None
+        cache.seed("c", bars, now=3)
+        assert cache.get("b", now=4) is None
+        assert len(cache) == 2
+        assert cache.get("c", now=50) is not None
+        assert cache.get("a", now=70) is None
+        assert len(cache) == 1
+
+
+class TestMultiIndicator(unittest.TestCase):
+    def load(self, names="macd,rsi"):
+        with patch.dict("os.environ", {"TA_NAME": names}):
+            return load_ta_service()
+
+    def test_all_loads_every_algorithm(self):
+        ts = self.load("all")
+        from services.ta.algorithms import ALGORITHMS
+        self.assertEqual([alg.name for alg in ts.algorithms], list(ALGORITHMS))
+
+    def test_failing_indicator_is_rolled_back_alone(self):
+        ts = self.load()
+        mock_conn = patch("psycopg2.connect").start()
+        self.addCleanup(patch.stopall)
+        cur = mock_conn.return_value.cursor.return_value
+        macd, rsi = ts.algorithms
+        df = pd.DataFrame({"ts": [pd.Timestamp("2024-01-01")], "close": [1.0]})
+        with patch.object(macd, "process", side_effect=ValueError("boom")), \
+             patch.object(rsi, "process", return_value=4) as mock_rsi:
+            results = ts.run_algorithms("AAPL", "1d", df)
+        self.assertEqual(results, {"rsi": 4})
+        assert mock_rsi.call_args.kwargs["cur"] is cur
+        statements = [c.args[0] for c in cur.execute.call_args_list]
+        self.assertEqual(
+            statements,
+            ["SAVEPOINT indicator", "ROLLBACK TO SAVEPOINT indicator",
+             "SAVEPOINT indicator", "RELEASE SAVEPOINT indicator"],
+        )
+        mock_conn.return_value.commit.assert_called_once()
+
+    def test_one_price_read_publishes_per_indicator(self):
+        ts = self.load()
+        df = make_bars(1)
+        with patch.object(ts, "fetch_recent_ohlcv_many", return_value={("AAPL", "1d"): df}) as mock_fetch, \
+             patch.object(ts, "run_algorithms", return_value={"macd": 2, "rsi": 0}), \
+             patch.object(ts.bus, "publish") as mock_pub:
+            ts.handle_event({"ticker": "AAPL", "interval": "1d"})
+        mock_fetch.assert_called_once()
+        mock_pub.assert_called_once()
+        self.assertEqual(mock_pub.call_args.args[1], "ta.updated.macd")
+        self.assertEqual(mock_pub.call_args.args[2]["new_rows"], 2)
+
 
 class TestTAServiceDB(unittest.TestCase):
     def test_get_latest_ohlcv_ts(self):
@@ -144,49 +655,134 @@ class TestTAServiceDB(unittest.TestCase):
         mock_conn.return_value.close.assert_called_once()
         assert result == pd.Timestamp('2024-01-01')
 
-    def test_fetch_all_ohlcv(self):
+    def test_fetch_recent_ohlcv(self):
         ts = load_ta_service()
         mock_conn = patch('psycopg2.connect').start()
         self.addCleanup(patch.stopall)
         cur = mock_conn.return_value.cursor.return_value
         cur.fetchall.return_value = [
-            (pd.Timestamp('2024-01-01'), 1, 2, 1.5, 1.8, 10)
+            (pd.Timestamp('2024-01-02'), 1, 1, 1, 1, 1),
+            (pd.Timestamp('2024-01-01'), 1, 1, 1, 1, 1)
         ]
-        df = ts.fetch_all_ohlcv('AAPL', '1d')
-        assert df.shape == (1, 6)
-        assert list(df.columns) == ['ts', 'open', 'high', 'low', 'close', 'volume']
+        df = ts.fetch_recent_ohlcv('AAPL', '1d', limit=2)
+        assert list(df['ts']) == [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02')]
         cur.execute.assert_called_once()
         cur.close.assert_called_once()
         mock_conn.return_value.close.assert_called_once()
 
-    def test_fetch_recent_ohlcv(self):
+    def test_fetch_recent_ohlcv_many_groups_rows(self):
         ts = load_ta_service()
         mock_conn = patch('psycopg2.connect').start()
         self.addCleanup(patch.stopall)
         cur = mock_conn.return_value.cursor.return_value
         cur.fetchall.return_value = [
-            (pd.Timestamp('2024-01-02'), 1, 1, 1, 1, 1),
-            (pd.Timestamp('2024-01-01'), 1, 1, 1, 1, 1)
+            ('AAPL', '1d', pd.Timestamp('2024-01-02'), 1, 1, 1, 1, 1),
+            ('AAPL', '1d', pd.Timestamp('2024-01-01'), 1, 1, 1, 1, 1),
         ]
-        df = ts.fetch_recent_ohlcv('AAPL', '1d', limit=2)
-        assert list(df['ts']) == [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02')]
+        windows = ts.fetch_recent_ohlcv_many([('AAPL', '1d'), ('MSFT', '1d'), ('AAPL', '1d')])
         cur.execute.assert_called_once()
-        cur.close.assert_called_once()
-        mock_conn.return_value.close.assert_called_once()
+        assert cur.execute.call_args.args[1] == (['AAPL', 'MSFT'], ['1d', '1d'], None, ts.LOOKBACK_ROWS)
+        assert list(windows[('AAPL', '1d')]['ts']) == [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02')]
+        assert windows[('MSFT', '1d')].empty
 
 class TestTAServiceIntegration(unittest.TestCase):
-    def test_process_backlog_publishes_updates(self):
+    def test_process_backlog_streams_pending_pairs(self):
         ts = load_ta_service()
-        ts.config['symbols'] = [('AAPL', '1d')]
-        with patch.object(ts.algorithm, 'get_latest_ts', return_value=None), \
-             patch.object(ts, 'get_latest_ohlcv_ts', return_value=pd.Timestamp('2024-01-01')), \
-             patch.object(ts, 'fetch_all_ohlcv', return_value=pd.DataFrame({'ts':[pd.Timestamp('2024-01-02')],
-                                                                            'open':[1],'high':[1],'low':[1],'close':[1],'volume':[1]})), \
-             patch.object(ts.algorithm, 'process', return_value=1) as mock_proc, \
+        ts.config['symbols'] = [('AAPL', '1d'), ('MSFT', '1d')]
+        latest = {'AAPL': None, 'MSFT': pd.Timestamp('2024-01-01', tz='UTC')}
+        with patch.object(ts.algorithm, 'get_latest_ts', side_effect=lambda t, i: latest[t]), \
+             patch.object(ts, 'get_latest_ohlcv_ts', return_value=pd.Timestamp('2024-01-01', tz='UTC')), \
+             patch.object(ts, 'process_pair', return_value={'macd': 1}) as mock_pair, \
              patch.object(ts.bus, 'publish') as mock_pub:
             ts.process_backlog()
-        mock_proc.assert_called_once()
+        mock_pair.assert_called_once_with(
+            ts.db, [ts.algorithm], 'AAPL', '1d', ts.BACKLOG_CHUNK_ROWS, {'macd': None}
+        )
+        mock_pub.assert_called_once()
+        assert mock_pub.call_args.args[2]['new_rows'] == 1
+
+    def test_backlog_pairs_are_ordered_by_lag(self):
+        ts = load_ta_service()
+        ts.config['symbols'] = [('A', '1m'), ('B', '1m'), ('C', '1m'), ('D', '1m')]
+        now = pd.Timestamp('2024-01-02', tz='UTC')
+        latest = {'A': now - pd.Timedelta(hours=1), 'B': None, 'C': now, 'D': now - pd.Timedelta(days=1)}
+        with patch.object(ts, 'get_latest_ohlcv_ts', return_value=now), \
+             patch.object(ts.algorithm, 'get_latest_ts', side_effect=lambda t, i: latest[t]):
+            pairs = ts.backlog_pairs()
+        assert [t for t, _, _ in pairs] == ['B', 'D', 'A']
+        assert pairs[0][2] == {'macd': None}
+        assert pairs[1][2] == {'macd': latest['D']}
+
+    def test_incremental_backlog_queues_pairs_without_state(self):
+        with patch.dict('os.environ', {'TA_INCREMENTAL': 'true'}):
+            ts = load_ta_service()
+        ts.config['symbols'] = [('A', '1m'), ('B', '1m'), ('C', '1m')]
+        now = pd.Timestamp('2024-01-02', tz='UTC')
+        latest = {'A': now, 'B': now - pd.Timedelta(hours=1), 'C': now}
+        stored = {'A': (None, None), 'C': (object(), now)}
+        with patch.object(ts, 'get_latest_ohlcv_ts', return_value=now), \
+             patch.object(ts.algorithm, 'get_latest_ts', side_effect=lambda t, i: latest[t]), \
+             patch.object(ts.algorithm, 'load_state', side_effect=lambda t, i: stored[t]):
+            pairs = ts.backlog_pairs()
+        # caught-up A only needs seeding, so it follows the lagging B
+        assert pairs == [('B', '1m', {'macd': latest['B']}), ('A', '1m', {'macd': now})]
+
+    def test_parallel_backlog_reports_each_pair(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        ts = load_ta_service()
+        pairs = [('A', '1m', {'macd': None}), ('B', '1m', {'macd': None})]
+
+        def fake_catch_up(ticker, interval, written_after, chunk_rows):
+            assert (ticker, interval) in ts.backlog_pending
+            return ticker, interval, {'macd': 2 if ticker == 'A' else 0}, 0.5
+
+        with patch.object(ts, 'backlog_pairs', return_value=pairs), \
+             patch.object(ts, 'backlog_executor', return_value=ThreadPoolExecutor(1)), \
+             patch.object(ts, 'catch_up', side_effect=fake_catch_up), \
+             patch.object(ts.bus, 'publish') as mock_pub:
+            ts.process_backlog_parallel(0.0, ts.queue_backlog())
+        assert ts.backlog_pending == set()
         mock_pub.assert_called_once()
+        assert mock_pub.call_args.args[2]['ticker'] == 'A'
+        assert sum(ts.backlog_pair_seconds.labels().counts) == 2
+
+    def test_pairs_in_backlog_use_windowed_computation(self):
+        with patch.dict('os.environ', {'TA_INCREMENTAL': 'true'}):
+            ts = load_ta_service()
+        ts.backlog_pending.add(('AAPL', '1m'))
+        df = make_bars(3)
+        with patch.object(ts.algorithm, 'process', return_value=1) as mock_proc, \
+             patch.object(ts.algorithm, 'process_incremental', return_value=1) as mock_inc:
+            ts.run_algorithm(ts.algorithm, 'AAPL', '1m', df)
+            ts.run_algorithm(ts.algorithm, 'MSFT', '1m', df)
+        mock_proc.assert_called_once()
+        assert mock_inc.call_args.args[0] == 'MSFT'
+
+    def test_run_subscribes_before_starting_backlog(self):
+        ts = load_ta_service()
+        calls = []
+
+        class DummySub:
+            def listen(self_inner):
+                raise KeyboardInterrupt()
+
+        def subscribe(topic):
+            calls.append('subscribe')
+            return DummySub()
+
+        pairs = [('AAPL', '1m', {'macd': None})]
+        with patch.object(ts.bus, 'subscribe', side_effect=subscribe), \
+             patch.object(ts.threading, 'Thread') as mock_thread, \
+             patch.object(ts, 'queue_backlog', side_effect=lambda: calls.append('queue') or pairs), \
+             patch.object(ts, 'process_backlog') as mock_backlog:
+            mock_thread.return_value.start.side_effect = lambda: calls.append('backlog')
+            with self.assertRaises(KeyboardInterrupt):
+                ts.run()
+        assert calls == ['queue', 'subscribe', 'backlog']
+        assert mock_thread.call_args.kwargs['target'] is ts.process_backlog_parallel
+        assert mock_thread.call_args.kwargs['args'][1] is pairs
+        mock_backlog.assert_not_called()
 
     def test_run_consumes_messages(self):
         ts = load_ta_service()
@@ -195,12 +791,36 @@ class TestTAServiceIntegration(unittest.TestCase):
             def listen(self_inner):
                 yield message
                 raise KeyboardInterrupt()
-        with patch.object(ts, 'process_backlog'), \
+        with patch.object(ts, 'process_backlog_parallel'), \
              patch.object(ts.bus, 'subscribe', return_value=DummySub()) as mock_sub, \
-             patch.object(ts, 'process_ticker', return_value=1) as mock_proc, \
+             patch.object(ts, 'process_ticker', return_value={'macd': 1}) as mock_proc, \
              patch.object(ts.bus, 'publish') as mock_pub:
             with self.assertRaises(KeyboardInterrupt):
                 ts.run()
         mock_sub.assert_called_once_with('stock.updated')
         mock_proc.assert_called_once()
         mock_pub.assert_called_once()
+
+    def test_run_consumes_batch_messages(self):
+        ts = load_ta_service()
+        updates = [{'ticker': 'AAPL', 'interval': '1d'}, {'ticker': 'MSFT', 'interval': '1d'}]
+        message = {'type': 'message', 'data': json.dumps({'payload': {'updates': updates}})}
+        class DummySub:
+            def listen(self_inner):
+                yield message
+                raise KeyboardInterrupt()
+        windows = {('AAPL', '1d'): pd.DataFrame(), ('MSFT', '1d'): pd.DataFrame()}
+        with patch.object(ts, 'process_backlog_parallel'), \
+             patch.object(ts.bus, 'subscribe', return_value=DummySub()), \
+             patch.object(ts, 'fetch_recent_ohlcv_many', return_value=windows) as mock_fetch, \
+             patch.object(ts, 'process_ticker', side_effect=[{'macd': 2}, {'macd': 0}]) as mock_proc, \
+             patch.object(ts.bus, 'publish') as mock_pub:
+            with self.assertRaises(KeyboardInterrupt):
+                ts.run()
+        mock_fetch.assert_called_once_with([('AAPL', '1d'), ('MSFT', '1d')])
+        assert mock_proc.call_count == 2
+        mock_pub.assert_called_once()
+        payload = mock_pub.call_args.args[2]
+        assert payload['updates'] == [
+            {'ticker': 'AAPL', 'interval': '1d', 'indicator': ts.TA_NAME, 'new_rows': 2}
+        ]